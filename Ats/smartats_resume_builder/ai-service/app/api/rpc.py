@@ -0,0 +1,427 @@
+"""
+Internal RPC transport
+Length-prefixed msgpack RPC over persistent TCP / Unix socket connections for co-located services
+
+Frames are a 4-byte big-endian length followed by a msgpack map.
+
+Request:   {"id": 1, "method": "score", "params": {"resume_text": "..."}}
+Response:  {"id": 1, "result": {...}}  or  {"id": 1, "error": {"status": 422, "message": "..."}}
+
+Batch methods (score_batch, analyze_batch, match_batch) stream one
+{"id": 1, "record": {...}} frame per item as it completes, in the same record
+format as the NDJSON batch endpoints, and finish with
+{"id": 1, "record": {"summary": {...}}, "done": true}.
+
+score_batch also takes "detail": true to add each item's breakdown and
+"keywords": N to add its top N keywords and skills. match and match_batch
+accept already extracted "job_skills" and "job_keywords" instead of
+job_description / job_id, and analyze_batch takes "job_profiles" (job_id ->
+profile) for its items, so a coordinator's workers need not share its job
+profile store.
+
+Requests on one connection are handled concurrently and answered out of
+order; clients match responses by id. {"method": "cancel", "params": {"id": 1}}
+stops an in-flight request and gets no response. When INTERNAL_RPC_TOKEN is
+set the first request must be {"method": "auth", "params": {"token": "..."}}.
+"""
+
+import asyncio
+import fcntl
+import functools
+import hmac
+import logging
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict
+
+from fastapi import HTTPException
+from prometheus_client import Counter, Histogram
+from pydantic import ValidationError
+
+from app.api.v1.batch import run_batch
+from app.api.v1.endpoints.analyze import (
+    ResumeAnalysisBatchItem, ResumeAnalysisRequest, _AnalysisServices, analyze_and_record
+)
+from app.api.v1.endpoints.match import MatchBatchItem, _job_terms, _match_resume
+from app.api.v1.endpoints.score import ScoreBatchItem, _score_fields
+from app.core.admission import admission_controller, DEGRADE, REJECT
+from app.core.config import settings
+from app.core.executor import cpu_executor
+from app.services.ats.batch_scorer import batch_scorer
+from app.services.jobs.profile_store import JobProfile
+from app.services.ats.scorer import ATSScorer
+from app.services.nlp.keyword_extractor import KeywordExtractor, get_keyword_extractor
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+RPC_REQUESTS = Counter("rpc_requests_total", "Internal RPC requests", ["method", "status"])
+RPC_DURATION = Histogram(
+    "rpc_request_duration_seconds", "Internal RPC request duration", ["method"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0, 30.0)
+)
+
+_HEADER_SIZE = 4
+
+# Method -> admission route group (same load shedding as the HTTP endpoints)
+_ROUTES = {
+    "score": "/api/v1/score",
+    "score_batch": "/api/v1/score/batch",
+    "analyze": "/api/v1/analyze",
+    "analyze_batch": "/api/v1/analyze/batch",
+    "match": "/api/v1/match",
+    "match_batch": "/api/v1/match/batch",
+}
+
+
+class RPCError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _text(params: Dict, key: str = "resume_text") -> str:
+    value = params.get(key)
+    if not isinstance(value, str):
+        raise RPCError(422, f"{key} must be a string")
+    return value
+
+
+def _items(params: Dict) -> list:
+    items = params.get("items")
+    if not isinstance(items, list):
+        raise RPCError(422, "items must be a list")
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        raise RPCError(413, f"Batch too large: {len(items)} items (max {settings.BATCH_MAX_ITEMS})")
+    if not all(isinstance(item, dict) for item in items):
+        raise RPCError(422, "items must be maps")
+    return items
+
+
+async def _job(params: Dict, extractor: KeywordExtractor):
+    """Job skills and keywords sent resolved, else from job_description / job_id"""
+    if "job_skills" not in params:
+        return await _job_terms(params.get("job_description"), params.get("job_id"), extractor)
+    skills, keywords = params["job_skills"], params.get("job_keywords")
+    if not isinstance(skills, dict) or not isinstance(keywords, list):
+        raise RPCError(422, "job_skills must be a map and job_keywords a list")
+    return skills, keywords
+
+
+def _job_profiles(params: Dict) -> Dict[str, JobProfile]:
+    profiles = params.get("job_profiles") or {}
+    if not isinstance(profiles, dict):
+        raise RPCError(422, "job_profiles must be a map")
+    return {job_id: JobProfile.model_validate(profile) for job_id, profile in profiles.items()}
+
+
+# Unary operations: params -> result
+
+async def _score(params: Dict, degraded: bool) -> Dict:
+    result = await cpu_executor.run(ATSScorer().score_resume, _text(params))
+    return _score_fields(result)
+
+
+async def _analyze(params: Dict, degraded: bool) -> Dict:
+    request = ResumeAnalysisRequest.model_validate(params)
+    return await analyze_and_record(request, _AnalysisServices(), include_ai=not degraded)
+
+
+async def _match(params: Dict, degraded: bool) -> Dict:
+    extractor = get_keyword_extractor()
+    job_skills, job_keywords = await _job(params, extractor)
+    return await cpu_executor.run(_match_resume, _text(params), job_skills, job_keywords, extractor)
+
+
+# Streaming batch operations: params -> records
+
+def _keywords(extractor: KeywordExtractor, text: str, top_n: int) -> Dict:
+    return {"keywords": extractor.extract_keywords(text, top_n=top_n), "skills": extractor.extract_skills(text)}
+
+
+async def _score_batch(params: Dict, degraded: bool) -> AsyncIterator[Dict]:
+    items = [
+        ScoreBatchItem.model_construct(id=item.get("id"), resume_text=_text(item))
+        for item in _items(params)
+    ]
+    detail = bool(params.get("detail"))
+    top_n = params.get("keywords") or 0
+    if not isinstance(top_n, int):
+        raise RPCError(422, "keywords must be an integer")
+    extractor = get_keyword_extractor() if top_n > 0 else None
+
+    # Scored in one vectorized pass, then streamed like the HTTP batch endpoint
+    scored = asyncio.ensure_future(cpu_executor.run(batch_scorer.score_batch, [item.resume_text for item in items]))
+    positions = {id(item): i for i, item in enumerate(items)}
+
+    async def score_item(item: ScoreBatchItem) -> Dict:
+        result = (await scored)[positions[id(item)]]
+        fields = _score_fields(result)
+        if detail:
+            fields["breakdown"] = result["breakdown"]
+        if extractor is not None:
+            fields.update(await cpu_executor.run(_keywords, extractor, item.resume_text, top_n))
+        return fields
+
+    async for record in run_batch(items, score_item):
+        yield record
+
+
+async def _analyze_batch(params: Dict, degraded: bool) -> AsyncIterator[Dict]:
+    items = [ResumeAnalysisBatchItem.model_validate(item) for item in _items(params)]
+    services = _AnalysisServices()
+    job_profiles = _job_profiles(params)
+
+    async def analyze_item(item: ResumeAnalysisBatchItem) -> Dict:
+        return await analyze_and_record(item, services, not degraded, job_profiles)
+
+    async for record in run_batch(items, analyze_item):
+        yield record
+
+
+async def _match_batch(params: Dict, degraded: bool) -> AsyncIterator[Dict]:
+    items = [MatchBatchItem.model_validate(item) for item in _items(params)]
+    extractor = get_keyword_extractor()
+    job_skills, job_keywords = await _job(params, extractor)
+
+    async def match_item(item: MatchBatchItem) -> Dict:
+        return await cpu_executor.run(_match_resume, item.resume_text, job_skills, job_keywords, extractor)
+
+    async for record in run_batch(items, match_item):
+        yield record
+
+
+UNARY_METHODS: Dict[str, Callable[[Dict, bool], Awaitable[Dict]]] = {
+    "score": _score,
+    "analyze": _analyze,
+    "match": _match,
+}
+STREAM_METHODS: Dict[str, Callable[[Dict, bool], AsyncIterator[Dict]]] = {
+    "score_batch": _score_batch,
+    "analyze_batch": _analyze_batch,
+    "match_batch": _match_batch,
+}
+
+
+class _Connection:
+    """One client connection: reads frames, runs requests concurrently, serializes writes"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.authenticated = not settings.INTERNAL_RPC_TOKEN
+        self._write_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(settings.INTERNAL_RPC_MAX_INFLIGHT)
+        self._tasks = set()
+        self._requests: Dict = {}  # Request id -> task, for cancel
+
+    async def send(self, message: Dict):
+        payload = msgpack.packb(message, use_bin_type=True)
+        async with self._write_lock:
+            self.writer.write(len(payload).to_bytes(_HEADER_SIZE, "big") + payload)
+            await self.writer.drain()
+
+    async def serve(self):
+        try:
+            while True:
+                try:
+                    header = await self.reader.readexactly(_HEADER_SIZE)
+                except asyncio.IncompleteReadError:
+                    return  # Client closed the connection
+                length = int.from_bytes(header, "big")
+                if length > settings.INTERNAL_RPC_MAX_FRAME:
+                    await self.send({"id": None, "error": {"status": 413, "message": "Frame too large"}})
+                    return
+                try:
+                    request = msgpack.unpackb(await self.reader.readexactly(length), raw=False)
+                except asyncio.IncompleteReadError:
+                    return
+                except Exception:
+                    await self.send({"id": None, "error": {"status": 400, "message": "Malformed frame"}})
+                    return
+                if not isinstance(request, dict):
+                    await self.send({"id": None, "error": {"status": 400, "message": "Request must be a map"}})
+                    continue
+
+                if not self.authenticated:
+                    await self._authenticate(request)
+                    continue
+                if request.get("method") == "cancel":
+                    # Handled inline: a connection at its in-flight limit must still accept it
+                    task = self._requests.get((request.get("params") or {}).get("id"))
+                    if task is not None:
+                        task.cancel()
+                    continue
+
+                # Stop reading once the connection has too many requests in flight
+                await self._slots.acquire()
+                task = asyncio.create_task(self._dispatch(request))
+                self._tasks.add(task)
+                request_id = request.get("id")
+                if request_id is not None:
+                    self._requests[request_id] = task
+                task.add_done_callback(functools.partial(self._finished, request_id))
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            self.writer.close()
+
+    def _finished(self, request_id, task: asyncio.Task):
+        self._tasks.discard(task)
+        if self._requests.get(request_id) is task:
+            del self._requests[request_id]
+        self._slots.release()
+
+    async def _authenticate(self, request: Dict):
+        token = (request.get("params") or {}).get("token", "")
+        if request.get("method") == "auth" and isinstance(token, str) and hmac.compare_digest(
+            token.encode(), settings.INTERNAL_RPC_TOKEN.encode()
+        ):
+            self.authenticated = True
+            await self.send({"id": request.get("id"), "result": {"authenticated": True}})
+        else:
+            await self.send({"id": request.get("id"), "error": {"status": 401, "message": "Authentication required"}})
+
+    async def _dispatch(self, request: Dict):
+        request_id = request.get("id")
+        method = request.get("method")
+        params = request.get("params") or {}
+        start = time.perf_counter()
+        status = "ok"
+
+        route = _ROUTES.get(method) if settings.ADMISSION_ENABLED else None
+        decision = admission_controller.admit(route) if route else None
+        try:
+            if decision == REJECT:
+                raise RPCError(503, f"Service overloaded, retry after {admission_controller.retry_after(route)}s")
+            degraded = decision == DEGRADE
+
+            if method == "ping":
+                await self.send({"id": request_id, "result": "pong"})
+            elif method in UNARY_METHODS:
+                result = await UNARY_METHODS[method](params, degraded)
+                await self.send({"id": request_id, "result": result})
+            elif method in STREAM_METHODS:
+                async for record in STREAM_METHODS[method](params, degraded):
+                    done = "summary" in record
+                    await self.send({"id": request_id, "record": record, **({"done": True} if done else {})})
+            else:
+                raise RPCError(404, f"Unknown method: {method}")
+
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except ConnectionError:
+            status = "disconnected"
+        except Exception as e:
+            if isinstance(e, RPCError):
+                error = {"status": e.status, "message": e.message}
+            elif isinstance(e, HTTPException):
+                error = {"status": e.status_code, "message": str(e.detail)}
+            elif isinstance(e, ValidationError):
+                error = {"status": 422, "message": str(e)}
+            else:
+                logger.error(f"RPC {method} failed: {e}", exc_info=True)
+                error = {"status": 500, "message": "Internal error"}
+            status = str(error["status"])
+            try:
+                await self.send({"id": request_id, "error": error})
+            except ConnectionError:
+                pass
+        finally:
+            elapsed = time.perf_counter() - start
+            if decision is not None and decision != REJECT:
+                admission_controller.release(route, elapsed)
+            label = method if method in _ROUTES or method == "ping" else "unknown"
+            RPC_REQUESTS.labels(method=label, status=status).inc()
+            RPC_DURATION.labels(method=label).observe(elapsed)
+
+
+class InternalRPCServer:
+    """
+    TCP and/or Unix domain socket listeners for the internal RPC protocol
+
+    Every uvicorn worker shares the TCP port (reuse_port), but a socket path
+    can only be bound once: the worker that takes an flock on
+    `<socket>.lock` owns the Unix listener, and the others skip it.
+    """
+
+    def __init__(self):
+        self._servers = []
+        self._socket_path = None
+        self._socket_lock = None
+        self._connections = set()
+
+    def _claim_socket(self, path: str) -> bool:
+        fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._socket_lock = fd
+        return True
+
+    async def start(self):
+        if msgpack is None:
+            logger.error("Internal RPC enabled but msgpack is not installed")
+            return
+
+        path = settings.INTERNAL_RPC_SOCKET
+        if path and not self._claim_socket(path):
+            logger.info("Internal RPC socket %s is served by another worker (pid %d)", path, os.getpid())
+        elif path:
+            if os.path.exists(path):
+                os.unlink(path)  # Stale socket from a previous run; its owner released the lock
+            server = await asyncio.start_unix_server(self._handle, path=path)
+            self._servers.append(server)
+            self._socket_path = path
+            logger.info(f"Internal RPC listening on unix:{path}")
+        if settings.INTERNAL_RPC_PORT:
+            # reuse_port lets every uvicorn worker listen and the kernel spread connections
+            server = await asyncio.start_server(
+                self._handle, host=settings.INTERNAL_RPC_HOST, port=settings.INTERNAL_RPC_PORT,
+                reuse_port=True
+            )
+            self._servers.append(server)
+            logger.info(f"Internal RPC listening on {settings.INTERNAL_RPC_HOST}:{settings.INTERNAL_RPC_PORT}")
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+        # Persistent connections would otherwise keep wait_closed() pending
+        handlers = list(self._connections)
+        for handler in handlers:
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+        if self._socket_path and os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        self._socket_path = None
+        if self._socket_lock is not None:
+            os.close(self._socket_lock)
+            self._socket_lock = None
+
+    @property
+    def addresses(self) -> list:
+        return [sock.getsockname() for server in self._servers for sock in server.sockets]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        handler = asyncio.current_task()
+        self._connections.add(handler)
+        try:
+            await _Connection(reader, writer).serve()
+        except asyncio.CancelledError:
+            pass  # Server shutting down; asyncio's stream callback logs cancelled handlers as errors
+        finally:
+            self._connections.discard(handler)
+
+
+rpc_server = InternalRPCServer()
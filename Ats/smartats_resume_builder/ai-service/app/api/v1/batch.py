@@ -0,0 +1,240 @@
+"""
+Batch helpers shared by the batch endpoints
+Runs items with bounded concurrency and streams results as NDJSON
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+from app.core.rate_limit import endpoint_cost, rate_limiter
+from app.services.cluster.coordinator import NoWorkersAvailable, batch_coordinator
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+try:
+    import orjson
+
+    def _dumps(record: Dict) -> bytes:
+        return orjson.dumps(record) + b"\n"
+except ImportError:
+    def _dumps(record: Dict) -> bytes:
+        return json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class BatchItem(BaseModel):
+    """Common fields of a batch item"""
+    id: Optional[str] = Field(None, description="Client correlation ID echoed in the result")
+
+
+class BatchRequest(BaseModel):
+    """Common fields of a batch request"""
+    stream: bool = Field(False, description="Stream NDJSON results as each item completes")
+
+
+class BatchSummary(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    elapsed_ms: int
+
+
+def validate_batch_size(items: Sequence):
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(items)} items (max {settings.BATCH_MAX_ITEMS})"
+        )
+
+
+async def charge_batch(request: Request, items: Sequence):
+    """
+    Charge the rate limit per item
+
+    The middleware has already taken one item's cost; the rest is charged
+    here in full. A batch costing more than a whole bucket could never be
+    admitted, so it is refused with 413 instead of being capped.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    per_item = endpoint_cost(request.url.path)
+    total = per_item * len(items)
+    capacity = rate_limiter.clamp(total)
+    if total > capacity:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(items)} items costs {total} tokens, more than the rate limit allows "
+                   f"({capacity}); split it into smaller batches"
+        )
+    result = await rate_limiter.charge(request, total - rate_limiter.clamp(per_item))
+    if result is None:
+        return
+    if not result.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded for {len(items)} items, retry after {result.retry_after} seconds",
+            headers={"Retry-After": str(result.retry_after), "X-RateLimit-Remaining": str(result.remaining)}
+        )
+    request.state.rate_limit = (result.remaining, total)
+
+
+def wants_stream(batch: BatchRequest, request: Request) -> bool:
+    """Stream if asked for in the body or via the Accept header"""
+    return batch.stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def run_batch(
+    items: Sequence[BatchItem],
+    handler: Callable[[Any], Awaitable[Dict]],
+    concurrency: int = None
+) -> AsyncIterator[Dict]:
+    """
+    Run `handler` over items, yielding one record per item as it completes
+
+    At most `concurrency` items are in flight, so finished results are handed
+    to the caller (and can be written out) instead of accumulating. Records
+    carry the item's index and client `id`; a failing item yields an `error`
+    record rather than aborting the batch. The last record is a summary.
+    """
+    concurrency = concurrency or settings.BATCH_CONCURRENCY
+    start = time.perf_counter()
+    failed = 0
+
+    async def process(index: int, item: BatchItem) -> Dict:
+        try:
+            return {"index": index, "id": item.id, "result": await handler(item)}
+        except Exception as e:
+            logger.warning("Batch item %s failed: %s", index, e)
+            return {"index": index, "id": item.id, "error": str(e)}
+
+    inflight = set()
+    iterator = iter(enumerate(items))
+    exhausted = False
+
+    try:
+        while inflight or not exhausted:
+            while not exhausted and len(inflight) < concurrency:
+                try:
+                    index, item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                inflight.add(asyncio.create_task(process(index, item)))
+
+            if not inflight:
+                break
+
+            done, inflight = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                record = task.result()
+                if "error" in record:
+                    failed += 1
+                yield record
+    finally:
+        # Client went away mid-stream: don't leave work running
+        for task in inflight:
+            task.cancel()
+
+    yield {
+        "summary": BatchSummary(
+            total=len(items),
+            succeeded=len(items) - failed,
+            failed=failed,
+            elapsed_ms=int((time.perf_counter() - start) * 1000)
+        ).model_dump()
+    }
+
+
+def distribute_batch(
+    method: str,
+    items: Sequence[BatchItem],
+    run_local: Callable[[Sequence[BatchItem]], AsyncIterator[Dict]],
+    params: Optional[Dict] = None
+) -> AsyncIterator[Dict]:
+    """
+    Records for a batch, sharded across CLUSTER_WORKERS when it is large enough
+
+    `method` is the internal RPC batch method the workers run; `run_local`
+    produces the same records on this node (normally via `run_batch`) and
+    handles small batches, no configured workers, and whatever is left if
+    every worker drops out mid-batch.
+    """
+    if not batch_coordinator.enabled or len(items) < settings.CLUSTER_MIN_ITEMS:
+        return run_local(items)
+    return _run_distributed(method, items, run_local, params)
+
+
+async def _run_distributed(
+    method: str,
+    items: Sequence[BatchItem],
+    run_local: Callable[[Sequence[BatchItem]], AsyncIterator[Dict]],
+    params: Optional[Dict]
+) -> AsyncIterator[Dict]:
+    start = time.perf_counter()
+    pending = set(range(len(items)))
+    failed = 0
+    cluster = None
+
+    payload = ((index, item.model_dump(mode="json", exclude_unset=True)) for index, item in enumerate(items))
+    try:
+        async with contextlib.aclosing(batch_coordinator.run(method, payload, params)) as records:
+            async for record in records:
+                if "summary" in record:
+                    cluster = record["summary"]
+                    continue
+                pending.discard(record["index"])
+                failed += "error" in record
+                yield record
+    except NoWorkersAvailable as e:
+        remaining = sorted(pending)
+        logger.warning("%s; finishing %d batch items locally", e, len(remaining))
+        async with contextlib.aclosing(run_local([items[index] for index in remaining])) as records:
+            async for record in records:
+                if "summary" in record:
+                    failed += record["summary"]["failed"]
+                    continue
+                record["index"] = remaining[record["index"]]
+                yield record
+
+    summary = BatchSummary(
+        total=len(items),
+        succeeded=len(items) - failed,
+        failed=failed,
+        elapsed_ms=int((time.perf_counter() - start) * 1000)
+    ).model_dump()
+    if cluster is not None:
+        summary["nodes"] = cluster["nodes"]
+    yield {"summary": summary}
+
+
+def ndjson_response(records: AsyncIterator[Dict]) -> StreamingResponse:
+    """Stream records as newline-delimited JSON"""
+
+    async def body():
+        async for record in records:
+            yield _dumps(record)
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
+
+
+async def collect_batch(records: AsyncIterator[Dict]) -> Dict[str, Any]:
+    """Gather streamed records into a single response body, in input order"""
+    results: List[Dict] = []
+    summary = None
+    async for record in records:
+        if "summary" in record:
+            summary = record["summary"]
+        else:
+            results.append(record)
+    results.sort(key=lambda record: record["index"])
+    return {"results": results, "summary": summary}
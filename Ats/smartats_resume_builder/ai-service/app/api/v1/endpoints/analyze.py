@@ -3,14 +3,33 @@ Resume Analysis Endpoint
 Comprehensive resume analysis with AI-powered insights
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Set
+import hashlib
+import re
 import logging
 
+from app.api.v1.batch import (
+    BatchItem, BatchRequest, charge_batch, run_batch, distribute_batch, ndjson_response, collect_batch,
+    validate_batch_size, wants_stream
+)
+from app.core.config import settings
+from app.core.etag import compute_etag, etag_index
+from app.core.executor import cpu_executor
+from app.core.responses import FastJSONResponse, model_response
+from app.services.ats.bullet_quality import bullet_quality
+from app.services.ats.rules import scoring_rules
 from app.services.ats.scorer import ATSScorer
-from app.services.nlp.keyword_extractor import KeywordExtractor
+from app.services.nlp.keyword_extractor import KeywordExtractor, get_keyword_extractor
 from app.services.ai.openai_service import OpenAIService
+from app.services.analytics.sink import analytics_sink
+from app.services.jobs.profile_store import JobProfile
+from app.services.nlp.dedup import duplicate_detector
+from app.services.nlp.readability import analyze_readability
+from app.services.nlp.segmenter import segment_resume
+from app.services.search.inverted_index import search_index
+from app.api.v1.endpoints.jobs import find_job_profiles, require_job_profile
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -20,7 +39,20 @@ class ResumeAnalysisRequest(BaseModel):
     """Request model for resume analysis"""
     resume_text: str = Field(..., description="Resume content as text")
     job_description: Optional[str] = Field(None, description="Optional job description for targeted analysis")
+    job_id: Optional[str] = Field(None, description="Registered job profile to analyze against (see /jobs)")
     analysis_type: str = Field("comprehensive", description="Type of analysis: basic, comprehensive, or detailed")
+    fields: Optional[List[str]] = Field(None, description="Response fields to compute (default: all)")
+    resume_id: Optional[str] = Field(None, description="Add the resume to the recruiter search index under this ID")
+
+
+class ResumeAnalysisBatchItem(BatchItem, ResumeAnalysisRequest):
+    """Single resume in a batch analysis request"""
+    analysis_type: str = Field("basic", description="Type of analysis: basic, comprehensive, or detailed")
+
+
+class ResumeAnalysisBatchRequest(BatchRequest):
+    """Request model for batch resume analysis"""
+    items: List[ResumeAnalysisBatchItem]
 
 
 class ResumeAnalysisResponse(BaseModel):
@@ -30,6 +62,7 @@ class ResumeAnalysisResponse(BaseModel):
     
     # Detailed scores
     scores: Dict[str, int] = Field(..., description="Breakdown of scores by category")
+    rules_version: Optional[str] = Field(None, description="Version of the scoring rules used")
     
     # Keywords
     keywords: List[str] = Field(..., description="Extracted keywords from resume")
@@ -43,16 +76,104 @@ class ResumeAnalysisResponse(BaseModel):
     weaknesses: List[str] = Field(..., description="Areas for improvement")
     
     # Metrics
-    metrics: Dict[str, any] = Field(..., description="Various resume metrics")
+    metrics: Dict[str, Any] = Field(..., description="Various resume metrics")
+    bullet_quality: Optional[Dict[str, Any]] = Field(
+        None, description="Achievement vs. duty rating of each bullet (needs the embedding model)"
+    )
     
     # AI insights
     ai_insights: Optional[str] = Field(None, description="AI-generated insights")
+    
+    # Near-duplicate detection
+    duplicate_of: Optional[str] = Field(None, description="ID of a previously analyzed near-identical resume")
+
+
+# Analysis components and the components each one needs
+COMPONENT_DEPENDENCIES: Dict[str, Set[str]] = {
+    "ats_result": set(),
+    "keywords": set(),
+    "job_keywords": set(),
+    "missing_keywords": {"job_keywords"},
+    "metrics": set(),
+    "bullet_quality": set(),
+    "suggestions": {"ats_result", "metrics", "missing_keywords", "bullet_quality"},
+    "strengths": {"ats_result", "metrics"},
+    "weaknesses": {"ats_result", "metrics", "missing_keywords"},
+    "overall_score": {"ats_result", "metrics"},
+    "ai_insights": {"job_keywords"},  # Job terms steer prompt compaction
+}
+
+# Response field -> component that produces it
+FIELD_COMPONENTS = {
+    "ats_score": "ats_result",
+    "overall_score": "overall_score",
+    "scores": "ats_result",
+    "rules_version": "ats_result",
+    "keywords": "keywords",
+    "missing_keywords": "missing_keywords",
+    "suggestions": "suggestions",
+    "strengths": "strengths",
+    "weaknesses": "weaknesses",
+    "metrics": "metrics",
+    "bullet_quality": "bullet_quality",
+    "ai_insights": "ai_insights",
+}
+
+
+def resolve_components(fields: Optional[List[str]]) -> Set[str]:
+    """Components needed for the requested fields, including prerequisites"""
+    if not fields:
+        return set(COMPONENT_DEPENDENCIES)
+    
+    unknown = [field for field in fields if field not in FIELD_COMPONENTS]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown fields: {', '.join(unknown)} (valid: {', '.join(FIELD_COMPONENTS)})"
+        )
+    
+    required = set()
+    pending = [FIELD_COMPONENTS[field] for field in fields]
+    while pending:
+        component = pending.pop()
+        if component not in required:
+            required.add(component)
+            pending.extend(COMPONENT_DEPENDENCIES[component])
+    return required
 
 
-@router.post("/", response_model=ResumeAnalysisResponse)
+class _AnalysisServices:
+    """Creates services on first use so unneeded models (KeyBERT, LLM client) never load"""
+    
+    def __init__(self):
+        self._ats_scorer = None
+        self._keyword_extractor = None
+        self._ai_service = None
+    
+    @property
+    def ats_scorer(self) -> ATSScorer:
+        if self._ats_scorer is None:
+            self._ats_scorer = ATSScorer()
+        return self._ats_scorer
+    
+    @property
+    def keyword_extractor(self) -> KeywordExtractor:
+        if self._keyword_extractor is None:
+            self._keyword_extractor = get_keyword_extractor()
+        return self._keyword_extractor
+    
+    @property
+    def ai_service(self) -> OpenAIService:
+        if self._ai_service is None:
+            self._ai_service = OpenAIService()
+        return self._ai_service
+
+
+@router.post("/", response_model=ResumeAnalysisResponse, response_class=FastJSONResponse)
 async def analyze_resume(
     request: ResumeAnalysisRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    http_request: Request
 ):
     """
     Analyze resume comprehensively
@@ -63,104 +184,298 @@ async def analyze_resume(
     - Content quality analysis
     - Improvement suggestions
     - AI-powered insights
+    
+    Pass `fields` to compute only part of the response; components not
+    needed for those fields (and their prerequisites) are skipped.
+    
+    Responses without AI insights are deterministic and carry an ETag; a
+    caller that stored the result can send it back in If-None-Match and gets
+    a 304 before any analysis runs (see app/core/etag.py).
     """
+    components = resolve_components(request.fields)
+    job_profile = await require_job_profile(request.job_id) if request.job_id else None
+    
+    etag = None
+    if _is_deterministic(request, components):
+        etag = compute_etag("analyze", _analysis_variant(request, False, job_profile), request.resume_text)
+        not_modified = etag_index.not_modified(http_request, etag, "analyze")
+        if not_modified is not None:
+            return not_modified
+    
     try:
-        logger.info(f"Analyzing resume (type: {request.analysis_type})")
-        
-        # Initialize services
-        ats_scorer = ATSScorer()
-        keyword_extractor = KeywordExtractor()
-        ai_service = OpenAIService()
+        logger.info("Analyzing resume (type: %s)", request.analysis_type)
         
-        # 1. ATS Scoring
-        ats_result = ats_scorer.score_resume(request.resume_text)
+        # AI insights are skipped when shedding load
+        degraded = getattr(http_request.state, "degraded", False)
+        analysis = await _analyze_with_dedup(request, _AnalysisServices(), components, not degraded, job_profile)
         
-        # 2. Keyword Extraction
-        keywords = keyword_extractor.extract_keywords(request.resume_text, top_n=20)
+        # Log analytics in background
+        background_tasks.add_task(
+            _log_analysis,
+            request.analysis_type,
+            analysis.get("overall_score"),
+            analysis.get("ats_score"),
+            len(request.resume_text.split()),
+            bool(request.job_description or request.job_id)
+        )
+        if request.resume_id:
+            background_tasks.add_task(_index_resume, request.resume_id, request.resume_text, analysis.get("ats_score"))
         
-        # 3. Job Matching (if job description provided)
-        missing_keywords = []
-        if request.job_description:
-            job_keywords = keyword_extractor.extract_keywords(request.job_description, top_n=30)
-            missing_keywords = [kw for kw in job_keywords if kw.lower() not in request.resume_text.lower()]
+        if request.fields:
+            response = FastJSONResponse(content=analysis)
+        else:
+            response = model_response(ResumeAnalysisResponse, **analysis)
+        # duplicate_of depends on which resumes came before, so the body is not a function of the input alone
+        if etag is not None and not analysis.get("duplicate_of"):
+            etag_index.tag(response, etag)
+        return response
         
-        # 4. Content Analysis
+    except Exception as e:
+        logger.error(f"Resume analysis failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+
+@router.post("/batch", response_class=FastJSONResponse)
+async def analyze_batch(request: ResumeAnalysisBatchRequest, http_request: Request):
+    """
+    Analyze many resumes, optionally streaming NDJSON results as each completes
+    
+    Items default to basic analysis; AI insights per item are only generated
+    when an item asks for comprehensive or detailed analysis.
+    """
+    validate_batch_size(request.items)
+    await charge_batch(http_request, request.items)
+    for item in request.items:
+        resolve_components(item.fields)  # Reject unknown fields before starting
+    
+    # Services and job profiles are shared by every item in the batch
+    services = _AnalysisServices()
+    include_ai = not getattr(http_request.state, "degraded", False)
+    job_profiles = await find_job_profiles(item.job_id for item in request.items)
+    
+    async def analyze_item(item: ResumeAnalysisBatchItem) -> Dict:
+        return await analyze_and_record(item, services, include_ai, job_profiles)
+    
+    # Workers get the profiles with the items: their own profile store may not have them
+    records = distribute_batch(
+        "analyze_batch", request.items, lambda items: run_batch(items, analyze_item),
+        params={"job_profiles": {
+            job_id: profile.model_dump(mode="json") for job_id, profile in job_profiles.items()
+        }}
+    )
+    if wants_stream(request, http_request):
+        return ndjson_response(records)
+    return FastJSONResponse(content=await collect_batch(records))
+
+
+async def analyze_and_record(
+    item: ResumeAnalysisRequest,
+    services: _AnalysisServices,
+    include_ai: bool = True,
+    job_profiles: Optional[Dict[str, JobProfile]] = None
+) -> Dict[str, Any]:
+    """
+    Analyze one resume, record analytics and index it (batch and internal RPC items)
+    
+    `job_profiles` holds profiles already resolved for the batch; other job IDs
+    are looked up in the profile store.
+    """
+    job_profile = None
+    if item.job_id:
+        job_profile = (job_profiles or {}).get(item.job_id) or await require_job_profile(item.job_id)
+    analysis = await _analyze_with_dedup(
+        item, services, resolve_components(item.fields), include_ai, job_profile
+    )
+    analytics_sink.record("resume_analysis", {
+        "analysis_type": item.analysis_type,
+        "overall_score": analysis.get("overall_score"),
+        "ats_score": analysis.get("ats_score"),
+        "word_count": len(item.resume_text.split()),
+        "has_job_description": bool(item.job_description or item.job_id)
+    })
+    if item.resume_id:
+        await _index_resume(item.resume_id, item.resume_text, analysis.get("ats_score"))
+    return analysis
+
+
+async def _analyze_with_dedup(
+    request: ResumeAnalysisRequest,
+    services: _AnalysisServices,
+    components: Set[str],
+    include_ai: bool = True,
+    job_profile: Optional[JobProfile] = None
+) -> Dict[str, Any]:
+    """Run the analysis, flagging near-duplicates and reusing results only for identical text"""
+    if not settings.DEDUP_ENABLED:
+        return await _run_analysis(request, services, components, include_ai, job_profile)
+    
+    doc_id, match = duplicate_detector.check(request.resume_text)
+    flag = {"duplicate_of": doc_id} if match is not None else {}
+    
+    # A near-duplicate can differ in exactly the details that matter (numbers, short
+    # skill names), possibly from another user, so it never gets the other result
+    key = None
+    if settings.DEDUP_REUSE_RESULTS:
+        key = duplicate_detector.content_key(request.resume_text), _analysis_variant(request, include_ai, job_profile)
+        cached = duplicate_detector.get_result(*key)
+        if cached is not None:
+            return {**cached, **flag}
+    
+    analysis = await _run_analysis(request, services, components, include_ai, job_profile)
+    if key is not None:
+        duplicate_detector.put_result(*key, analysis)
+    return {**analysis, **flag} if flag else analysis
+
+
+def _is_deterministic(request: ResumeAnalysisRequest, components: Set[str]) -> bool:
+    """Whether the response depends only on the request (no LLM output, no indexing side effect)"""
+    if request.resume_id:
+        return False
+    return "ai_insights" not in components or request.analysis_type not in ("comprehensive", "detailed")
+
+
+def _analysis_variant(
+    request: ResumeAnalysisRequest,
+    include_ai: bool,
+    job_profile: Optional[JobProfile]
+) -> str:
+    """Key for the request options that change the analysis result"""
+    if job_profile is not None:
+        job = job_profile.content_hash
+    elif request.job_description:
+        job = hashlib.sha1(request.job_description.encode("utf-8")).hexdigest()
+    else:
+        job = ""
+    fields = ",".join(request.fields or [])
+    # Cached results are only reused under the rules (and bullet model availability) that produced them
+    rules = scoring_rules.current.fingerprint
+    bullets = bullet_quality.available
+    return f"{request.analysis_type}|{include_ai}|{job}|{fields}|{rules}|{bullets}"
+
+
+async def _run_analysis(
+    request: ResumeAnalysisRequest,
+    services: _AnalysisServices,
+    components: Set[str],
+    include_ai: bool = True,
+    job_profile: Optional[JobProfile] = None
+) -> Dict[str, Any]:
+    """Evaluate the requested analysis components and return the response fields"""
+    ats_result = keywords = metrics = bullets = None
+    missing_keywords = []
+    job_keywords = []
+    job_description = job_profile.description if job_profile else request.job_description
+    
+    # 1. ATS Scoring
+    if "ats_result" in components:
+        ats_result = await cpu_executor.run(services.ats_scorer.score_resume, request.resume_text)
+    
+    # 2. Keyword Extraction
+    if "keywords" in components:
+        keywords = await cpu_executor.run(
+            services.keyword_extractor.extract_keywords, request.resume_text, top_n=20
+        )
+    
+    # 3. Job Matching (if job description provided; registered profiles are precomputed)
+    if "job_keywords" in components and job_description:
+        if job_profile is not None:
+            job_keywords = job_profile.keywords
+        else:
+            job_keywords = await cpu_executor.run(
+                services.keyword_extractor.extract_keywords, job_description, top_n=30
+            )
+        missing_keywords = [kw for kw in job_keywords if kw.lower() not in request.resume_text.lower()]
+    
+    # 4. Content Analysis
+    if "metrics" in components:
+        structure = segment_resume(request.resume_text)
+        readability = analyze_readability(request.resume_text)
         metrics = {
-            "word_count": len(request.resume_text.split()),
+            "word_count": readability.whitespace_words,
             "character_count": len(request.resume_text),
-            "bullet_points": request.resume_text.count("•") + request.resume_text.count("-"),
-            "sections": _count_sections(request.resume_text),
+            "bullet_points": len(structure.bullets),
+            "sections": len(structure.sections),
             "action_verbs": _count_action_verbs(request.resume_text),
             "quantifiable_achievements": _count_numbers(request.resume_text),
+            "readability": readability.to_dict(),
         }
-        
-        # 5. Generate Suggestions
-        suggestions = _generate_suggestions(ats_result, metrics, missing_keywords)
-        
-        # 6. Identify Strengths and Weaknesses
-        strengths = _identify_strengths(ats_result, metrics)
-        weaknesses = _identify_weaknesses(ats_result, metrics, missing_keywords)
-        
-        # 7. Calculate Overall Score
-        overall_score = _calculate_overall_score(ats_result, metrics)
-        
-        # 8. AI Insights (async, optional)
+    
+    # 5. Bullet Quality (one encode for bullets not seen before; None without the embedding model)
+    if "bullet_quality" in components:
+        bullets = await cpu_executor.run(bullet_quality.analyze, segment_resume(request.resume_text))
+    
+    analysis = {}
+    if "ats_result" in components:
+        analysis["ats_score"] = ats_result["score"]
+        analysis["scores"] = ats_result["breakdown"]
+        analysis["rules_version"] = ats_result.get("rules_version")
+    
+    # 6. Calculate Overall Score
+    if "overall_score" in components:
+        analysis["overall_score"] = _calculate_overall_score(ats_result, metrics)
+    
+    if "keywords" in components:
+        analysis["keywords"] = keywords
+    if "missing_keywords" in components:
+        analysis["missing_keywords"] = missing_keywords[:10]  # Top 10 missing
+    
+    # 7. Generate Suggestions
+    if "suggestions" in components:
+        analysis["suggestions"] = _generate_suggestions(ats_result, metrics, missing_keywords, bullets)
+    
+    # 8. Identify Strengths and Weaknesses
+    if "strengths" in components:
+        analysis["strengths"] = _identify_strengths(ats_result, metrics)
+    if "weaknesses" in components:
+        analysis["weaknesses"] = _identify_weaknesses(ats_result, metrics, missing_keywords)
+    
+    if "metrics" in components:
+        analysis["metrics"] = metrics
+    if "bullet_quality" in components:
+        analysis["bullet_quality"] = bullets
+    
+    # 9. AI Insights (async, optional)
+    if "ai_insights" in components:
         ai_insights = None
-        if request.analysis_type in ["comprehensive", "detailed"]:
+        if request.analysis_type in ["comprehensive", "detailed"] and include_ai:
             try:
-                ai_insights = await ai_service.generate_resume_insights(
+                ai_insights = await services.ai_service.generate_resume_insights(
                     request.resume_text,
-                    request.job_description
+                    job_description,
+                    job_profile.requirements if job_profile else job_keywords
                 )
             except Exception as e:
-                logger.warning(f"AI insights generation failed: {e}")
-        
-        # Log analytics in background
-        background_tasks.add_task(_log_analysis, request.analysis_type, overall_score)
-        
-        return ResumeAnalysisResponse(
-            ats_score=ats_result["score"],
-            overall_score=overall_score,
-            scores=ats_result["breakdown"],
-            keywords=keywords,
-            missing_keywords=missing_keywords[:10],  # Top 10 missing
-            suggestions=suggestions,
-            strengths=strengths,
-            weaknesses=weaknesses,
-            metrics=metrics,
-            ai_insights=ai_insights
-        )
-        
-    except Exception as e:
-        logger.error(f"Resume analysis failed: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+                logger.warning("AI insights generation failed: %s", e)
+        analysis["ai_insights"] = ai_insights
+    
+    # Prerequisites were computed but only requested fields are returned
+    if request.fields:
+        return {field: analysis[field] for field in request.fields}
+    return analysis
 
 
-def _count_sections(text: str) -> int:
-    """Count resume sections"""
-    common_sections = [
-        "experience", "education", "skills", "summary", "objective",
-        "certifications", "projects", "awards", "publications"
-    ]
-    return sum(1 for section in common_sections if section in text.lower())
+_ACTION_VERB_RE = re.compile(
+    r"\b(?:achieved|improved|developed|managed|led|created|"
+    r"implemented|designed|built|increased|reduced|optimized)\b"
+)
 
 
 def _count_action_verbs(text: str) -> int:
-    """Count action verbs in resume"""
-    action_verbs = [
-        "achieved", "improved", "developed", "managed", "led", "created",
-        "implemented", "designed", "built", "increased", "reduced", "optimized"
-    ]
-    return sum(text.lower().count(verb) for verb in action_verbs)
+    """Count action verbs in resume (whole words, so "handled" is not "led")"""
+    return len(_ACTION_VERB_RE.findall(text.lower()))
 
 
 def _count_numbers(text: str) -> int:
     """Count quantifiable achievements (numbers in text)"""
-    import re
     return len(re.findall(r'\d+', text))
 
 
-def _generate_suggestions(ats_result: Dict, metrics: Dict, missing_keywords: List[str]) -> List[Dict[str, str]]:
+def _generate_suggestions(
+    ats_result: Dict,
+    metrics: Dict,
+    missing_keywords: List[str],
+    bullets: Optional[Dict] = None
+) -> List[Dict[str, str]]:
     """Generate improvement suggestions"""
     suggestions = []
     
@@ -185,6 +500,14 @@ def _generate_suggestions(ats_result: Dict, metrics: Dict, missing_keywords: Lis
             "suggestion": "Add quantifiable achievements with numbers and percentages to demonstrate impact"
         })
     
+    if bullets and bullets["duties"]:
+        suggestions.append({
+            "category": "Impact",
+            "priority": "high" if bullets["duties"] * 2 >= len(bullets["bullets"]) else "medium",
+            "suggestion": f"Rewrite {bullets['duties']} duty-style bullet point{'s' if bullets['duties'] > 1 else ''} "
+                          f"as achievements: what you did, and the measurable result"
+        })
+    
     if missing_keywords:
         suggestions.append({
             "category": "Keywords",
@@ -192,6 +515,14 @@ def _generate_suggestions(ats_result: Dict, metrics: Dict, missing_keywords: Lis
             "suggestion": f"Consider adding these relevant keywords: {', '.join(missing_keywords[:5])}"
         })
     
+    long_bullets = metrics["readability"]["long_bullets"]
+    if long_bullets:
+        suggestions.append({
+            "category": "Readability",
+            "priority": "medium",
+            "suggestion": f"Tighten {long_bullets} bullet point{'s' if long_bullets > 1 else ''} longer than 30 words"
+        })
+    
     if metrics["word_count"] < 300:
         suggestions.append({
             "category": "Length",
@@ -283,7 +614,31 @@ def _calculate_overall_score(ats_result: Dict, metrics: Dict) -> int:
     return int(score)
 
 
-async def _log_analysis(analysis_type: str, score: int):
+async def _log_analysis(
+    analysis_type: str,
+    score: Optional[int],
+    ats_score: Optional[int],
+    word_count: int,
+    has_job_description: bool
+):
     """Log analysis for analytics (background task)"""
-    logger.info(f"Analysis completed: type={analysis_type}, score={score}")
-    # TODO: Store in database for analytics
+    logger.info("Analysis completed: type=%s, score=%s", analysis_type, score)
+    
+    # Buffered in memory; the sink writes to the database in batches
+    analytics_sink.record("resume_analysis", {
+        "analysis_type": analysis_type,
+        "overall_score": score,
+        "ats_score": ats_score,
+        "word_count": word_count,
+        "has_job_description": has_job_description
+    })
+
+
+async def _index_resume(resume_id: str, resume_text: str, ats_score: Optional[int]):
+    """Add an analyzed resume to the search index (background task)"""
+    if not settings.SEARCH_INDEX_ENABLED:
+        return
+    try:
+        await cpu_executor.run(search_index.add, resume_id, resume_text, ats_score)
+    except Exception as e:
+        logger.warning("Failed to index resume %s: %s", resume_id, e)
@@ -0,0 +1,18 @@
+"""
+Batch Cluster Endpoint
+Worker nodes and progress of the distributed batch jobs coordinated by this node
+"""
+
+from fastapi import APIRouter, Depends
+
+from app.core.admin import require_admin
+from app.services.cluster.coordinator import batch_coordinator
+
+# Lists worker addresses, so it is admin-only like /debug
+router = APIRouter(dependencies=[Depends(require_admin)], include_in_schema=False)
+
+
+@router.get("/status")
+async def cluster_status():
+    """Configured worker nodes, their connection health, and running distributed batches"""
+    return batch_coordinator.status()
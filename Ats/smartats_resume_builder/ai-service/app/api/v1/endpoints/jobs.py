@@ -0,0 +1,107 @@
+"""
+Job Profile Endpoint
+Register a job description once and reference it by job_id
+"""
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from app.core.executor import cpu_executor
+from app.services.ai.model_manager import model_manager
+from app.services.jobs.profile_store import (
+    JobProfile, JobProfileStoreUnavailable, build_profile, content_hash, job_profile_store
+)
+from app.services.nlp.keyword_extractor import get_keyword_extractor
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+class JobRegisterRequest(BaseModel):
+    job_description: str = Field(..., description="Job description text")
+    job_id: Optional[str] = Field(None, description="Caller-chosen ID (default: derived from content hash)")
+
+
+class JobProfileResponse(BaseModel):
+    job_id: str
+    content_hash: str
+    keywords: List[str]
+    skills: Dict[str, List[str]]
+    requirements: List[str]
+    has_embedding: bool
+
+
+def _to_response(profile: JobProfile) -> JobProfileResponse:
+    return JobProfileResponse(
+        job_id=profile.job_id,
+        content_hash=profile.content_hash,
+        keywords=profile.keywords,
+        skills=profile.skills,
+        requirements=profile.requirements,
+        has_embedding=profile.embedding is not None
+    )
+
+
+async def _load_job_profile(job_id: str) -> Optional[JobProfile]:
+    """Registered profile or None; 503 if the store cannot be read, so it isn't mistaken for unknown"""
+    try:
+        return await job_profile_store.get(job_id)
+    except JobProfileStoreUnavailable:
+        raise HTTPException(status_code=503, detail="Job profile store unavailable, retry shortly")
+
+
+async def require_job_profile(job_id: str) -> JobProfile:
+    """Load a registered job profile or fail the request with 404"""
+    profile = await _load_job_profile(job_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job_id: {job_id}")
+    return profile
+
+
+async def find_job_profiles(job_ids: Iterable[Optional[str]]) -> Dict[str, JobProfile]:
+    """Registered profiles of the given job IDs, looked up once each; unknown IDs are left out"""
+    profiles = {}
+    for job_id in {job_id for job_id in job_ids if job_id}:
+        profile = await _load_job_profile(job_id)
+        if profile is not None:
+            profiles[job_id] = profile
+    return profiles
+
+
+@router.post("/", response_model=JobProfileResponse)
+async def register_job(request: JobRegisterRequest):
+    """Register a job description and precompute its profile"""
+    digest = content_hash(request.job_description)
+    job_id = request.job_id or f"jd_{digest[:16]}"
+
+    # Re-registering the same content is free
+    existing = await _load_job_profile(job_id)
+    if existing is not None and existing.content_hash == digest:
+        return _to_response(existing)
+
+    profile = await cpu_executor.run(
+        build_profile,
+        request.job_description,
+        get_keyword_extractor(),
+        job_id,
+        model_manager.get_model("sentence_transformer")
+    )
+    await job_profile_store.put(profile)
+    logger.info("Registered job profile %s", job_id)
+
+    return _to_response(profile)
+
+
+@router.get("/{job_id}", response_model=JobProfileResponse)
+async def get_job(job_id: str):
+    """Get a registered job profile"""
+    return _to_response(await require_job_profile(job_id))
+
+
+@router.delete("/{job_id}")
+async def delete_job(job_id: str):
+    """Remove a job profile"""
+    await job_profile_store.delete(job_id)
+    return {"deleted": job_id}
@@ -0,0 +1,325 @@
+"""
+Live Scoring Endpoint
+WebSocket channel that rescores the resume being edited and pushes score changes
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from prometheus_client import Counter, Gauge
+
+from app.core.admission import REJECT, admission_controller
+from app.core.config import settings
+from app.core.executor import cpu_executor
+from app.core.rate_limit import endpoint_cost, rate_limiter
+from app.services.ats.scorer import ATSScorer
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+LIVE_SESSIONS = Gauge("live_sessions", "Open live-scoring sessions")
+LIVE_SESSION_BYTES = Gauge("live_session_bytes", "Resume text held by live-scoring sessions")
+LIVE_MESSAGES = Counter("live_messages_total", "Live-scoring client messages", ["type"])
+LIVE_SCORES = Counter("live_scores_total", "Scores computed for live sessions")
+LIVE_COALESCED = Counter("live_coalesced_edits_total", "Edits folded into a later score")
+LIVE_CLOSED = Counter("live_sessions_closed_total", "Closed live-scoring sessions", ["reason"])
+LIVE_DEFERRED = Counter("live_deferred_scores_total", "Scores postponed by rate limiting or load shedding", ["reason"])
+
+# Scores compete with /score for the same CPU executor and client budget
+_SCORE_ROUTE = "/api/v1/score"
+
+# Close codes
+_GOING_AWAY = 1001
+_TOO_BIG = 1009
+_TRY_AGAIN_LATER = 1013
+_IDLE = 4000
+
+
+class EditError(ValueError):
+    """An edit message that cannot be applied"""
+
+
+class LiveSession:
+    """
+    Server-side resume state of one connection
+
+    Edits only mutate `text` and wake the scorer. The scorer always scores
+    the latest text, so edits that arrive while a score is running are folded
+    into the next one instead of queueing a score each.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.id = uuid.uuid4().hex[:12]
+        self.websocket = websocket
+        self.text = ""
+        self.seq = 0  # Last client sequence number applied
+        self.last_active = time.monotonic()
+        self.changed = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.close_reason: Optional[str] = None
+        self._scored_text: Optional[str] = None
+        self._recommendations: List[str] = []
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self.text)
+
+    def apply(self, message: Dict):
+        """Apply a `set` or `edit` message to the text"""
+        if message["type"] == "set":
+            text = message.get("text")
+            if not isinstance(text, str):
+                raise EditError("text must be a string")
+        else:
+            text = self.text
+            ops = message.get("ops")
+            if not isinstance(ops, list):
+                raise EditError("ops must be a list")
+            for op in ops:
+                if not isinstance(op, dict):
+                    raise EditError("each op must be an object")
+                start, end, insert = op.get("start"), op.get("end"), op.get("text", "")
+                if not (isinstance(start, int) and isinstance(end, int) and isinstance(insert, str)):
+                    raise EditError("each op needs integer start/end and string text")
+                if not 0 <= start <= end <= len(text):
+                    raise EditError(f"op range {start}-{end} outside text of length {len(text)}")
+                text = text[:start] + insert + text[end:]
+
+        if len(text) > settings.LIVE_MAX_TEXT_LENGTH:
+            raise EditError(f"Resume exceeds {settings.LIVE_MAX_TEXT_LENGTH} characters")
+
+        LIVE_SESSION_BYTES.inc(len(text) - len(self.text))
+        self.text = text
+        if isinstance(message.get("seq"), int):
+            self.seq = message["seq"]
+        if self.changed.is_set():
+            LIVE_COALESCED.inc()
+        self.changed.set()
+
+    async def send(self, message: Dict):
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(message, separators=(",", ":")))
+
+    def close(self, reason: str):
+        """Ask the connection handler to close (e.g. evicted by the registry)"""
+        if self.close_reason is None:
+            self.close_reason = reason
+        self.closed.set()
+
+    async def run_scorer(self):
+        """Score the latest text whenever it changes, one score at a time"""
+        scorer = ATSScorer()
+        while True:
+            await self.changed.wait()
+            # Let a burst of edits land before scoring
+            await asyncio.sleep(settings.LIVE_SCORE_DEBOUNCE)
+            self.changed.clear()
+            text, seq = self.text, self.seq
+            if text == self._scored_text:
+                continue
+
+            retry_after = await self._admit_score()
+            if retry_after:
+                await self.send({
+                    "type": "error", "seq": seq, "message": "Scoring deferred", "retry_after": retry_after
+                })
+                # The latest text is scored once the back-off ends
+                await asyncio.sleep(retry_after)
+                self.changed.set()
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = await cpu_executor.run(scorer.score_resume, text)
+            finally:
+                if settings.ADMISSION_ENABLED:
+                    admission_controller.release(_SCORE_ROUTE, time.perf_counter() - start)
+            LIVE_SCORES.inc()
+            self._scored_text = text
+
+            recommendations = result["recommendations"]
+            await self.send({
+                "type": "score",
+                "seq": seq,
+                "ats_score": result["score"],
+                "grade": result["grade"],
+                "breakdown": result["breakdown"],
+                "recommendations": {
+                    "added": [r for r in recommendations if r not in self._recommendations],
+                    "removed": [r for r in self._recommendations if r not in recommendations],
+                },
+                "rules_version": result.get("rules_version"),
+            })
+            self._recommendations = recommendations
+
+    async def _admit_score(self) -> int:
+        """Charge one score to the client and take an admission slot; seconds to back off if refused"""
+        limited = await rate_limiter.charge(self.websocket, endpoint_cost(_SCORE_ROUTE))
+        if limited is not None and not limited.allowed:
+            LIVE_DEFERRED.labels(reason="rate_limited").inc()
+            return limited.retry_after or 1
+        if settings.ADMISSION_ENABLED and admission_controller.admit(_SCORE_ROUTE) == REJECT:
+            LIVE_DEFERRED.labels(reason="overloaded").inc()
+            return admission_controller.retry_after(_SCORE_ROUTE)
+        return 0
+
+
+class LiveSessionRegistry:
+    """Bounds the number of open sessions and evicts idle ones"""
+
+    def __init__(self):
+        self.sessions: Dict[str, LiveSession] = {}
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def open(self, session: LiveSession) -> bool:
+        """Register a session, evicting the least recently active idle one when full"""
+        if len(self.sessions) >= settings.LIVE_MAX_SESSIONS:
+            oldest = min(self.sessions.values(), key=lambda s: s.last_active, default=None)
+            idle = time.monotonic() - oldest.last_active if oldest else 0
+            if oldest is None or idle < settings.LIVE_EVICT_AFTER:
+                return False
+            self.close(oldest, "evicted")
+        self.sessions[session.id] = session
+        LIVE_SESSIONS.set(len(self.sessions))
+        return True
+
+    def close(self, session: LiveSession, reason: str):
+        if self.sessions.pop(session.id, None) is not None:
+            LIVE_SESSION_BYTES.dec(session.size)
+            LIVE_SESSIONS.set(len(self.sessions))
+            LIVE_CLOSED.labels(reason=reason).inc()
+        session.close(reason)
+
+    def stats(self) -> Dict:
+        return {
+            "sessions": len(self.sessions),
+            "max_sessions": settings.LIVE_MAX_SESSIONS,
+            "text_bytes": sum(session.size for session in self.sessions.values()),
+        }
+
+
+live_sessions = LiveSessionRegistry()
+
+
+async def _receive(websocket: WebSocket, session: LiveSession) -> Optional[str]:
+    """Next client message, or None if the session idled out or was evicted"""
+    receive = asyncio.ensure_future(websocket.receive_text())
+    closed = asyncio.ensure_future(session.closed.wait())
+    try:
+        done, _ = await asyncio.wait(
+            {receive, closed}, timeout=settings.LIVE_IDLE_TIMEOUT, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        closed.cancel()
+    if receive in done:
+        return receive.result()
+    receive.cancel()
+    if not done:
+        session.close_reason = session.close_reason or "idle"
+    return None
+
+
+@router.websocket("/ws")
+async def live_score(websocket: WebSocket):
+    """
+    Live ATS scoring while the user edits
+
+    Client messages (JSON):
+      {"type": "set", "text": "...", "seq": 1}
+      {"type": "edit", "ops": [{"start": 10, "end": 14, "text": "Led"}], "seq": 2}
+      {"type": "ping"}
+    Server messages:
+      {"type": "ready", "session": "...", "limits": {...}}
+      {"type": "score", "seq": 2, "ats_score": 71, "grade": "C", "breakdown": {...},
+       "recommendations": {"added": [...], "removed": [...]}, "rules_version": "..."}
+      {"type": "error", "seq": 2, "message": "..."}
+
+    `seq` in a score is the last edit it includes. Edit ranges refer to the
+    text after all previous messages. Clients should debounce keystrokes;
+    the server additionally scores only the latest state.
+    
+    WebSockets bypass the HTTP middleware, so the connection and every score
+    are charged to the client's rate limit here, and scores go through
+    admission control like /score. A refused score is reported as an error
+    with `retry_after` and retried with the latest text after that delay.
+    """
+    await websocket.accept()
+    limited = await rate_limiter.charge(websocket, endpoint_cost(websocket.url.path))
+    if limited is not None and not limited.allowed:
+        LIVE_CLOSED.labels(reason="rate_limited").inc()
+        await websocket.close(code=_TRY_AGAIN_LATER, reason="Rate limit exceeded")
+        return
+    session = LiveSession(websocket)
+    if not live_sessions.open(session):
+        LIVE_CLOSED.labels(reason="capacity").inc()
+        await websocket.close(code=_TRY_AGAIN_LATER, reason="Too many live sessions")
+        return
+
+    scorer = asyncio.create_task(session.run_scorer())
+    code = 1000
+    try:
+        await session.send({
+            "type": "ready",
+            "session": session.id,
+            "limits": {
+                "max_text_length": settings.LIVE_MAX_TEXT_LENGTH,
+                "idle_timeout": settings.LIVE_IDLE_TIMEOUT,
+            },
+        })
+        while True:
+            raw = await _receive(websocket, session)
+            if raw is None:
+                code = _GOING_AWAY if session.close_reason == "evicted" else _IDLE
+                break
+            if len(raw) > settings.LIVE_MAX_MESSAGE_LENGTH:
+                session.close_reason = "message_too_large"
+                code = _TOO_BIG
+                break
+            session.last_active = time.monotonic()
+
+            try:
+                message = json.loads(raw)
+                kind = message.get("type") if isinstance(message, dict) else None
+            except ValueError:
+                kind = None
+            LIVE_MESSAGES.labels(type=kind if kind in ("set", "edit", "ping") else "invalid").inc()
+
+            if kind in ("set", "edit"):
+                try:
+                    session.apply(message)
+                except EditError as e:
+                    # The client's view has diverged; it should resend the full text
+                    await session.send({"type": "error", "seq": message.get("seq"), "message": str(e)})
+            elif kind == "ping":
+                await session.send({"type": "pong"})
+            else:
+                await session.send({"type": "error", "message": "Unknown message type"})
+
+    except WebSocketDisconnect:
+        session.close_reason = session.close_reason or "disconnected"
+        code = None
+    finally:
+        scorer.cancel()
+        live_sessions.close(session, session.close_reason or "closed")
+        if scorer.done() and not scorer.cancelled() and scorer.exception():
+            logger.warning("Live scorer failed: %s", scorer.exception())
+
+    if code is not None:
+        try:
+            await websocket.close(code=code)
+        except RuntimeError:
+            pass  # Already closed by the client
+
+
+@router.get("/stats")
+async def live_stats():
+    """Open live sessions and the memory they hold"""
+    return live_sessions.stats()
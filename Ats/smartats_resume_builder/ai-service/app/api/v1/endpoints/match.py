@@ -2,16 +2,26 @@
 Job Matching Endpoint
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from app.api.v1.batch import (
+    BatchItem, BatchRequest, charge_batch, run_batch, distribute_batch, ndjson_response, collect_batch,
+    validate_batch_size, wants_stream
+)
+from app.core.executor import cpu_executor
+from app.core.responses import FastJSONResponse, model_response
+from app.services.nlp.keyword_extractor import KeywordExtractor, get_keyword_extractor
+from app.api.v1.endpoints.jobs import require_job_profile
 
 router = APIRouter()
 
 
 class MatchRequest(BaseModel):
     resume_text: str
-    job_description: str
+    job_description: Optional[str] = None
+    job_id: Optional[str] = Field(None, description="Registered job profile (see /jobs) instead of job_description")
 
 
 class MatchResponse(BaseModel):
@@ -21,12 +31,102 @@ class MatchResponse(BaseModel):
     recommendations: List[str]
 
 
-@router.post("/", response_model=MatchResponse)
+class MatchBatchItem(BatchItem):
+    resume_text: str
+
+
+class MatchBatchRequest(BatchRequest):
+    job_description: Optional[str] = Field(None, description="Job description every resume is matched against")
+    job_id: Optional[str] = Field(None, description="Registered job profile (see /jobs) instead of job_description")
+    items: List[MatchBatchItem]
+
+
+def _match_resume(
+    resume_text: str,
+    job_skills: Dict[str, List[str]],
+    job_keywords: List[str],
+    extractor: KeywordExtractor
+) -> Dict:
+    """Compare a resume against precomputed job skills and keywords"""
+    resume_skills = extractor.extract_skills(resume_text, whole_words=True)
+    resume_all = set(resume_skills["technical"]) | set(resume_skills["soft"])
+    job_all = job_skills["technical"] + job_skills["soft"]
+    
+    matching_skills = [skill for skill in job_all if skill in resume_all]
+    missing_skills = [skill for skill in job_all if skill not in resume_all]
+    
+    resume_lower = resume_text.lower()
+    keyword_hits = sum(1 for keyword in job_keywords if keyword.lower() in resume_lower)
+    keyword_coverage = keyword_hits / len(job_keywords) if job_keywords else 0.0
+    
+    if job_all:
+        skill_coverage = len(matching_skills) / len(job_all)
+        match_score = int(100 * (0.7 * skill_coverage + 0.3 * keyword_coverage))
+    else:
+        match_score = int(100 * keyword_coverage)
+    
+    recommendations = [f"Add {skill} experience if you have it" for skill in missing_skills[:3]]
+    if match_score >= 80:
+        recommendations.append("Strong match - highlight your most relevant achievements")
+    elif keyword_coverage < 0.5:
+        recommendations.append("Mirror more of the job description's terminology")
+    
+    return {
+        "match_score": max(0, min(100, match_score)),
+        "matching_skills": matching_skills,
+        "missing_skills": missing_skills,
+        "recommendations": recommendations
+    }
+
+
+def _analyze_job(job_description: str, extractor: KeywordExtractor):
+    return (
+        extractor.extract_skills(job_description, whole_words=True),
+        extractor.extract_keywords(job_description, top_n=30)
+    )
+
+
+async def _job_terms(job_description: Optional[str], job_id: Optional[str], extractor: KeywordExtractor):
+    """Job skills and keywords, from a registered profile or computed on the fly"""
+    if job_id:
+        profile = await require_job_profile(job_id)
+        return profile.skills, profile.keywords
+    if not job_description:
+        raise HTTPException(status_code=422, detail="Either job_description or job_id is required")
+    return await cpu_executor.run(_analyze_job, job_description, extractor)
+
+
+@router.post("/", response_model=MatchResponse, response_class=FastJSONResponse)
 async def match_job(request: MatchRequest):
     """Match resume against job description"""
-    return MatchResponse(
-        match_score=75,
-        matching_skills=["Python", "React", "AWS"],
-        missing_skills=["Kubernetes", "GraphQL"],
-        recommendations=["Add Kubernetes experience", "Highlight cloud architecture skills"]
+    extractor = get_keyword_extractor()
+    job_skills, job_keywords = await _job_terms(request.job_description, request.job_id, extractor)
+    result = await cpu_executor.run(
+        _match_resume, request.resume_text, job_skills, job_keywords, extractor
+    )
+    return model_response(MatchResponse, **result)
+
+
+@router.post("/batch", response_class=FastJSONResponse)
+async def match_batch(request: MatchBatchRequest, http_request: Request):
+    """Match many resumes against one job description, optionally streamed as NDJSON"""
+    validate_batch_size(request.items)
+    await charge_batch(http_request, request.items)
+    extractor = get_keyword_extractor()
+    
+    # The job side is analyzed once for the whole batch
+    job_skills, job_keywords = await _job_terms(request.job_description, request.job_id, extractor)
+    
+    async def match_item(item: MatchBatchItem) -> Dict:
+        return await cpu_executor.run(
+            _match_resume, item.resume_text, job_skills, job_keywords, extractor
+        )
+    
+    records = distribute_batch(
+        "match_batch", request.items, lambda items: run_batch(items, match_item),
+        # Resolved here: a worker's job profile store may not have job_id
+        params={"job_skills": job_skills, "job_keywords": job_keywords}
     )
+    if wants_stream(request, http_request):
+        return ndjson_response(records)
+    return FastJSONResponse(content=await collect_batch(records))
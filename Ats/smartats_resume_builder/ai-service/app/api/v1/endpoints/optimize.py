@@ -4,7 +4,7 @@ Resume Optimization Endpoint
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
-from typing import List, Dict
+from typing import Any, List, Dict
 import logging
 
 from app.services.ai.openai_service import OpenAIService
@@ -25,7 +25,7 @@ class OptimizeRequest(BaseModel):
 class OptimizeResponse(BaseModel):
     optimized_sections: Dict[str, str]
     improvements: List[Dict[str, str]]
-    before_after: List[Dict[str, any]]
+    before_after: List[Dict[str, Any]]
 
 
 @router.post("/", response_model=OptimizeResponse)
@@ -2,10 +2,21 @@
 Quick Scoring Endpoint
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from pydantic import BaseModel
+from typing import Dict, List, Optional
+import asyncio
 
+from app.api.v1.batch import (
+    BatchItem, BatchRequest, charge_batch, run_batch, distribute_batch, ndjson_response, collect_batch,
+    validate_batch_size, wants_stream
+)
+from app.core.etag import compute_etag, etag_index
+from app.core.executor import cpu_executor
+from app.core.responses import FastJSONResponse, model_response
+from app.services.ats.rules import scoring_rules
 from app.services.ats.scorer import ATSScorer
+from app.services.ats.batch_scorer import batch_scorer
 
 router = APIRouter()
 
@@ -18,16 +29,70 @@ class ScoreResponse(BaseModel):
     ats_score: int
     grade: str
     quick_tips: list
+    rules_version: Optional[str] = None
 
 
-@router.post("/", response_model=ScoreResponse)
-async def score_resume(request: ScoreRequest):
-    """Quick ATS score"""
-    scorer = ATSScorer()
-    result = scorer.score_resume(request.resume_text)
+class ScoreBatchItem(BatchItem):
+    resume_text: str
+
+
+class ScoreBatchRequest(BatchRequest):
+    items: List[ScoreBatchItem]
+
+
+def _score_fields(result: Dict) -> Dict:
+    return {
+        "ats_score": result["score"],
+        "grade": result["grade"],
+        "quick_tips": result["recommendations"][:3],
+        "rules_version": result.get("rules_version")
+    }
+
+
+@router.post("/", response_model=ScoreResponse, response_class=FastJSONResponse)
+async def score_resume(request: ScoreRequest, http_request: Request):
+    """
+    Quick ATS score
+    
+    The score only depends on the text and the scoring rules, so responses
+    carry a strong ETag; a caller that stored the result can send it back in
+    If-None-Match and gets a 304 without scoring (see app/core/etag.py).
+    """
+    rules = scoring_rules.current  # Pinned so the ETag and the score agree
+    etag = compute_etag("score", rules.fingerprint, request.resume_text)
+    not_modified = etag_index.not_modified(http_request, etag, "score")
+    if not_modified is not None:
+        return not_modified
+    
+    scorer = ATSScorer(rules)
+    result = await cpu_executor.run(scorer.score_resume, request.resume_text)
+    
+    response = model_response(ScoreResponse, **_score_fields(result))
+    if result["breakdown"]:  # Errors are not cacheable
+        etag_index.tag(response, etag)
+    return response
+
+
+@router.post("/batch", response_class=FastJSONResponse)
+async def score_batch(request: ScoreBatchRequest, http_request: Request):
+    """Quick ATS scores for many resumes, optionally streamed as NDJSON"""
+    validate_batch_size(request.items)
+    await charge_batch(http_request, request.items)
+    
+    def score_locally(items: List[ScoreBatchItem]):
+        # Scored in one vectorized pass; items then stream out as usual
+        scored = asyncio.ensure_future(
+            cpu_executor.run(batch_scorer.score_batch, [item.resume_text for item in items])
+        )
+        positions = {id(item): i for i, item in enumerate(items)}
+        
+        async def score_item(item: ScoreBatchItem) -> Dict:
+            results = await scored
+            return _score_fields(results[positions[id(item)]])
+        
+        return run_batch(items, score_item)
     
-    return ScoreResponse(
-        ats_score=result["score"],
-        grade=result["grade"],
-        quick_tips=result["recommendations"][:3]
-    )
+    records = distribute_batch("score_batch", request.items, score_locally)
+    if wants_stream(request, http_request):
+        return ndjson_response(records)
+    return FastJSONResponse(content=await collect_batch(records))
@@ -0,0 +1,84 @@
+"""
+Resume Search Endpoint
+Boolean and phrase search over indexed resumes, ranked with BM25
+"""
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import logging
+
+from app.core.config import settings
+from app.core.executor import cpu_executor
+from app.core.responses import FastJSONResponse
+from app.services.search.inverted_index import SnapshotWriterBusy, search_index
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+class SearchRequest(BaseModel):
+    query: str = Field(..., description='Query, e.g. Kubernetes AND (Go OR Rust) NOT "team lead"')
+    limit: int = Field(20, ge=1, le=200, description="Maximum results to return")
+    min_score: Optional[int] = Field(None, ge=0, le=100, description="Only resumes with at least this ATS score")
+
+
+class SearchResult(BaseModel):
+    resume_id: str
+    score: float = Field(..., description="BM25 relevance")
+    ats_score: Optional[int] = None
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchResult]
+    total_matches: int
+    took_ms: float
+
+
+class IndexResumeRequest(BaseModel):
+    resume_id: str = Field(..., description="Caller-chosen resume ID; re-indexing replaces the old version")
+    resume_text: str = Field(..., description="Resume content as text")
+    ats_score: Optional[int] = Field(None, ge=0, le=100, description="ATS score used by min_score filters")
+
+
+@router.post("/", response_model=SearchResponse, response_class=FastJSONResponse)
+async def search_resumes(request: SearchRequest):
+    """
+    Search indexed resumes
+
+    Operators are AND, OR and NOT (upper case), with parentheses and quoted
+    phrases; adjacent terms are ANDed.
+    """
+    try:
+        result = await cpu_executor.run(search_index.search, request.query, request.limit, request.min_score)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query: {e}")
+    return FastJSONResponse(content=result)
+
+
+@router.post("/index")
+async def index_resume(request: IndexResumeRequest):
+    """Add or replace a resume in the search index"""
+    try:
+        await cpu_executor.run(search_index.add, request.resume_id, request.resume_text, request.ats_score)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"indexed": request.resume_id, "total_resumes": search_index.num_docs}
+
+
+@router.delete("/index/{resume_id}")
+async def delete_resume(resume_id: str):
+    """Remove a resume from the search index"""
+    if not await cpu_executor.run(search_index.delete, resume_id):
+        raise HTTPException(status_code=404, detail=f"Unknown resume_id: {resume_id}")
+    return {"deleted": resume_id}
+
+
+@router.post("/snapshot")
+async def snapshot_index():
+    """Compact the index into a new memory-mapped snapshot file"""
+    try:
+        await cpu_executor.run(search_index.snapshot, settings.SEARCH_INDEX_PATH)
+    except SnapshotWriterBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"path": settings.SEARCH_INDEX_PATH, "total_resumes": search_index.num_docs}
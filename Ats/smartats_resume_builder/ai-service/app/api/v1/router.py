@@ -3,7 +3,7 @@ API v1 Router - Main router for all v1 endpoints
 """
 
 from fastapi import APIRouter
-from app.api.v1.endpoints import analyze, optimize, match, generate, score
+from app.api.v1.endpoints import analyze, optimize, match, generate, score, jobs, search, live, cluster
 
 api_router = APIRouter()
 
@@ -13,3 +13,7 @@ api_router.include_router(optimize.router, prefix="/optimize", tags=["optimize"]
 api_router.include_router(match.router, prefix="/match", tags=["match"])
 api_router.include_router(generate.router, prefix="/generate", tags=["generate"])
 api_router.include_router(score.router, prefix="/score", tags=["score"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(live.router, prefix="/live", tags=["live"])
+api_router.include_router(cluster.router, prefix="/cluster", tags=["cluster"])
@@ -0,0 +1,426 @@
+"""
+Offline Bulk Scoring
+Streams resumes through the batch ATS scorer and KeywordExtractor on a process pool,
+or shards them across AI service nodes over the internal RPC
+
+Usage:
+    python -m app.cli.bulk_score resumes.jsonl -o scores.jsonl
+    python -m app.cli.bulk_score resumes/ -o scores.jsonl --workers 8 --unordered
+    python -m app.cli.bulk_score resumes.csv -o scores.jsonl --resume
+
+Distributed, e.g. with three local worker nodes:
+    for port in 7101 7102 7103; do
+        INTERNAL_RPC_ENABLED=true INTERNAL_RPC_PORT=$port uvicorn app.main:app --port $((port + 1000)) &
+    done
+    python -m app.cli.bulk_score resumes.jsonl -o scores.jsonl --nodes 127.0.0.1:7101,127.0.0.1:7102,127.0.0.1:7103
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger("bulk_score")
+
+# (record id, resume text, file path) - exactly one of text/path is set
+InputRecord = Tuple[str, Optional[str], Optional[str]]
+
+TEXT_EXTENSIONS = {".txt", ".md"}
+PDF_EXTENSIONS = {".pdf"}
+
+
+def iter_records(source: str, id_field: str = "id", text_field: str = "resume_text") -> Iterator[InputRecord]:
+    """Stream input records from a JSONL/CSV file or a directory of text/PDF files"""
+    if os.path.isdir(source):
+        yield from _iter_directory(source)
+    elif source.endswith(".csv"):
+        yield from _iter_csv(source, id_field, text_field)
+    else:
+        yield from _iter_jsonl(source, id_field, text_field)
+
+
+def _iter_jsonl(path: str, id_field: str, text_field: str) -> Iterator[InputRecord]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping invalid JSON on line {line_number}: {e}")
+                continue
+            yield str(row.get(id_field, line_number)), row.get(text_field) or "", None
+
+
+def _iter_csv(path: str, id_field: str, text_field: str) -> Iterator[InputRecord]:
+    csv.field_size_limit(sys.maxsize)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row_number, row in enumerate(csv.DictReader(f), 1):
+            yield str(row.get(id_field) or row_number), row.get(text_field) or "", None
+
+
+def _iter_directory(path: str) -> Iterator[InputRecord]:
+    # Sort names per directory so the input order (and checkpoints) are stable
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            extension = os.path.splitext(name)[1].lower()
+            if extension in TEXT_EXTENSIONS or extension in PDF_EXTENSIONS:
+                file_path = os.path.join(root, name)
+                yield os.path.relpath(file_path, path), None, file_path
+
+
+# Per-process state, created once by the pool initializer
+_scorer = None
+_extractor = None
+_top_n = 20
+
+
+def _init_worker(top_n: int, use_keybert: bool):
+    global _scorer, _extractor, _top_n
+    from app.services.ats.batch_scorer import BatchATSScorer
+    from app.services.nlp.keyword_extractor import KeywordExtractor
+
+    logging.getLogger().setLevel(logging.WARNING)
+    _scorer = BatchATSScorer()
+    _extractor = KeywordExtractor(use_keybert=use_keybert) if top_n > 0 else None
+    _top_n = top_n
+
+
+def _read_file(path: str) -> str:
+    if os.path.splitext(path)[1].lower() in PDF_EXTENSIONS:
+        import pdfplumber
+
+        with pdfplumber.open(path) as pdf:
+            return "\n".join(page.extract_text() or "" for page in pdf.pages)
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def _score_chunk(chunk: List[Tuple[int, str, Optional[str], Optional[str]]]) -> List[Tuple[int, Dict]]:
+    """Score a chunk of resumes inside a worker process, vectorized across the chunk"""
+    results: Dict[int, Dict] = {}
+    texts: List[str] = []
+    scored: List[Tuple[int, str]] = []
+
+    for index, record_id, text, path in chunk:
+        try:
+            if text is None:
+                text = _read_file(path)
+        except Exception as e:
+            results[index] = {"id": record_id, "error": str(e)}
+            continue
+        if not text.strip():
+            results[index] = {"id": record_id, "error": "empty resume"}
+            continue
+        texts.append(text)
+        scored.append((index, record_id))
+
+    for (index, record_id), text, result in zip(scored, texts, _scorer.score_batch(texts)):
+        output = {
+            "id": record_id,
+            "ats_score": result["score"],
+            "grade": result["grade"],
+            "breakdown": result["breakdown"],
+            "rules_version": result["rules_version"],
+        }
+        try:
+            if _extractor is not None:
+                output["keywords"] = _extractor.extract_keywords(text, top_n=_top_n)
+                output["skills"] = _extractor.extract_skills(text)
+        except Exception as e:
+            output = {"id": record_id, "error": str(e)}
+        results[index] = output
+
+    return sorted(results.items())
+
+
+class Checkpoint:
+    """
+    Resumable progress marker
+
+    `watermark` is the first input index not yet known to be written; `done`
+    holds indexes above it that finished out of order (bounded by the in-flight
+    window). `output_offset` is the output file size matching this state, so a
+    resumed run truncates anything written after the last checkpoint and
+    recomputes it instead of emitting duplicates.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.watermark = 0
+        self.done: Set[int] = set()
+        self.output_offset = 0
+
+    @classmethod
+    def load(cls, path: str) -> "Checkpoint":
+        checkpoint = cls(path)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                state = json.load(f)
+            checkpoint.watermark = state["watermark"]
+            checkpoint.done = set(state["done"])
+            checkpoint.output_offset = state["output_offset"]
+        return checkpoint
+
+    def is_done(self, index: int) -> bool:
+        return index < self.watermark or index in self.done
+
+    def mark(self, index: int):
+        self.done.add(index)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+
+    def save(self, output_offset: int):
+        self.output_offset = output_offset
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({
+                "watermark": self.watermark,
+                "done": sorted(self.done),
+                "output_offset": output_offset
+            }, f)
+        os.replace(temp_path, self.path)
+
+
+class Progress:
+    """Periodic throughput reporting"""
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.start = self.last_report = time.monotonic()
+        self.count = 0
+        self.errors = 0
+
+    def update(self, result: Dict):
+        self.count += 1
+        if "error" in result:
+            self.errors += 1
+
+        now = time.monotonic()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            logger.info(f"{self.count} scored ({self.errors} errors), {self.rate():.0f} resumes/s")
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.start
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+
+def run(args: argparse.Namespace) -> int:
+    checkpoint_path = args.checkpoint or args.output + ".checkpoint"
+    if args.resume:
+        checkpoint = Checkpoint.load(checkpoint_path)
+        if checkpoint.watermark or checkpoint.done:
+            logger.info(f"Resuming after {checkpoint.watermark} records")
+    else:
+        checkpoint = Checkpoint(checkpoint_path)
+
+    # Drop output written after the last checkpoint; it will be recomputed
+    output = open(args.output, "ab")
+    output.truncate(checkpoint.output_offset)
+    output.seek(checkpoint.output_offset)
+
+    progress = Progress(args.report_interval)
+    since_checkpoint = 0
+
+    def write(index: int, result: Dict):
+        nonlocal since_checkpoint
+        output.write(json.dumps(result, separators=(",", ":")).encode("utf-8") + b"\n")
+        checkpoint.mark(index)
+        progress.update(result)
+        since_checkpoint += 1
+        if since_checkpoint >= args.checkpoint_every:
+            output.flush()
+            os.fsync(output.fileno())
+            checkpoint.save(output.tell())
+            since_checkpoint = 0
+
+    status = 0
+    try:
+        if args.nodes:
+            status = asyncio.run(_score_remote(args, checkpoint, write))
+        else:
+            _score_local(args, checkpoint, write)
+    except KeyboardInterrupt:
+        logger.warning("Interrupted, saving checkpoint")
+    finally:
+        output.flush()
+        os.fsync(output.fileno())
+        checkpoint.save(output.tell())
+        output.close()
+
+    logger.info(
+        f"Done: {progress.count} scored ({progress.errors} errors) "
+        f"in {time.monotonic() - progress.start:.1f}s, {progress.rate():.0f} resumes/s"
+    )
+    return status
+
+
+def _score_local(args: argparse.Namespace, checkpoint: Checkpoint, write: Callable[[int, Dict], None]):
+    workers = args.workers or os.cpu_count() or 1
+    window = workers * args.window_per_worker
+    chunk_size = max(1, args.chunk_size)
+
+    pending = deque()  # submission order, for ordered output
+    inflight = set()
+
+    def drain(until: int):
+        """Write completed chunks until at most `until` tasks remain in flight"""
+        while len(inflight) > until:
+            if args.unordered:
+                finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    inflight.discard(future)
+                    for index, result in future.result():
+                        write(index, result)
+            else:
+                future = pending.popleft()
+                inflight.discard(future)
+                for index, result in future.result():
+                    write(index, result)
+
+    def submit(pool, chunk):
+        future = pool.submit(_score_chunk, chunk)
+        inflight.add(future)
+        if not args.unordered:
+            pending.append(future)
+        # Bounded window keeps memory flat regardless of input size
+        drain(window - 1)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(args.keywords, args.keybert)
+    ) as pool:
+        records = iter_records(args.input, args.id_field, args.text_field)
+        chunk = []
+        for index, (record_id, text, path) in enumerate(records):
+            if checkpoint.is_done(index):
+                continue
+            chunk.append((index, record_id, text, path))
+            if len(chunk) >= chunk_size:
+                submit(pool, chunk)
+                chunk = []
+        if chunk:
+            submit(pool, chunk)
+        drain(0)
+
+
+async def _score_remote(args: argparse.Namespace, checkpoint: Checkpoint, write: Callable[[int, Dict], None]) -> int:
+    """
+    Shard the input across AI service nodes (see app/services/cluster/coordinator.py)
+
+    Files are read here and only text goes over the wire. Results arrive in
+    any order; unless --unordered they are held until every earlier record
+    is written, which the coordinator's outstanding window keeps bounded.
+    """
+    from app.services.cluster.coordinator import BatchCoordinator, NoWorkersAvailable
+
+    coordinator = BatchCoordinator(
+        args.nodes.split(","), token=args.token,
+        shard_size=args.chunk_size, shards_per_node=args.window_per_worker
+    )
+    order = deque()  # Input order of indexes not yet written
+    ready: Dict[int, Dict] = {}
+
+    def emit(index: int, result: Dict):
+        if args.unordered:
+            write(index, result)
+            return
+        ready[index] = result
+        while order and order[0] in ready:
+            head = order.popleft()
+            write(head, ready.pop(head))
+
+    def items() -> Iterator[Tuple[int, Dict]]:
+        for index, (record_id, text, path) in enumerate(iter_records(args.input, args.id_field, args.text_field)):
+            if checkpoint.is_done(index):
+                continue
+            order.append(index)
+            try:
+                if text is None:
+                    text = _read_file(path)
+            except Exception as e:
+                emit(index, {"id": record_id, "error": str(e)})
+                continue
+            if not text.strip():
+                emit(index, {"id": record_id, "error": "empty resume"})
+                continue
+            yield index, {"id": record_id, "resume_text": text}
+
+    params = {"detail": True, "keywords": args.keywords}
+    try:
+        async for record in coordinator.run("score_batch", items(), params):
+            if "summary" in record:
+                summary = record["summary"]
+                logger.info(f"Retried {summary['retries']} shards, {summary['steals']} steals")
+                for address, stats in summary["nodes"].items():
+                    logger.info(f"  {address}: {stats}")
+                continue
+            if "error" in record:
+                emit(record["index"], {"id": record["id"], "error": record["error"]})
+                continue
+            result = record["result"]
+            output = {
+                "id": record["id"],
+                "ats_score": result["ats_score"],
+                "grade": result["grade"],
+                "breakdown": result["breakdown"],
+                "rules_version": result["rules_version"],
+            }
+            if "keywords" in result:
+                output["keywords"] = result["keywords"]
+                output["skills"] = result["skills"]
+            emit(record["index"], output)
+    except NoWorkersAvailable as e:
+        logger.error(f"{e}; rerun with --resume once nodes are back")
+        return 1
+    finally:
+        await coordinator.close()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Bulk ATS scoring of stored resumes")
+    parser.add_argument("input", help="JSONL or CSV file, or a directory of .txt/.pdf resumes")
+    parser.add_argument("-o", "--output", required=True, help="Output JSONL file")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--unordered", action="store_true", help="Write results as they complete")
+    parser.add_argument("--nodes", help="Comma-separated worker RPC addresses (host:port or unix:/path) "
+                                        "to shard across instead of local processes")
+    parser.add_argument("--token", default="", help="Workers' INTERNAL_RPC_TOKEN (with --nodes)")
+    parser.add_argument("--keywords", type=int, default=20, help="Keywords per resume (0 disables extraction)")
+    parser.add_argument("--keybert", action="store_true", help="Use KeyBERT for keyword extraction")
+    parser.add_argument("--id-field", default="id", help="Record id field/column")
+    parser.add_argument("--text-field", default="resume_text", help="Resume text field/column")
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="Records between checkpoints")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Resumes per task (shard with --nodes), scored as one batch")
+    parser.add_argument("--window-per-worker", type=int, default=4, help="In-flight chunks per worker (node with --nodes)")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="Seconds between progress reports")
+    return parser
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        stream=sys.stderr
+    )
+    return run(build_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+"""
+Admin authentication
+X-Admin-Token check shared by the debug and cluster diagnostics endpoints
+"""
+
+import hmac
+
+from fastapi import Header, HTTPException
+
+from app.core.config import settings
+
+
+async def require_admin(x_admin_token: str = Header("")):
+    """Hide the endpoint unless debug endpoints are enabled with a token, then require that token"""
+    if not settings.DEBUG_ENDPOINTS_ENABLED or not settings.DEBUG_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_admin_token.encode(), settings.DEBUG_ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
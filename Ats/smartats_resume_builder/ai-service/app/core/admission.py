@@ -0,0 +1,169 @@
+"""
+Admission control and load shedding
+Adaptive concurrency limit that degrades or rejects work before queues build up
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Route groups tracked by the controller, with their shedding priority.
+# Lower numbers are shed first. route_group takes the first matching prefix,
+# so batch paths must precede the single-request prefix they extend.
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+
+ROUTE_PRIORITIES = {
+    "/api/v1/score/batch": PRIORITY_NORMAL,
+    "/api/v1/match/batch": PRIORITY_LOW,
+    "/api/v1/analyze/batch": PRIORITY_LOW,
+    "/api/v1/score": PRIORITY_HIGH,
+    "/api/v1/match": PRIORITY_NORMAL,
+    "/api/v1/analyze": PRIORITY_NORMAL,
+    "/api/v1/optimize": PRIORITY_LOW,
+    "/api/v1/generate": PRIORITY_LOW,
+}
+
+# Routes that can run in a cheaper degraded mode instead of being rejected
+DEGRADABLE_ROUTES = {"/api/v1/analyze", "/api/v1/analyze/batch"}
+
+ADMIT = "admit"
+DEGRADE = "degrade"
+REJECT = "reject"
+
+ADMISSION_LIMIT = Gauge("admission_concurrency_limit", "Current adaptive concurrency limit")
+ADMISSION_INFLIGHT = Gauge("admission_inflight_requests", "In-flight requests", ["route"])
+ADMISSION_LATENCY = Gauge("admission_latency_ewma_seconds", "Recent request latency (EWMA)", ["route"])
+ADMISSION_DECISIONS = Counter("admission_decisions_total", "Admission decisions", ["route", "decision"])
+
+
+def route_group(path: str) -> Optional[str]:
+    """Map a request path to a bounded route group (None if not controlled)"""
+    for prefix in ROUTE_PRIORITIES:
+        if path.startswith(prefix):
+            return prefix
+    return None
+
+
+@dataclass
+class RouteStats:
+    """Per-route load statistics"""
+    inflight: int = 0
+    latency_ewma: float = 0.0
+    latency_baseline: float = 0.0
+
+
+class AdmissionController:
+    """
+    AIMD concurrency limiter with priority-based shedding
+
+    The limit grows by roughly one slot per limit's worth of healthy requests
+    and shrinks multiplicatively when a route's recent latency rises well above
+    its long-run baseline, so it tracks what the node can actually sustain.
+    As utilization (in-flight / limit) rises, low-priority routes are rejected
+    first, degradable routes switch to their cheap mode, and only when the
+    limit is reached is high-priority work turned away.
+    """
+
+    # Utilization thresholds per priority: (degrade at, reject at)
+    THRESHOLDS = {
+        PRIORITY_LOW: (0.6, 0.75),
+        PRIORITY_NORMAL: (0.7, 0.95),
+        PRIORITY_HIGH: (1.0, 1.0),
+    }
+
+    def __init__(
+        self,
+        initial_limit: int = None,
+        min_limit: int = None,
+        max_limit: int = None,
+        latency_tolerance: float = None
+    ):
+        self.min_limit = min_limit or settings.ADMISSION_MIN_LIMIT
+        self.max_limit = max_limit or settings.ADMISSION_MAX_LIMIT
+        self.limit = float(initial_limit or settings.ADMISSION_INITIAL_LIMIT)
+        self.latency_tolerance = latency_tolerance or settings.ADMISSION_LATENCY_TOLERANCE
+
+        self.inflight = 0
+        self.routes: Dict[str, RouteStats] = {route: RouteStats() for route in ROUTE_PRIORITIES}
+        self._last_decrease = 0.0
+        ADMISSION_LIMIT.set(self.limit)
+
+    @property
+    def utilization(self) -> float:
+        return self.inflight / self.limit
+
+    def admit(self, route: str) -> str:
+        """Decide whether to admit, degrade or reject a request"""
+        priority = ROUTE_PRIORITIES[route]
+        degrade_at, reject_at = self.THRESHOLDS[priority]
+        utilization = (self.inflight + 1) / self.limit
+
+        if utilization > reject_at:
+            decision = REJECT
+        elif utilization > degrade_at and route in DEGRADABLE_ROUTES:
+            decision = DEGRADE
+        else:
+            decision = ADMIT
+
+        ADMISSION_DECISIONS.labels(route=route, decision=decision).inc()
+        if decision != REJECT:
+            self.inflight += 1
+            self.routes[route].inflight += 1
+            ADMISSION_INFLIGHT.labels(route=route).set(self.routes[route].inflight)
+        return decision
+
+    def release(self, route: str, latency: float):
+        """Record completion of an admitted request and adapt the limit"""
+        self.inflight -= 1
+        stats = self.routes[route]
+        stats.inflight -= 1
+        ADMISSION_INFLIGHT.labels(route=route).set(stats.inflight)
+
+        if stats.latency_baseline == 0.0:
+            stats.latency_ewma = stats.latency_baseline = latency
+        else:
+            stats.latency_ewma += 0.2 * (latency - stats.latency_ewma)
+            stats.latency_baseline += 0.01 * (latency - stats.latency_baseline)
+        ADMISSION_LATENCY.labels(route=route).set(stats.latency_ewma)
+
+        now = time.monotonic()
+        if stats.latency_ewma > stats.latency_baseline * self.latency_tolerance:
+            # Back off at most once per second so one slow burst isn't counted repeatedly
+            if now - self._last_decrease >= 1.0:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        ADMISSION_LIMIT.set(self.limit)
+
+    def retry_after(self, route: str) -> int:
+        """Suggested client back-off in seconds for a rejected request"""
+        return max(1, int(self.routes[route].latency_ewma * 2 + 0.5))
+
+    def state(self) -> Dict:
+        """Snapshot of the controller for diagnostics"""
+        return {
+            "limit": round(self.limit, 2),
+            "inflight": self.inflight,
+            "utilization": round(self.utilization, 3),
+            "routes": {
+                route: {
+                    "inflight": stats.inflight,
+                    "latency_ewma": round(stats.latency_ewma, 4),
+                    "latency_baseline": round(stats.latency_baseline, 4)
+                }
+                for route, stats in self.routes.items()
+            }
+        }
+
+
+admission_controller = AdmissionController()
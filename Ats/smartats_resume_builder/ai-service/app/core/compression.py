@@ -0,0 +1,188 @@
+"""
+Content-negotiated response compression
+Chooses zstd, brotli or gzip from Accept-Encoding and skips small payloads
+"""
+
+import gzip
+import logging
+import zlib
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def available_encodings() -> List[str]:
+    """Supported encodings in order of preference"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """Pick the first of `encodings` the client accepts with a non-zero q-value"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name)
+
+    for encoding in encodings:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Replacement for GZipMiddleware with encoding negotiation
+
+    Complete bodies below `minimum_size` are sent uncompressed, since the
+    compression cost outweighs the bytes saved. Larger bodies (batch results)
+    use the best encoding both sides support. Streaming responses are gzipped
+    with a sync flush per chunk so NDJSON records still reach the client as
+    soon as they are produced.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000, gzip_level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate_encoding(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(
+            send,
+            encoding,
+            negotiate_encoding(accept_encoding, ["gzip"]) is not None,
+            self.minimum_size,
+            self.gzip_level
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Buffers the response start until the first body chunk decides the strategy"""
+
+    def __init__(
+        self,
+        send: Send,
+        encoding: str,
+        gzip_accepted: bool,
+        minimum_size: int,
+        gzip_level: int
+    ):
+        self._send = send
+        self.encoding = encoding
+        self.gzip_accepted = gzip_accepted
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.stream = None
+
+    async def send(self, message: Message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers
+            return
+
+        if message_type != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.stream is not None:
+            await self._send_stream_chunk(message)
+            return
+
+        if self.passthrough or self.start_message is None:
+            if self.start_message is not None:
+                await self._send(self.start_message)
+                self.start_message = None
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        start = self.start_message
+        self.start_message = None
+
+        if not more_body:
+            headers = MutableHeaders(raw=start["headers"])
+            if len(body) >= self.minimum_size:
+                body = compress(body, self.encoding, self.gzip_level)
+                headers["Content-Encoding"] = self.encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # The encoded bytes differ from the identity representation
+                    headers["ETag"] = "W/" + etag
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": body})
+            return
+
+        # Streaming body: incremental gzip, flushed per chunk
+        if not self.gzip_accepted:
+            self.passthrough = True
+            await self._send(start)
+            await self._send(message)
+            return
+
+        headers = MutableHeaders(raw=start["headers"])
+        headers["Content-Encoding"] = "gzip"
+        headers.add_vary_header("Accept-Encoding")
+        if "content-length" in headers:
+            del headers["Content-Length"]
+        self.stream = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        await self._send(start)
+        await self._send_stream_chunk(message)
+
+    async def _send_stream_chunk(self, message: Message):
+        more_body = message.get("more_body", False)
+        data = self.stream.compress(message.get("body", b""))
+        data += self.stream.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -0,0 +1,91 @@
+"""
+Conditional requests
+Strong ETags for deterministic endpoints and 304 responses for unchanged inputs
+
+This is a private contract with the service's own clients (the Node backend),
+not HTTP caching: the tagged endpoints are POSTs, whose responses HTTP caches
+never reuse, and RFC 9110 would answer a failed If-None-Match on a POST with
+412. A caller that keeps a result together with its ETag sends the tag back in
+If-None-Match with the same request body; 304 means the stored result is still
+what this request would return, so nothing is recomputed or re-sent.
+"""
+
+import hashlib
+import logging
+from collections import OrderedDict
+
+from prometheus_client import Counter
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONDITIONAL_REQUESTS = Counter(
+    "http_conditional_requests_total", "Requests carrying If-None-Match", ["endpoint", "outcome"]
+)
+
+
+def compute_etag(*parts: str) -> str:
+    """Strong entity tag over the inputs that fully determine a response"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _request_tags(request: Request):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+class ETagIndex:
+    """
+    Recently issued ETags (LRU)
+
+    Tags are hashes of the request input plus the scoring rules fingerprint,
+    so a client's tag can be checked without running anything. Only tags this
+    worker has actually issued for a successful result are honored, which
+    keeps error responses (and tags from other rule versions) from being
+    confirmed.
+    """
+
+    def __init__(self, max_size: int = None):
+        self.max_size = max_size or settings.ETAG_INDEX_SIZE
+        self._tags: "OrderedDict[str, None]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def not_modified(self, request: Request, etag: str, endpoint: str):
+        """304 response if the caller's stored result (see module docstring) is current, else None"""
+        tags = _request_tags(request)
+        if tags is None:
+            return None
+        if (etag in tags or "*" in tags) and etag in self._tags:
+            self._tags.move_to_end(etag)
+            CONDITIONAL_REQUESTS.labels(endpoint=endpoint, outcome="not_modified").inc()
+            return Response(status_code=304, headers=cache_headers(etag))
+        CONDITIONAL_REQUESTS.labels(endpoint=endpoint, outcome="modified").inc()
+        return None
+
+    def tag(self, response: Response, etag: str) -> Response:
+        """Attach validator headers and remember the tag"""
+        response.headers.update(cache_headers(etag))
+        self._tags[etag] = None
+        self._tags.move_to_end(etag)
+        while len(self._tags) > self.max_size:
+            self._tags.popitem(last=False)
+        return response
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": settings.ETAG_CACHE_CONTROL}
+
+
+etag_index = ETagIndex()
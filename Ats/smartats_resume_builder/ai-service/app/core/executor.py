@@ -0,0 +1,63 @@
+"""
+Shared executor for CPU-bound work
+Keeps scoring and keyword extraction off the event loop and tracks queue depth
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CPUExecutor:
+    """Thread pool wrapper that counts queued and running tasks"""
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or settings.MAX_WORKERS
+        self._pool = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="cpu-worker"
+            )
+        return self._pool
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` on the pool and await its result"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.queued += 1
+        return await loop.run_in_executor(
+            self.pool,
+            functools.partial(self._execute, fn, *args, **kwargs)
+        )
+
+    def _execute(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+cpu_executor = CPUExecutor()
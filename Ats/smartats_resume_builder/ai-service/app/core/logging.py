@@ -1,26 +1,136 @@
 """
 Structured logging configuration
+Non-blocking queue-based logging with per-call-site rate limiting and sampling
 """
 
+import atexit
 import logging
+import queue
+import random
 import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
 from pythonjsonlogger import jsonlogger
 from app.core.config import settings
 
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total", "Log records not written", ["reason", "level"]
+)
+LOG_QUEUE_DEPTH = Gauge("log_queue_depth", "Log records waiting for the writer thread")
+
+_listener: Optional[QueueListener] = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site (file and line), plus per-logger sampling
+
+    Keying on the call site rather than the message keeps the number of
+    buckets bounded even when messages embed request data. ERROR and above
+    are never limited or sampled.
+    """
+
+    def __init__(self, rate: float, burst: int, sample_rates: Dict[str, float] = None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        # Longest prefix first so "app.api.v1" overrides "app"
+        self.sample_rates = sorted((sample_rates or {}).items(), key=lambda item: -len(item[0]))
+        self._buckets: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def _sample_rate(self, name: str) -> float:
+        for prefix, rate in self.sample_rates:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+
+        if record.levelno <= logging.INFO and self.sample_rates:
+            if random.random() >= self._sample_rate(record.name):
+                LOG_RECORDS_DROPPED.labels(reason="sampled", level=record.levelname).inc()
+                return False
+
+        if self.rate <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                allowed = False
+            else:
+                bucket[0] = tokens - 1
+                allowed = True
+        if not allowed:
+            LOG_RECORDS_DROPPED.labels(reason="rate_limited", level=record.levelname).inc()
+        return allowed
+
+
+# Log arguments safe to format later on the listener thread
+_IMMUTABLE_ARGS = (str, int, float, bool, bytes, type(None))
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread without blocking the caller
+
+    Formatting is left to the listener thread: %-style arguments are merged
+    there, not on the event loop. Arguments that could change before then
+    (anything but immutable primitives) are merged here instead. When the
+    bounded queue is full the record is dropped and counted.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args.values() if isinstance(record.args, dict) else record.args or ()
+        if not isinstance(record.msg, str) or not all(isinstance(arg, _IMMUTABLE_ARGS) for arg in args):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info and not record.exc_text:
+            # Render tracebacks now, while the frames still describe the failure
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(reason="queue_full", level=record.levelname).inc()
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # Wait for room rather than lose the stop signal
+
 
 def setup_logging():
     """Configure structured logging"""
-    
+    global _listener
+
     # Create logger
     logger = logging.getLogger()
     logger.setLevel(getattr(logging, settings.LOG_LEVEL))
-    
+
     # Remove existing handlers
+    shutdown_logging()
     logger.handlers = []
-    
-    # Create handler
+
+    # Create handler (runs on the listener thread)
     handler = logging.StreamHandler(sys.stdout)
-    
+
     if settings.LOG_FORMAT == "json":
         # JSON formatter for production
         formatter = jsonlogger.JsonFormatter(
@@ -33,8 +143,30 @@ def setup_logging():
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
-    
+
     handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    
+
+    # Callers only enqueue; a background thread formats and writes
+    records = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    LOG_QUEUE_DEPTH.set_function(records.qsize)
+    queue_handler = NonBlockingQueueHandler(records)
+    queue_handler.addFilter(RateLimitFilter(
+        settings.LOG_RATE_LIMIT, settings.LOG_RATE_BURST, settings.LOG_SAMPLE_RATES
+    ))
+    logger.addHandler(queue_handler)
+
+    _listener = _Listener(records, handler, respect_handler_level=True)
+    _listener.start()
+
     return logger
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,102 @@
+"""
+Prometheus metrics
+HTTP, executor, event-loop and model metrics with bounded label cardinality
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.requests import Request
+
+from app.core.executor import cpu_executor
+
+logger = logging.getLogger(__name__)
+
+# Label used for requests that did not match any route (404 scans, redirects)
+UNMATCHED_ROUTE = "unmatched"
+
+# Quick endpoints finish in milliseconds; AI-backed and batch endpoints may take seconds
+# so they get their own histogram with a wider bucket range.
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+SLOW_ENDPOINTS = {
+    "/api/v1/analyze/", "/api/v1/optimize/", "/api/v1/generate/",
+    "/api/v1/score/batch", "/api/v1/analyze/batch", "/api/v1/match/batch",
+}
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "Total HTTP requests", ["method", "endpoint", "status"]
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request duration",
+    ["method", "endpoint"], buckets=FAST_BUCKETS
+)
+AI_REQUEST_DURATION = Histogram(
+    "http_ai_request_duration_seconds", "HTTP request duration of AI-backed endpoints",
+    ["method", "endpoint"], buckets=SLOW_BUCKETS
+)
+
+EXECUTOR_QUEUE_DEPTH = Gauge("executor_queue_depth", "Tasks waiting for a CPU worker")
+EXECUTOR_QUEUE_DEPTH.set_function(lambda: cpu_executor.queued)
+EXECUTOR_ACTIVE = Gauge("executor_active_tasks", "Tasks running on CPU workers")
+EXECUTOR_ACTIVE.set_function(lambda: cpu_executor.active)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Delay of scheduled event-loop callbacks",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+MODEL_MEMORY = Gauge("model_memory_bytes", "Memory held by loaded model parameters", ["model"])
+
+
+def endpoint_label(request: Request) -> str:
+    """Route template for a handled request, e.g. /api/v1/score/"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def observe_request(request: Request, status_code: int, duration: float):
+    """Record count and latency for a completed request"""
+    endpoint = endpoint_label(request)
+    REQUEST_COUNT.labels(method=request.method, endpoint=endpoint, status=status_code).inc()
+
+    histogram = AI_REQUEST_DURATION if endpoint in SLOW_ENDPOINTS else REQUEST_DURATION
+    histogram.labels(method=request.method, endpoint=endpoint).observe(duration)
+
+
+def update_model_memory(model_manager):
+    """Publish per-model memory usage from a ModelManager"""
+    for name, size in model_manager.memory_usage().items():
+        MODEL_MEMORY.labels(model=name).set(size)
+
+
+class EventLoopLagMonitor:
+    """Measures how late a periodic sleep wakes up, i.e. how blocked the loop is"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - start - self.interval))
+
+
+event_loop_monitor = EventLoopLagMonitor()
@@ -0,0 +1,211 @@
+"""
+On-demand profiling
+Stack sampling profiler and tracemalloc snapshots for live workers
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Top frames of a thread that is waiting, not working
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("socket.py", "accept"),
+}
+_THREAD_SUFFIX_RE = re.compile(r"[-_]\d+$")
+
+
+class ProfilerBusy(RuntimeError):
+    """A profile is already running"""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of every thread from a background thread
+
+    At each tick `sys._current_frames()` is read and each stack is collapsed
+    into one "thread;outer;...;inner" line, the input format of flamegraph
+    tools. Nothing is installed in the sampled threads (no tracing hooks or
+    signals), so overhead is bounded by the sampling rate and only exists
+    while a profile runs. One profile runs at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def profile(self, seconds: float, hz: int = 100, include_idle: bool = False) -> Dict:
+        """Sample for `seconds` (blocking) and return collapsed stacks with counts"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            return self._sample(seconds, hz, include_idle)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, hz: int, include_idle: bool) -> Dict:
+        interval = 1.0 / hz
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = idle = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if not include_idle:
+                    code = frame.f_code
+                    if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                        idle += 1
+                        continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                # Pool threads share one root so their samples merge
+                thread = _THREAD_SUFFIX_RE.sub("", names.get(ident, str(ident)))
+                stacks[thread + ";" + ";".join(reversed(labels))] += 1
+                samples += 1
+            time.sleep(max(0.0, interval - (time.perf_counter() - now)))
+
+        return {
+            "duration": round(time.perf_counter() - started, 3),
+            "hz": hz,
+            "samples": samples,
+            "idle_samples": idle,
+            "stacks": stacks,
+        }
+
+    @staticmethod
+    def collapsed(stacks: Counter) -> str:
+        """Brendan Gregg's collapsed format: one 'frame;frame;frame count' per line"""
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+class MemoryTracer:
+    """tracemalloc control with a stored baseline snapshot for diffs"""
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.warning(f"tracemalloc started ({frames} frames); allocations are slower until stopped")
+
+    def stop(self):
+        with self._lock:
+            self._baseline = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc stopped")
+
+    @staticmethod
+    def _take() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def _require_tracing(self):
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+
+    def snapshot(self, limit: int = 25, group_by: str = "lineno") -> Dict:
+        """Top allocation sites now; the snapshot becomes the baseline for `diff`"""
+        self._require_tracing()
+        snapshot = self._take()
+        with self._lock:
+            self._baseline = snapshot
+        stats = snapshot.statistics(group_by)
+        return {
+            **self.traced(),
+            "top": [
+                {
+                    "site": _format_traceback(stat.traceback),
+                    "size": stat.size,
+                    "count": stat.count,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+    def diff(self, limit: int = 25, group_by: str = "lineno") -> Dict:
+        """Top allocation growth since the baseline snapshot"""
+        self._require_tracing()
+        with self._lock:
+            baseline = self._baseline
+        if baseline is None:
+            raise RuntimeError("No baseline snapshot; take one first")
+        stats = self._take().compare_to(baseline, group_by)
+        return {
+            **self.traced(),
+            "top": [
+                {
+                    "site": _format_traceback(stat.traceback),
+                    "size": stat.size,
+                    "size_diff": stat.size_diff,
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+    @staticmethod
+    def traced() -> Dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {"tracing": tracemalloc.is_tracing(), "traced_bytes": current, "traced_peak_bytes": peak}
+
+
+def _format_traceback(traceback: tracemalloc.Traceback) -> List[str]:
+    return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+
+def process_memory() -> Dict[str, int]:
+    """Resident and peak memory of this process in bytes"""
+    usage = {}
+    try:
+        with open("/proc/self/statm") as f:
+            usage["rss_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    return usage
+
+
+stack_sampler = StackSampler()
+memory_tracer = MemoryTracer()
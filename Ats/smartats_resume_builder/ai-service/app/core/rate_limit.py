@@ -0,0 +1,268 @@
+"""
+Per-client rate limiting
+Token buckets keyed by API key or client IP, with an optional Redis backend
+"""
+
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from prometheus_client import Counter
+from starlette.requests import HTTPConnection, Request
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Token cost per endpoint prefix (first match wins). Quick scoring is cheap;
+# analysis, optimization and generation may call an LLM and keep the CPU busy
+# far longer. Batch costs are per item: the middleware takes one item's worth
+# and the endpoint charges the rest once the body is parsed (`charge`). Live
+# scoring WebSockets bypass HTTP middleware and charge the connection and each
+# score themselves.
+ENDPOINT_COSTS = {
+    "/api/v1/score/batch": 1,
+    "/api/v1/match/batch": 2,
+    "/api/v1/analyze/batch": 5,
+    "/api/v1/score": 1,
+    "/api/v1/match": 2,
+    "/api/v1/analyze": 5,
+    "/api/v1/optimize": 5,
+    "/api/v1/generate": 5,
+    "/api/v1/jobs": 2,
+    "/api/v1/search": 2,
+    "/api/v1/live": 1,
+}
+
+RATE_LIMIT_BACKEND_ERRORS = Counter(
+    "rate_limit_backend_errors_total", "Redis rate limit checks that failed and used local buckets"
+)
+
+# Paths that are never rate limited
+EXEMPT_PATHS = {"/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json"}
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a rate limit check"""
+    allowed: bool
+    remaining: int
+    retry_after: int = 0  # seconds
+
+
+def endpoint_cost(path: str) -> int:
+    """Token cost of a request path (0 for exempt paths)"""
+    if path in EXEMPT_PATHS:
+        return 0
+    for prefix, cost in ENDPOINT_COSTS.items():
+        if path.startswith(prefix):
+            return cost
+    return 1
+
+
+def client_key(request: HTTPConnection) -> str:
+    """Identify the caller by API key (hashed) or client IP"""
+    api_key = request.headers.get("x-api-key")
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:32]
+
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        # Each proxy appends the address it received the request from, so only the
+        # entry added by the outermost trusted proxy is reliable; anything left of
+        # it came from the client and could be rotated to get fresh buckets
+        hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",")]
+        hops = [hop for hop in hops if hop]
+        trusted = max(1, settings.RATE_LIMIT_TRUSTED_PROXIES)
+        if len(hops) >= trusted:
+            return "ip:" + hops[-trusted]
+
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+class InMemoryRateLimitBackend:
+    """
+    Process-local token buckets
+
+    Each client has a per-minute and a per-hour bucket; a request must fit in
+    both. Lookups are O(1) and the number of tracked clients is bounded by LRU
+    eviction (an evicted client simply starts again with full buckets).
+    """
+
+    def __init__(self, per_minute: int, per_hour: int, max_clients: int = 100000):
+        self.limits = ((per_minute, per_minute / 60.0), (per_hour, per_hour / 3600.0))
+        self.max_clients = max_clients
+        self.buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def acquire(self, key: str, cost: int) -> RateLimitResult:
+        return self.acquire_sync(key, cost, time.monotonic())
+
+    def acquire_sync(self, key: str, cost: int, now: float) -> RateLimitResult:
+        state = self.buckets.get(key)
+        if state is None:
+            state = [float(capacity) for capacity, _ in self.limits] + [now]
+            self.buckets[key] = state
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+
+        elapsed = now - state[-1]
+        state[-1] = now
+
+        retry_after = 0.0
+        for i, (capacity, rate) in enumerate(self.limits):
+            state[i] = min(capacity, state[i] + elapsed * rate)
+            if state[i] < cost:
+                retry_after = max(retry_after, (cost - state[i]) / rate)
+
+        if retry_after > 0:
+            return RateLimitResult(False, int(min(state[:-1])), math.ceil(retry_after))
+
+        for i in range(len(self.limits)):
+            state[i] -= cost
+        return RateLimitResult(True, int(min(state[:-1])))
+
+
+# Atomic token bucket update: KEYS[1] = bucket hash, ARGV = cost, then
+# capacity/rate pairs. Uses the Redis server clock so all workers agree.
+_TOKEN_BUCKET_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local last = tonumber(redis.call('HGET', KEYS[1], 'ts') or now)
+local elapsed = math.max(0, now - last)
+local tokens = {}
+local retry = 0
+local remaining = -1
+local ttl = 0
+for i = 2, #ARGV, 2 do
+    local capacity = tonumber(ARGV[i])
+    local rate = tonumber(ARGV[i + 1])
+    local field = 'b' .. i
+    local current = tonumber(redis.call('HGET', KEYS[1], field) or capacity)
+    current = math.min(capacity, current + elapsed * rate)
+    if current < cost then
+        retry = math.max(retry, (cost - current) / rate)
+    end
+    tokens[field] = current
+    ttl = math.max(ttl, math.ceil(capacity / rate))
+end
+for field, current in pairs(tokens) do
+    if retry == 0 then current = current - cost end
+    redis.call('HSET', KEYS[1], field, current)
+    if remaining < 0 or current < remaining then remaining = current end
+end
+redis.call('HSET', KEYS[1], 'ts', now)
+redis.call('EXPIRE', KEYS[1], ttl)
+return {retry == 0 and 1 or 0, math.floor(remaining), math.ceil(retry)}
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Token buckets shared by all workers through Redis
+
+    The whole refill-and-take step runs in one Lua script, so concurrent
+    workers cannot double-spend tokens. If Redis fails or times out the check
+    fails open to process-local buckets instead of failing requests, and
+    Redis is left alone for `retry_interval` seconds so an outage does not
+    add a timeout to every request.
+    """
+
+    def __init__(
+        self,
+        client,
+        per_minute: int,
+        per_hour: int,
+        prefix: str = "ratelimit:",
+        retry_interval: float = None
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.args = [per_minute, per_minute / 60.0, per_hour, per_hour / 3600.0]
+        self.script = client.register_script(_TOKEN_BUCKET_SCRIPT)
+        self.fallback = InMemoryRateLimitBackend(per_minute, per_hour)
+        self.retry_interval = settings.RATE_LIMIT_REDIS_RETRY if retry_interval is None else retry_interval
+        self._retry_at = 0.0
+
+    async def acquire(self, key: str, cost: int) -> RateLimitResult:
+        if time.monotonic() < self._retry_at:
+            return await self.fallback.acquire(key, cost)
+        try:
+            allowed, remaining, retry_after = await self.script(
+                keys=[self.prefix + key],
+                args=[cost] + self.args
+            )
+            return RateLimitResult(bool(allowed), int(remaining), int(retry_after))
+        except Exception as e:
+            RATE_LIMIT_BACKEND_ERRORS.inc()
+            self._retry_at = time.monotonic() + self.retry_interval
+            logger.warning("Redis rate limit check failed, using local buckets: %s", e)
+            return await self.fallback.acquire(key, cost)
+
+
+class RateLimiter:
+    """Applies endpoint costs to the configured bucket backend"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.rejected = 0
+
+    def _create_backend(self):
+        per_minute = settings.RATE_LIMIT_PER_MINUTE
+        per_hour = settings.RATE_LIMIT_PER_HOUR
+
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            try:
+                import redis.asyncio as redis
+
+                # Short timeouts: a slow Redis must not hold up every request
+                client = redis.from_url(
+                    settings.REDIS_URL,
+                    socket_connect_timeout=settings.RATE_LIMIT_REDIS_CONNECT_TIMEOUT,
+                    socket_timeout=settings.RATE_LIMIT_REDIS_TIMEOUT
+                )
+                logger.info("Rate limiting with shared Redis buckets")
+                return RedisRateLimitBackend(client, per_minute, per_hour)
+            except Exception as e:
+                logger.warning("Redis rate limit backend unavailable: %s", e)
+
+        return InMemoryRateLimitBackend(per_minute, per_hour)
+
+    async def check(self, request: Request) -> Tuple[Optional[RateLimitResult], int]:
+        """Take tokens for a request; returns (result, cost), result None if exempt"""
+        # CORS preflights (and any other OPTIONS) do no work
+        if request.method == "OPTIONS":
+            return None, 0
+        cost = endpoint_cost(request.url.path)
+        if cost == 0:
+            return None, 0
+        cost = self.clamp(cost)
+        return await self._acquire(request, cost), cost
+
+    async def charge(self, request: HTTPConnection, cost: int) -> Optional[RateLimitResult]:
+        """Take further tokens for an admitted request, e.g. the remaining items of a batch"""
+        if not settings.RATE_LIMIT_ENABLED or cost <= 0:
+            return None
+        return await self._acquire(request, cost)
+
+    @staticmethod
+    def clamp(cost: int) -> int:
+        # A cost above the bucket size could never be satisfied
+        return min(cost, settings.RATE_LIMIT_PER_MINUTE, settings.RATE_LIMIT_PER_HOUR)
+
+    async def _acquire(self, request: HTTPConnection, cost: int) -> RateLimitResult:
+        if self.backend is None:
+            self.backend = self._create_backend()
+
+        result = await self.backend.acquire(client_key(request), cost)
+        if not result.allowed:
+            self.rejected += 1
+        return result
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,32 @@
+"""
+Response helpers
+Fast JSON rendering for responses the service builds itself
+"""
+
+import logging
+from typing import Type
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson  # noqa: F401
+    FastJSONResponse = ORJSONResponse
+except ImportError:
+    logger.info("orjson not installed, using standard JSON responses")
+    FastJSONResponse = JSONResponse
+
+
+def model_response(model: Type[BaseModel], status_code: int = 200, **fields) -> JSONResponse:
+    """
+    Render a response model from trusted data without re-validating it
+
+    Returning a model from an endpoint makes FastAPI validate it again against
+    `response_model` before serializing. For payloads assembled from our own
+    scorer output that work is redundant, so construct the model unvalidated
+    and hand the dumped dict straight to the (orjson) renderer.
+    """
+    content = model.model_construct(**fields).model_dump()
+    return FastJSONResponse(content=content, status_code=status_code)
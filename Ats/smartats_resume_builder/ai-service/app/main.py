@@ -3,28 +3,39 @@ SmartATS AI Service - FastAPI Application
 Enterprise-grade AI service for resume analysis and optimization
 """
 
-from fastapi import FastAPI, Request
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from contextlib import asynccontextmanager
+import asyncio
+import os
 import time
 import logging
-from prometheus_client import Counter, Histogram, generate_latest
+from prometheus_client import generate_latest
 from prometheus_client import CONTENT_TYPE_LATEST
 
 from app.core.config import settings
 from app.core.logging import setup_logging
+from app.core.admin import require_admin
+from app.core.rate_limit import rate_limiter
+from app.core.admission import admission_controller, route_group, DEGRADE, REJECT
+from app.core.executor import cpu_executor
+from app.core.compression import CompressionMiddleware
+from app.core.metrics import observe_request, update_model_memory, event_loop_monitor
+from app.core.profiling import ProfilerBusy, stack_sampler, memory_tracer, process_memory
+from app.services.ai.model_manager import model_manager
+from app.services.ats.bullet_quality import bullet_quality
+from app.services.ai.llm_router import llm_router
+from app.services.ats.rules import scoring_rules
+from app.services.search.inverted_index import search_index
 from app.api.v1.router import api_router
+from app.api.rpc import rpc_server
+from app.services.cluster.coordinator import batch_coordinator
 
 # Setup logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
-# Prometheus metrics
-REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'])
-REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP request duration')
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
@@ -34,17 +45,59 @@ async def lifespan(app: FastAPI):
     
     # Initialize AI models on startup
     try:
-        from app.services.ai.model_manager import ModelManager
-        model_manager = ModelManager()
         await model_manager.load_models()
+        update_model_memory(model_manager)
         logger.info("✅ AI models loaded successfully")
+        # Embed the bullet quality prototypes before the first analysis
+        if await cpu_executor.run(bullet_quality.warm):
+            logger.info("✅ Bullet quality prototypes ready")
     except Exception as e:
         logger.error(f"❌ Failed to load AI models: {e}")
     
+    event_loop_monitor.start()
+    
+    # Load ATS scoring rules and watch the file for edits
+    await scoring_rules.start()
+    logger.info(f"📐 Scoring rules {scoring_rules.current.fingerprint}")
+    
+    # Start batched analytics writer
+    if settings.ANALYTICS_ENABLED:
+        from app.services.analytics.sink import analytics_sink
+        await analytics_sink.start()
+    
+    # Reopen the recruiter search index snapshot (memory-mapped)
+    if settings.SEARCH_INDEX_ENABLED and os.path.exists(settings.SEARCH_INDEX_PATH):
+        try:
+            search_index.load(settings.SEARCH_INDEX_PATH)
+        except Exception as e:
+            logger.error(f"❌ Failed to load search index: {e}")
+    if settings.SEARCH_INDEX_ENABLED:
+        await search_index.start(settings.SEARCH_INDEX_PATH)
+    
+    # Internal binary RPC listeners for co-located services
+    if settings.INTERNAL_RPC_ENABLED:
+        await rpc_server.start()
+    
     yield
     
     # Cleanup on shutdown
     logger.info("👋 Shutting down SmartATS AI Service")
+    await rpc_server.stop()
+    await batch_coordinator.close()
+    if settings.ANALYTICS_ENABLED:
+        await analytics_sink.stop()
+    await event_loop_monitor.stop()
+    await scoring_rules.stop()
+    await search_index.stop()
+    if settings.SEARCH_INDEX_ENABLED and search_index.pending_changes \
+            and search_index.acquire_writer(settings.SEARCH_INDEX_PATH):
+        try:
+            search_index.snapshot(settings.SEARCH_INDEX_PATH)
+        except Exception as e:
+            logger.error(f"❌ Failed to write search index snapshot: {e}")
+    await llm_router.close()
+    memory_tracer.stop()
+    cpu_executor.shutdown()
 
 # Create FastAPI application
 app = FastAPI(
@@ -56,36 +109,119 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# CORS middleware
+# Middleware: the last one registered runs outermost. CORS and timing wrap
+# everything, so 429/503 responses still carry CORS headers and are measured.
+
+# Admission control middleware
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    route = route_group(request.url.path) if settings.ADMISSION_ENABLED else None
+    if route is None:
+        return await call_next(request)
+    
+    decision = admission_controller.admit(route)
+    if decision == REJECT:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "error": "Service overloaded",
+                "message": "The service is at capacity, please retry shortly"
+            },
+            headers={"Retry-After": str(admission_controller.retry_after(route))}
+        )
+    
+    # Endpoints check this flag to skip expensive optional work
+    request.state.degraded = decision == DEGRADE
+    start_time = time.perf_counter()
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            admission_controller.release(route, time.perf_counter() - start_time)
+
+    try:
+        response = await call_next(request)
+    except BaseException:
+        release()
+        raise
+
+    # call_next returns once headers are ready; streamed batches keep working
+    # until the body is drained, so hold the slot until then
+    body_iterator = response.body_iterator
+
+    async def body():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            release()
+
+    response.body_iterator = body()
+    if request.state.degraded:
+        response.headers["X-Degraded"] = "true"
+    return response
+
+# Rate limiting middleware (outside admission control: rejected requests take no slot)
+@app.middleware("http")
+async def enforce_rate_limit(request: Request, call_next):
+    if not settings.RATE_LIMIT_ENABLED:
+        return await call_next(request)
+    
+    result, cost = await rate_limiter.check(request)
+    if result is None:
+        return await call_next(request)
+    
+    if not result.allowed:
+        return JSONResponse(
+            status_code=429,
+            content={
+                "error": "Rate limit exceeded",
+                "message": f"Too many requests, retry after {result.retry_after} seconds"
+            },
+            headers={
+                "Retry-After": str(result.retry_after),
+                "X-RateLimit-Remaining": str(result.remaining)
+            }
+        )
+    
+    response = await call_next(request)
+    # Batch endpoints charge their remaining items themselves
+    remaining, cost = getattr(request.state, "rate_limit", (result.remaining, cost))
+    response.headers["X-RateLimit-Remaining"] = str(remaining)
+    response.headers["X-RateLimit-Cost"] = str(cost)
+    return response
+
+# Compression middleware (zstd/br/gzip by Accept-Encoding, small payloads uncompressed)
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL
 )
 
-# Compression middleware
-app.add_middleware(GZipMiddleware, minimum_size=1000)
-
 # Request timing middleware
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
+    start_time = time.perf_counter()
     response = await call_next(request)
-    process_time = time.time() - start_time
+    process_time = time.perf_counter() - start_time
     response.headers["X-Process-Time"] = str(process_time)
     
-    # Record metrics
-    REQUEST_COUNT.labels(
-        method=request.method,
-        endpoint=request.url.path,
-        status=response.status_code
-    ).inc()
-    REQUEST_DURATION.observe(process_time)
+    # Record metrics (labelled by route template, not raw path)
+    observe_request(request, response.status_code, process_time)
     
     return response
 
+# CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=settings.CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
 # Exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -113,11 +249,89 @@ async def health_check():
 @app.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint"""
-    return generate_latest()
+    # Pass the content type as a header so Starlette doesn't append a second charset
+    return Response(content=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
+# Debug endpoints (admin only, off unless DEBUG_ENDPOINTS_ENABLED and a token is set)
+debug_router = APIRouter(prefix="/debug", dependencies=[Depends(require_admin)], include_in_schema=False)
+
+async def _in_thread(fn, *args):
+    # Not cpu_executor: a profile must not occupy (or be queued behind) the workers it measures
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+@debug_router.get("/profile")
+async def debug_profile(
+    seconds: float = Query(10.0, gt=0),
+    hz: int = Query(100, gt=0),
+    include_idle: bool = False,
+    format: str = Query("collapsed", pattern="^(collapsed|json)$")
+):
+    """Sample all thread stacks for N seconds; collapsed output feeds flamegraph.pl / speedscope"""
+    seconds = min(seconds, settings.DEBUG_PROFILE_MAX_SECONDS)
+    hz = min(hz, settings.DEBUG_PROFILE_MAX_HZ)
+    try:
+        result = await _in_thread(stack_sampler.profile, seconds, hz, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if format == "json":
+        return {**result, "stacks": dict(result["stacks"].most_common())}
+    return PlainTextResponse(
+        stack_sampler.collapsed(result["stacks"]),
+        headers={"X-Profile-Samples": str(result["samples"]), "X-Profile-Duration": str(result["duration"])}
+    )
+
+@debug_router.post("/memory/start")
+async def debug_memory_start(frames: int = Query(1, ge=1, le=50)):
+    """Start tracemalloc (slows allocations until stopped)"""
+    memory_tracer.start(frames)
+    return memory_tracer.traced()
+
+@debug_router.post("/memory/stop")
+async def debug_memory_stop():
+    memory_tracer.stop()
+    return memory_tracer.traced()
+
+@debug_router.post("/memory/snapshot")
+async def debug_memory_snapshot(
+    limit: int = Query(25, ge=1, le=500),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")
+):
+    """Top allocation sites; also becomes the baseline for /memory/diff"""
+    try:
+        return await _in_thread(memory_tracer.snapshot, limit, group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@debug_router.get("/memory/diff")
+async def debug_memory_diff(
+    limit: int = Query(25, ge=1, le=500),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")
+):
+    """Allocation growth since the last snapshot"""
+    try:
+        return await _in_thread(memory_tracer.diff, limit, group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@debug_router.get("/memory")
+async def debug_memory():
+    """Process memory, tracemalloc totals and per-model parameter memory"""
+    return {
+        **process_memory(),
+        **memory_tracer.traced(),
+        "models": model_manager.memory_usage(),
+    }
+
+if settings.DEBUG_ENDPOINTS_ENABLED:
+    if settings.DEBUG_ADMIN_TOKEN:
+        app.include_router(debug_router)
+    else:
+        logger.warning("DEBUG_ENDPOINTS_ENABLED is set without DEBUG_ADMIN_TOKEN; debug endpoints disabled")
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -0,0 +1,336 @@
+"""
+LLM Router
+Latency-aware routing, hedged requests and circuit breaking across LLM providers
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import httpx
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LLM_REQUESTS = Counter("llm_requests_total", "LLM provider calls", ["provider", "outcome"])
+LLM_HEDGES = Counter("llm_hedged_requests_total", "Backup requests sent after the hedge deadline", ["provider"])
+LLM_LATENCY = Gauge("llm_latency_p95_seconds", "Recent p95 latency of successful calls", ["provider"])
+LLM_BREAKER_OPEN = Gauge("llm_circuit_open", "1 while a provider's circuit breaker is open", ["provider"])
+
+
+class LLMUnavailableError(Exception):
+    """No provider could serve the request"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Opens after `failure_threshold` failures in a row; after `reset_timeout`
+    one probe request is let through (half-open) and its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def is_available(self) -> bool:
+        """Whether `allow()` would currently let a request through, without using up the probe"""
+        return self.opened_at is None or time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def allow(self) -> bool:
+        """Admit a request; claims the half-open probe, so call only when dispatching"""
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at >= self.reset_timeout:
+            # At most one probe per reset_timeout
+            self.opened_at = now
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+class LatencyTracker:
+    """Recent latencies of successful calls (window + EWMA)"""
+
+    def __init__(self, window: int = 200, alpha: float = 0.2):
+        self.samples = deque(maxlen=window)
+        self.alpha = alpha
+        self.ewma = 0.0
+
+    def record(self, latency: float):
+        self.samples.append(latency)
+        self.ewma = latency if len(self.samples) == 1 else (1 - self.alpha) * self.ewma + self.alpha * latency
+
+    def percentile(self, q: float) -> Optional[float]:
+        # Too few samples for a meaningful tail estimate
+        if len(self.samples) < 20:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class LLMProvider:
+    """Base provider: one long-lived pooled HTTP client plus health state"""
+
+    name = "provider"
+
+    def __init__(self, api_key: str, model: str, base_url: str):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET)
+        self.latency = LatencyTracker()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers(),
+                timeout=settings.LLM_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+                )
+            )
+        return self._client
+
+    def headers(self) -> Dict[str, str]:
+        raise NotImplementedError
+
+    async def complete(self, prompt: str, max_tokens: int, temperature: float, system: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    def hedge_delay(self) -> float:
+        """How long to wait before sending a backup request elsewhere"""
+        p = self.latency.percentile(settings.LLM_HEDGE_PERCENTILE)
+        return max(settings.LLM_HEDGE_MIN_DELAY, p) if p is not None else settings.LLM_HEDGE_INITIAL_DELAY
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    async def complete(self, prompt: str, max_tokens: int, temperature: float, system: Optional[str] = None) -> str:
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            # Identical leading messages are cached automatically by the API
+            messages.insert(0, {"role": "system", "content": system})
+        response = await self.client.post("/chat/completions", json={
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        })
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"].strip()
+
+
+class AnthropicProvider(LLMProvider):
+    name = "anthropic"
+
+    def headers(self) -> Dict[str, str]:
+        return {"x-api-key": self.api_key, "anthropic-version": "2023-06-01"}
+
+    async def complete(self, prompt: str, max_tokens: int, temperature: float, system: Optional[str] = None) -> str:
+        body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": min(temperature, 1.0)
+        }
+        if system:
+            body["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        response = await self.client.post("/v1/messages", json=body)
+        response.raise_for_status()
+        return "".join(
+            block.get("text", "") for block in response.json()["content"] if block.get("type") == "text"
+        ).strip()
+
+
+def create_providers() -> List[LLMProvider]:
+    """Configured providers (those with an API key), in preference order"""
+    available = {
+        "openai": lambda: OpenAIProvider(settings.OPENAI_API_KEY, settings.OPENAI_MODEL, settings.OPENAI_BASE_URL),
+        "anthropic": lambda: AnthropicProvider(
+            settings.ANTHROPIC_API_KEY, settings.ANTHROPIC_MODEL, settings.ANTHROPIC_BASE_URL
+        ),
+    }
+    keys = {"openai": settings.OPENAI_API_KEY, "anthropic": settings.ANTHROPIC_API_KEY}
+
+    providers = []
+    for name in settings.LLM_PROVIDERS:
+        if name not in available:
+            logger.warning(f"Unknown LLM provider in LLM_PROVIDERS: {name}")
+        elif keys[name]:
+            providers.append(available[name]())
+    return providers
+
+
+class LLMRouter:
+    """
+    Routes completions across providers
+
+    The primary is the healthy provider with the lowest recent latency. If it
+    has not answered by its p95 deadline, the same request is hedged to the
+    next provider and whichever answers first wins; the other call is
+    cancelled. A failed call falls over to the next provider immediately.
+    Providers whose circuit breaker is open are skipped.
+    """
+
+    def __init__(self, providers: Optional[List[LLMProvider]] = None):
+        self._providers = providers
+
+    @property
+    def providers(self) -> List[LLMProvider]:
+        if self._providers is None:
+            self._providers = create_providers()
+            logger.info(f"LLM providers: {[p.name for p in self._providers] or 'none'}")
+        return self._providers
+
+    @property
+    def available(self) -> bool:
+        return bool(self.providers)
+
+    def _candidates(self) -> List[LLMProvider]:
+        healthy = [p for p in self.providers if p.breaker.is_available()]
+        order = {p.name: i for i, p in enumerate(self.providers)}
+        # Providers without samples sort first so they get measured
+        return sorted(healthy, key=lambda p: (p.latency.ewma, order[p.name]))
+
+    async def _call(
+        self,
+        provider: LLMProvider,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        system: Optional[str]
+    ) -> str:
+        start = time.perf_counter()
+        try:
+            result = await provider.complete(prompt, max_tokens, temperature, system)
+        except asyncio.CancelledError:
+            LLM_REQUESTS.labels(provider=provider.name, outcome="cancelled").inc()
+            raise
+        except Exception:
+            provider.breaker.record_failure()
+            LLM_BREAKER_OPEN.labels(provider=provider.name).set(int(provider.breaker.is_open))
+            LLM_REQUESTS.labels(provider=provider.name, outcome="error").inc()
+            raise
+
+        provider.latency.record(time.perf_counter() - start)
+        provider.breaker.record_success()
+        LLM_BREAKER_OPEN.labels(provider=provider.name).set(0)
+        LLM_REQUESTS.labels(provider=provider.name, outcome="success").inc()
+        p95 = provider.latency.percentile(95)
+        if p95 is not None:
+            LLM_LATENCY.labels(provider=provider.name).set(p95)
+        return result
+
+    async def complete(
+        self,
+        prompt: str,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        system: Optional[str] = None
+    ) -> str:
+        """
+        Run a single-turn completion on the best available provider
+
+        `system` should be a stable prefix shared across requests so provider
+        prompt caching applies.
+
+        Raises:
+            LLMUnavailableError: if every provider failed or is circuit-open
+        """
+        candidates = self._candidates()
+        if not candidates:
+            raise LLMUnavailableError("No LLM provider available")
+
+        pending: Dict[asyncio.Task, LLMProvider] = {}
+        errors = []
+
+        def launch() -> Optional[LLMProvider]:
+            # Another request may have taken a half-open provider's probe since ordering
+            while candidates:
+                provider = candidates.pop(0)
+                if provider.breaker.allow():
+                    task = asyncio.create_task(self._call(provider, prompt, max_tokens, temperature, system))
+                    pending[task] = provider
+                    return provider
+            return None
+
+        if launch() is None:
+            raise LLMUnavailableError("No LLM provider available")
+        try:
+            while pending:
+                # Only hedge while a backup is left and nothing has failed over yet
+                timeout = None
+                if candidates and settings.LLM_HEDGE_ENABLED and len(pending) == 1:
+                    timeout = next(iter(pending.values())).hedge_delay()
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    backup = launch()
+                    if backup is not None:
+                        LLM_HEDGES.labels(provider=backup.name).inc()
+                        logger.info("Hedging LLM request to %s", backup.name)
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(f"{provider.name}: {task.exception()!r}")
+                    logger.warning(f"LLM provider {provider.name} failed: {task.exception()}")
+
+                if not pending:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        raise LLMUnavailableError("; ".join(errors))
+
+    async def close(self):
+        for provider in self._providers or []:
+            await provider.close()
+
+
+llm_router = LLMRouter()
@@ -4,7 +4,7 @@ Handles loading and caching of AI models
 """
 
 import logging
-from typing import Optional
+from typing import Dict, Optional
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -35,13 +35,33 @@ class ModelManager:
     
     async def _load_sentence_transformer(self):
         """Load sentence transformer model for embeddings"""
+        model_name = settings.SENTENCE_TRANSFORMER_MODEL
+        
+        if settings.EMBEDDING_BACKEND == "onnx-int8":
+            try:
+                from app.services.ai.onnx_encoder import load_quantized_encoder
+                
+                self.models['sentence_transformer'] = load_quantized_encoder(
+                    model_name,
+                    settings.MODEL_CACHE_DIR,
+                    threads=settings.EMBEDDING_THREADS or 1,
+                    min_cosine=settings.EMBEDDING_MIN_COSINE
+                )
+                logger.info("Sentence transformer loaded (ONNX int8)")
+                return
+            except Exception as e:
+                logger.warning(f"ONNX int8 encoder unavailable, using PyTorch: {e}")
+        
         try:
+            import torch
             from sentence_transformers import SentenceTransformer
             
-            model_name = settings.SENTENCE_TRANSFORMER_MODEL
+            # Only when configured: torch's own default suits a single encode at a time
+            if settings.EMBEDDING_THREADS:
+                torch.set_num_threads(settings.EMBEDDING_THREADS)
             logger.info(f"Loading sentence transformer: {model_name}")
             
-            self.models['sentence_transformer'] = SentenceTransformer(model_name)
+            self.models['sentence_transformer'] = SentenceTransformer(model_name, device="cpu")
             logger.info("Sentence transformer loaded")
             
         except Exception as e:
@@ -50,3 +70,19 @@ class ModelManager:
     def get_model(self, model_name: str) -> Optional[any]:
         """Get a loaded model by name"""
         return self.models.get(model_name)
+    
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate parameter memory (bytes) of each loaded model"""
+        usage = {}
+        for name, model in self.models.items():
+            try:
+                if hasattr(model, "memory_bytes"):
+                    usage[name] = model.memory_bytes
+                    continue
+                usage[name] = sum(p.numel() * p.element_size() for p in model.parameters())
+            except Exception:
+                usage[name] = 0
+        return usage
+
+
+model_manager = ModelManager()
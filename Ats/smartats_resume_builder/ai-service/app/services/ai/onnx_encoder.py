@@ -0,0 +1,278 @@
+"""
+ONNX Sentence Encoder
+Int8-quantized ONNX Runtime replacement for SentenceTransformer on CPU-only nodes
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from typing import List, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = "model-int8.onnx"
+METADATA_FILE = "metadata.json"
+REFERENCE_FILE = "reference.npy"
+FORMAT_VERSION = 1
+OPSET_VERSION = 14
+
+# Fixed corpus the quantized model must agree on with the original model
+VALIDATION_CORPUS = (
+    "Senior software engineer with 8 years of experience building distributed systems.",
+    "Led a team of 6 engineers to migrate the billing platform to Kubernetes.",
+    "Reduced API latency by 40% by introducing Redis caching and query optimization.",
+    "Proficient in Python, Java, SQL, AWS, Docker and CI/CD pipelines.",
+    "Bachelor of Science in Computer Science, University of Michigan, 2015.",
+    "Registered nurse experienced in intensive care and patient education.",
+    "Managed a $2M marketing budget and increased qualified leads by 35%.",
+    "Certified Public Accountant with expertise in audits and tax compliance.",
+    "We are looking for a data scientist with experience in NLP and deep learning.",
+    "Requirements: 5+ years of backend development, strong communication skills.",
+    "Responsible for customer onboarding, account management and renewals.",
+    "Designed and delivered training programs for 200+ new employees.",
+    "Skills: React, TypeScript, GraphQL, Node.js, PostgreSQL",
+    "Volunteer tutor teaching mathematics to high school students.",
+    "Fluent in English, Spanish and German.",
+    "Objective: to obtain an entry-level position in financial analysis.",
+)
+
+
+class EncoderValidationError(RuntimeError):
+    """Quantized encoder disagrees with the original model"""
+
+
+def _corpus_hash() -> str:
+    return hashlib.sha256("\n".join(VALIDATION_CORPUS).encode("utf-8")).hexdigest()[:16]
+
+
+def model_dir(cache_dir: str, model_name: str) -> str:
+    """Artifact directory for a model under MODEL_CACHE_DIR"""
+    return os.path.join(cache_dir, "onnx", re.sub(r"[^A-Za-z0-9._-]+", "_", model_name))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def _pool(hidden: np.ndarray, mask: np.ndarray, mode: str) -> np.ndarray:
+    if mode == "cls":
+        return hidden[:, 0]
+    mask = mask[:, :, None].astype(hidden.dtype)
+    if mode == "max":
+        return np.where(mask > 0, hidden, -1e9).max(axis=1)
+    return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+class OnnxSentenceEncoder:
+    """
+    Quantized sentence encoder with the `encode` interface of SentenceTransformer
+
+    Tokenization uses the model's own (saved) tokenizer; pooling and
+    normalization follow the original model's modules. Batches are sorted by
+    length so padding stays small. Each session uses `threads` intra-op
+    threads: requests already run in parallel on the CPU executor, so one
+    thread per call avoids oversubscribing the cores.
+    """
+
+    def __init__(self, directory: str, threads: int = 1):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(directory, METADATA_FILE), "r", encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        self.path = os.path.join(directory, MODEL_FILE)
+        self.pooling = self.metadata["pooling"]
+        self.normalize = self.metadata["normalize"]
+        self.max_seq_length = self.metadata["max_seq_length"]
+        self.dimension = self.metadata["dimension"]
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+
+    @property
+    def memory_bytes(self) -> int:
+        return os.path.getsize(self.path)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        embeddings = np.zeros((len(sentences), self.dimension), dtype=np.float32)
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        for start in range(0, len(sentences), batch_size):
+            indices = order[start:start + batch_size]
+            tokens = self.tokenizer(
+                [sentences[i] for i in indices],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {name: tokens[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            embeddings[indices] = _pool(hidden, tokens["attention_mask"], self.pooling)
+
+        if self.normalize or normalize_embeddings:
+            embeddings = _normalize(embeddings)
+        return embeddings[0] if single else embeddings
+
+
+def export_quantized(model_name: str, directory: str):
+    """Export a SentenceTransformer to ONNX, quantize weights to int8 and save reference embeddings"""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Exporting {model_name} to ONNX int8 in {directory}")
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0]
+    modules = [type(module).__name__ for module in model]
+    pooling = next((module for module in model if type(module).__name__ == "Pooling"), None)
+    mode = pooling.get_pooling_mode_str() if pooling is not None else "mean"
+    if mode not in ("mean", "cls", "max"):
+        raise ValueError(f"Unsupported pooling mode for ONNX export: {mode}")
+
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".export-", dir=os.path.dirname(directory))
+    try:
+        sample = transformer.tokenizer(["export sample"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+        fp32_path = os.path.join(staging, "model-fp32.onnx")
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer.auto_model.eval(),
+                tuple(sample[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=OPSET_VERSION,
+                do_constant_folding=True
+            )
+        # Dynamic quantization: int8 weights, activations quantized per batch at runtime
+        quantize_dynamic(fp32_path, os.path.join(staging, MODEL_FILE), weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+
+        transformer.tokenizer.save_pretrained(staging)
+        reference = model.encode(list(VALIDATION_CORPUS), convert_to_numpy=True, batch_size=len(VALIDATION_CORPUS))
+        np.save(os.path.join(staging, REFERENCE_FILE), reference.astype(np.float32))
+        with open(os.path.join(staging, METADATA_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "format_version": FORMAT_VERSION,
+                "model": model_name,
+                "pooling": mode,
+                "normalize": "Normalize" in modules,
+                "max_seq_length": model.max_seq_length,
+                "dimension": model.get_sentence_embedding_dimension(),
+                "opset": OPSET_VERSION,
+                "corpus": _corpus_hash(),
+                "torch": torch.__version__,
+            }, f, indent=2)
+
+        # Move the old export aside rather than deleting it in place, so the
+        # directory is missing only between two renames
+        retired = None
+        if os.path.isdir(directory):
+            retired = tempfile.mkdtemp(prefix=".retired-", dir=os.path.dirname(directory))
+            os.replace(directory, os.path.join(retired, "model"))
+        os.replace(staging, directory)
+        if retired is not None:
+            shutil.rmtree(retired, ignore_errors=True)
+    finally:
+        if os.path.isdir(staging):
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def _artifacts_current(directory: str, model_name: str) -> bool:
+    try:
+        with open(os.path.join(directory, METADATA_FILE), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (
+        metadata.get("format_version") == FORMAT_VERSION
+        and metadata.get("model") == model_name
+        and metadata.get("corpus") == _corpus_hash()
+        and os.path.exists(os.path.join(directory, MODEL_FILE))
+        and os.path.exists(os.path.join(directory, REFERENCE_FILE))
+    )
+
+
+@contextlib.contextmanager
+def _export_lock(directory: str):
+    """Exclusive lock per model directory, held across processes (uvicorn workers)"""
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    with open(directory + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def ensure_exported(model_name: str, cache_dir: str) -> str:
+    """Artifact directory for `model_name`, exporting it first if missing or stale"""
+    directory = model_dir(cache_dir, model_name)
+    if _artifacts_current(directory, model_name):
+        return directory
+    with _export_lock(directory):
+        # Another worker may have finished the export while we waited
+        if not _artifacts_current(directory, model_name):
+            export_quantized(model_name, directory)
+    return directory
+
+
+def agreement(encoder: OnnxSentenceEncoder, reference: np.ndarray) -> float:
+    """Lowest cosine similarity between encoder output and reference embeddings"""
+    embeddings = encoder.encode(list(VALIDATION_CORPUS), batch_size=8)
+    return float((_normalize(embeddings) * _normalize(reference)).sum(axis=1).min())
+
+
+def load_quantized_encoder(
+    model_name: str,
+    cache_dir: str,
+    threads: int = 1,
+    min_cosine: float = 0.99
+) -> OnnxSentenceEncoder:
+    """
+    Quantized encoder for `model_name`, exported on first use and cached
+
+    The export runs once per model (it needs torch), under a file lock so
+    workers starting together do not export concurrently; later starts only
+    load the ONNX file and tokenizer. Every load is checked against the original
+    model's embeddings of VALIDATION_CORPUS and rejected below `min_cosine`.
+    """
+    directory = ensure_exported(model_name, cache_dir)
+    encoder = OnnxSentenceEncoder(directory, threads=threads)
+    score = agreement(encoder, np.load(os.path.join(directory, REFERENCE_FILE)))
+    if score < min_cosine:
+        raise EncoderValidationError(
+            f"int8 encoder cosine agreement {score:.4f} is below {min_cosine} for {model_name}"
+        )
+    logger.info(f"ONNX int8 encoder for {model_name}: min cosine agreement {score:.4f}")
+    return encoder
@@ -1,44 +1,37 @@
 """
 OpenAI Service
-Handles all OpenAI API interactions with fallback to mock responses
+Handles all LLM interactions (OpenAI/Anthropic via the router) with fallback to mock responses
 """
 
 import logging
 from typing import Optional, Dict, List
 from app.core.config import settings
+from app.services.ai.llm_router import llm_router
+from app.services.ai.prompt_builder import prompt_builder
 
 logger = logging.getLogger(__name__)
 
 
 class OpenAIService:
-    """OpenAI API service with intelligent fallback"""
+    """LLM service with intelligent fallback"""
     
     def __init__(self):
-        self.api_key = settings.OPENAI_API_KEY
-        self.model = settings.OPENAI_MODEL
-        self.use_openai = bool(self.api_key and self.api_key != "")
-        
-        if self.use_openai:
-            try:
-                from openai import AsyncOpenAI
-                self.client = AsyncOpenAI(api_key=self.api_key)
-                logger.info("OpenAI client initialized")
-            except Exception as e:
-                logger.warning(f"OpenAI initialization failed: {e}")
-                self.use_openai = False
+        # Providers and their pooled HTTP clients are shared process-wide
+        self.use_llm = llm_router.available
     
     async def generate_resume_insights(
         self,
         resume_text: str,
-        job_description: Optional[str] = None
+        job_description: Optional[str] = None,
+        job_terms: Optional[List[str]] = None
     ) -> str:
         """Generate AI-powered resume insights"""
         
-        if self.use_openai:
+        if self.use_llm:
             try:
-                return await self._generate_with_openai(resume_text, job_description)
+                return await self._generate_with_llm(resume_text, job_description, job_terms)
             except Exception as e:
-                logger.error(f"OpenAI generation failed: {e}")
+                logger.error(f"LLM generation failed: {e}")
                 return self._generate_mock_insights(resume_text, job_description)
         else:
             return self._generate_mock_insights(resume_text, job_description)
@@ -46,30 +39,10 @@ class OpenAIService:
     async def optimize_bullet_point(self, bullet: str, context: str = "") -> str:
         """Optimize a single bullet point"""
         
-        if self.use_openai:
+        if self.use_llm:
             try:
-                prompt = f"""Improve this resume bullet point to be more impactful and ATS-friendly:
-
-Original: {bullet}
-
-Context: {context}
-
-Requirements:
-- Start with a strong action verb
-- Include quantifiable results if possible
-- Be concise (1-2 lines)
-- Use professional language
-
-Improved version:"""
-                
-                response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=150,
-                    temperature=0.7
-                )
-                
-                return response.choices[0].message.content.strip()
+                system, prompt = prompt_builder.bullet_point(bullet, context)
+                return await llm_router.complete(prompt, max_tokens=150, temperature=0.7, system=system)
             except Exception as e:
                 logger.error(f"Bullet optimization failed: {e}")
                 return self._mock_optimize_bullet(bullet)
@@ -81,81 +54,47 @@ Improved version:"""
         resume_text: str,
         job_description: str,
         company_name: str,
-        tone: str = "professional"
+        tone: str = "professional",
+        job_terms: Optional[List[str]] = None
     ) -> str:
         """Generate a cover letter"""
         
-        if self.use_openai:
+        if self.use_llm:
             try:
-                prompt = f"""Write a compelling cover letter for this job application:
-
-Job Description:
-{job_description}
-
-Company: {company_name}
-Tone: {tone}
-
-Resume Summary:
-{resume_text[:1000]}
-
-Write a professional cover letter that:
-- Highlights relevant experience
-- Shows enthusiasm for the role
-- Demonstrates cultural fit
-- Is 3-4 paragraphs
-- Uses {tone} tone"""
-                
-                response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=800,
-                    temperature=0.8
+                system, prompt = prompt_builder.cover_letter(
+                    resume_text, job_description, company_name, tone, job_terms
                 )
-                
-                return response.choices[0].message.content.strip()
+                return await llm_router.complete(prompt, max_tokens=800, temperature=0.8, system=system)
             except Exception as e:
                 logger.error(f"Cover letter generation failed: {e}")
                 return self._mock_cover_letter(company_name)
         else:
             return self._mock_cover_letter(company_name)
     
-    async def _generate_with_openai(
+    async def _generate_with_llm(
         self,
         resume_text: str,
-        job_description: Optional[str]
+        job_description: Optional[str],
+        job_terms: Optional[List[str]] = None
     ) -> str:
-        """Generate insights using OpenAI"""
+        """Generate insights using the configured LLM providers"""
         
-        prompt = f"""Analyze this resume and provide professional insights:
-
-Resume:
-{resume_text}
-
-{f"Job Description: {job_description}" if job_description else ""}
-
-Provide:
-1. Overall assessment (2-3 sentences)
-2. Top 3 strengths
-3. Top 3 areas for improvement
-4. Specific actionable recommendations
-
-Be concise and professional."""
+        # Compacted to the token budget, most job-relevant lines first
+        system, prompt = prompt_builder.resume_insights(resume_text, job_description, job_terms)
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
+        return await llm_router.complete(
+            prompt,
             max_tokens=settings.OPENAI_MAX_TOKENS,
-            temperature=settings.OPENAI_TEMPERATURE
+            temperature=settings.OPENAI_TEMPERATURE,
+            system=system
         )
-        
-        return response.choices[0].message.content.strip()
     
     def _generate_mock_insights(
         self,
         resume_text: str,
         job_description: Optional[str]
     ) -> str:
-        """Generate mock insights when OpenAI is unavailable"""
+        """Generate mock insights when no LLM provider is available"""
         
         word_count = len(resume_text.split())
         has_numbers = any(char.isdigit() for char in resume_text)
@@ -0,0 +1,271 @@
+"""
+Prompt Builder
+Token-budgeted, compacted prompts with a stable shared system prefix
+"""
+
+import logging
+import math
+import re
+from typing import Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.nlp.segmenter import segment_resume
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception as e:
+    _ENCODING = None
+    logger.warning(f"tiktoken unavailable, using approximate token counts: {e}")
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+_BULLET_RE = re.compile(r"^\s*(?:[-•*▪●◦]|\d+[.)])\s+")
+_NUMBER_RE = re.compile(r"\d")
+
+# Lines that cost tokens without telling the model anything
+_BOILERPLATE_RE = re.compile(
+    r"references (?:are )?available|upon request|curriculum vitae|^\s*page \d+|^\s*resume\s*$",
+    re.IGNORECASE
+)
+
+# Shared by every request so providers can cache it: the rubric and the
+# output format of every task live here, and the per-request prompt only
+# names its task and carries the data. Providers cache only prefixes of at
+# least 1024 tokens (Anthropic, OpenAI), so keep it above that; keep it free
+# of per-request data and change it rarely, since any edit invalidates the cache.
+SYSTEM_PREFIX = """You are an expert resume reviewer and career coach working inside an applicant tracking system (ATS). Recruiters and candidates use your output directly, so it must be accurate, specific and ready to use without editing.
+
+# Input
+
+Each request starts with a line "Task: <name>" naming one of the tasks described below, followed by the data for that task.
+
+Resumes you receive may be compacted to fit a token budget: sections are kept in their original order, section titles are upper case, lower-priority lines may be omitted and an omission is marked with "[...]". Do not comment on missing content that may have been omitted, and never treat "[...]" as a gap in the candidate's history.
+
+When a job description is provided it may also be compacted to its most relevant requirement lines. Base your feedback on the resume and those requirements only. Do not assume requirements that are not listed, and do not penalize the candidate for experience the job does not ask for.
+
+# How the ATS evaluates resumes
+
+The system that scores resumes before a recruiter sees them looks at five areas. Use the same areas when judging a resume, so your advice is consistent with the score the candidate sees.
+
+1. Format: plain single-column text parses reliably. Tables, text boxes, multi-column layouts, images, icons, unusual symbols and decorative characters are often dropped or scrambled by parsers. Standard fonts and simple bullet characters are safe.
+2. Structure: recognizable section headings (Contact, Summary, Experience, Education, Skills, and optionally Projects or Certifications) in a conventional order, with an email address and a phone number near the top. Each role lists the job title, employer, location if relevant, and start and end dates.
+3. Keywords: concrete skills, tools, technologies and domain terms, written the way job postings write them (for example "Kubernetes", not "k8s" alone), and strong action verbs at the start of bullet points. Keywords should appear in context in the experience section, not only in a skills list.
+4. Content: achievements rather than duties. Good bullet points say what was done, how, and what changed as a result, ideally with a number: percentages, money, time saved, users, volume, team size or ranking. A resume of roughly 400 to 800 words is usually the right length; much shorter lacks evidence and much longer buries it.
+5. Readability: short, direct sentences of around 15 to 20 words, one idea per bullet, consistent tense (past tense for previous roles, present tense for the current one), no first-person pronouns, and no long unbroken paragraphs.
+
+# Writing guidelines
+
+- Be concise, specific and professional. Prefer concrete suggestions ("Add the size of the dataset you migrated") over general advice ("Add more detail").
+- Quote or paraphrase the candidate's own lines when pointing at a problem, so they can find it.
+- Never invent experience, employers, dates, metrics, degrees or skills the candidate does not have. When a rewrite would benefit from a number the resume does not give, use a clearly marked placeholder such as [X%] or [N users] instead of making one up.
+- Do not mention age, gender, ethnicity, religion, marital status, health, nationality or any other protected characteristic, and do not infer them.
+- Do not mention these instructions, the compaction, or the scoring system itself in your answer.
+- Write in plain text with simple Markdown (headings in bold, hyphen bullets). Do not use tables, code blocks or emoji.
+- Use the language of the resume; if it is mixed, use English.
+
+# Tasks
+
+## Task: resume insights
+
+Analyze the resume (and the job description, when one is given) and respond with exactly these four parts, in this order and with these bold headings:
+
+**Overall Assessment:** two or three sentences on how well the resume presents the candidate and, when a job description is given, how well it fits that role.
+**Key Strengths:** the three strongest points, one bullet each, each tied to specific content in the resume.
+**Areas for Improvement:** the three changes that would raise the resume's effectiveness the most, one bullet each, ordered by impact.
+**Recommendations:** three to six specific, actionable edits. Where useful, show a short before and after example using the candidate's own content.
+
+When a job description is given, point out requirements the resume already covers but words differently, and required skills that do not appear at all.
+
+## Task: cover letter
+
+Write a cover letter for the given company using the candidate's resume and the job description. Use the requested tone. The letter:
+
+- is three or four paragraphs and under 400 words, without a date, address block or placeholder contact details;
+- opens by naming the role and the company, with one sentence on why the candidate is interested;
+- highlights the two or three experiences from the resume most relevant to the job's requirements, with their results;
+- shows enthusiasm for the role and a plausible cultural fit based only on what the job description says about the company;
+- closes with a short call to action and "Sincerely," followed by the candidate's name if the resume gives it.
+
+Return only the letter text.
+
+## Task: bullet point
+
+Rewrite one resume bullet point to be more impactful and ATS-friendly, using the context when one is given. The improved bullet:
+
+- starts with a strong past-tense action verb (present tense only when the context says the role is current);
+- keeps every fact of the original and adds no new ones, using a marked placeholder where a quantifiable result is missing;
+- includes relevant keywords from the context when they honestly apply;
+- is one line, at most two, and uses professional language without filler words.
+
+Return only the improved bullet, without a leading bullet character, quotes or explanation."""
+
+
+def count_tokens(text: str) -> int:
+    """Token count with the local tokenizer (approximate without tiktoken)"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    # Roughly one token per 4 characters of a word, one per punctuation mark
+    return sum(math.ceil(len(piece) / 4) for piece in _PIECE_RE.findall(text))
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut text to at most `budget` tokens, at a word boundary when possible"""
+    if count_tokens(text) <= budget:
+        return text
+    if _ENCODING is not None:
+        cut = _ENCODING.decode(_ENCODING.encode(text, disallowed_special=())[:budget])
+        # Drop a trailing partial word
+        return cut.rsplit(" ", 1)[0] if " " in cut else cut
+
+    used = 0
+    end = 0
+    for match in _PIECE_RE.finditer(text):
+        used += math.ceil(len(match.group()) / 4)
+        if used > budget:
+            break
+        end = match.end()
+    return text[:end]
+
+
+def _split_sections(text: str) -> List[Tuple[str, str, List[str]]]:
+    """(title, kind, lines) per section, preamble first with an empty title"""
+    structure = segment_resume(text)
+    sections = [("", "preamble", structure.preamble)]
+    sections += [(section.title, section.kind, section.lines) for section in structure.sections]
+    return [
+        (title, kind, [re.sub(r"\s+", " ", line) for line in lines if not _BOILERPLATE_RE.search(line)])
+        for title, kind, lines in sections
+        if title or lines
+    ]
+
+
+def _line_priority(line: str, kind: str, terms: List[str]) -> float:
+    lowered = line.lower()
+    priority = sum(2.0 for term in terms if term in lowered)
+    if _NUMBER_RE.search(line):
+        priority += 1.0  # Quantified achievements
+    if kind == "skills":
+        priority += 1.5
+    if not _BULLET_RE.match(line) and len(line) < 60:
+        priority += 0.5  # Short non-bullet lines are usually titles, employers, dates
+    return priority
+
+
+def compact_resume(resume_text: str, budget: int, relevant_terms: Iterable[str] = ()) -> str:
+    """
+    Fit a resume into `budget` tokens
+
+    Section headers and the first preamble (name/contact) lines are always
+    kept. Other lines are ranked by how many relevant terms they mention,
+    whether they are quantified and whether they belong to the skills
+    section, then the best ones are kept in their original order.
+    """
+    if count_tokens(resume_text) <= budget:
+        return resume_text.strip()
+
+    terms = sorted({term.lower() for term in relevant_terms if term})
+    sections = _split_sections(resume_text)
+
+    # (priority, section index, line index, tokens)
+    candidates = []
+    used = 0
+    for s, (title, kind, lines) in enumerate(sections):
+        used += count_tokens(title) + 1
+        for i, line in enumerate(lines):
+            tokens = count_tokens(line) + 1
+            if kind == "preamble" and i < 3:
+                candidates.append((math.inf, s, i, tokens))
+            else:
+                candidates.append((_line_priority(line, kind, terms), s, i, tokens))
+
+    keep = set()
+    for priority, s, i, tokens in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+        if used + tokens > budget:
+            continue
+        keep.add((s, i))
+        used += tokens
+
+    output = []
+    for s, (title, kind, lines) in enumerate(sections):
+        if title:
+            output.append(title.upper())
+        omitted = False
+        for i, line in enumerate(lines):
+            if (s, i) in keep:
+                output.append(line)
+                omitted = False
+            elif not omitted:
+                output.append("[...]")
+                omitted = True
+    return truncate_to_tokens("\n".join(output), budget)
+
+
+def compact_job_description(job_description: str, budget: int, requirements: Iterable[str] = ()) -> str:
+    """Job description reduced to its requirement lines, within `budget` tokens"""
+    if count_tokens(job_description) <= budget:
+        return job_description.strip()
+    return compact_resume(job_description, budget, requirements)
+
+
+class PromptBuilder:
+    """Builds (system, user) prompt pairs for each LLM task"""
+
+    def __init__(self, resume_budget: int = None, job_budget: int = None):
+        self.resume_budget = resume_budget or settings.LLM_RESUME_TOKEN_BUDGET
+        self.job_budget = job_budget or settings.LLM_JOB_TOKEN_BUDGET
+
+    def _job_block(self, job_description: Optional[str], job_terms: List[str]) -> str:
+        if not job_description:
+            return ""
+        compacted = compact_job_description(job_description, self.job_budget, job_terms)
+        return f"\n\nJob Description:\n{compacted}"
+
+    def resume_insights(
+        self,
+        resume_text: str,
+        job_description: Optional[str] = None,
+        job_terms: Optional[List[str]] = None
+    ) -> Tuple[str, str]:
+        job_terms = job_terms or []
+        resume = compact_resume(resume_text, self.resume_budget, job_terms)
+        prompt = f"""Task: resume insights
+
+Resume:
+{resume}{self._job_block(job_description, job_terms)}"""
+        return SYSTEM_PREFIX, prompt
+
+    def cover_letter(
+        self,
+        resume_text: str,
+        job_description: str,
+        company_name: str,
+        tone: str = "professional",
+        job_terms: Optional[List[str]] = None
+    ) -> Tuple[str, str]:
+        job_terms = job_terms or []
+        # A cover letter needs the highlights, not the whole resume
+        resume = compact_resume(resume_text, self.resume_budget // 2, job_terms)
+        prompt = f"""Task: cover letter
+
+Company: {company_name}
+Tone: {tone}{self._job_block(job_description, job_terms)}
+
+Resume Summary:
+{resume}"""
+        return SYSTEM_PREFIX, prompt
+
+    def bullet_point(self, bullet: str, context: str = "") -> Tuple[str, str]:
+        context = truncate_to_tokens(context, self.job_budget // 2)
+        prompt = f"""Task: bullet point
+
+Original: {bullet}
+
+Context: {context}"""
+        return SYSTEM_PREFIX, prompt
+
+
+prompt_builder = PromptBuilder()
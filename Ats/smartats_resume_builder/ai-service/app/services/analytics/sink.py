@@ -0,0 +1,256 @@
+"""
+Analytics Sink
+Buffers analytics events in memory and writes them to the database in batches
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Columns of the `analytics_events` table (database/schema.sql) written by the sink
+EVENT_COLUMNS = ["event_type", "event_data", "created_at"]
+
+EventRecord = Tuple[str, str, datetime]
+
+
+class PostgresAnalyticsBackend:
+    """Writes event batches with COPY over a pooled asyncpg connection"""
+
+    def __init__(self, dsn: str, table: str = "analytics_events"):
+        # asyncpg does not understand SQLAlchemy-style driver suffixes
+        self.dsn = dsn.replace("postgresql+asyncpg://", "postgresql://", 1)
+        self.table = table
+        self.pool = None
+
+    async def connect(self):
+        import asyncpg
+
+        self.pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=settings.DATABASE_POOL_MIN_SIZE,
+            max_size=settings.DATABASE_POOL_MAX_SIZE
+        )
+
+    async def write_batch(self, records: List[EventRecord]):
+        async with self.pool.acquire() as connection:
+            await connection.copy_records_to_table(
+                self.table,
+                records=records,
+                columns=EVENT_COLUMNS
+            )
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+
+class SQLiteAnalyticsBackend:
+    """Local stand-in for PostgreSQL using a multi-row insert into SQLite"""
+
+    def __init__(self, path: str, table: str = "analytics_events"):
+        self.path = path
+        self.table = table
+        self.connection = None
+
+    async def connect(self):
+        await asyncio.to_thread(self._connect)
+
+    async def write_batch(self, records: List[EventRecord]):
+        await asyncio.to_thread(self._write_batch, records)
+
+    async def close(self):
+        if self.connection is not None:
+            await asyncio.to_thread(self.connection.close)
+            self.connection = None
+
+    def _connect(self):
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "event_type TEXT NOT NULL, "
+            "event_data TEXT, "
+            "created_at TIMESTAMP)"
+        )
+        self.connection.commit()
+
+    def _write_batch(self, records: List[EventRecord]):
+        self.connection.executemany(
+            f"INSERT INTO {self.table} ({', '.join(EVENT_COLUMNS)}) VALUES (?, ?, ?)",
+            [(event_type, data, created_at.isoformat()) for event_type, data, created_at in records]
+        )
+        self.connection.commit()
+
+
+def create_backend(url: str):
+    """Create an analytics backend for a database URL (None if unsupported)"""
+    if url.startswith("sqlite:///"):
+        return SQLiteAnalyticsBackend(url[len("sqlite:///"):] or ":memory:")
+    if url.startswith(("postgresql://", "postgresql+asyncpg://", "postgres://")):
+        return PostgresAnalyticsBackend(url)
+
+    logger.warning(f"Unsupported analytics database URL scheme: {url.split(':', 1)[0]}")
+    return None
+
+
+class AnalyticsSink:
+    """
+    Batched, non-blocking analytics writer
+
+    Request handlers call `record()`, which only appends to a bounded in-memory
+    buffer. A background task flushes the buffer when it reaches `batch_size`
+    events or every `flush_interval` seconds. Only one write is in flight at a
+    time, so a slow database makes the buffer grow; once it is full new events
+    are dropped and counted instead of slowing down requests.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        batch_size: int = None,
+        flush_interval: float = None,
+        buffer_size: int = None
+    ):
+        self.backend = backend
+        self.batch_size = batch_size or settings.ANALYTICS_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.ANALYTICS_FLUSH_INTERVAL
+        self.buffer_size = buffer_size or settings.ANALYTICS_BUFFER_SIZE
+
+        self._buffer = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Connect the backend and start the background flusher"""
+        if self.running:
+            return
+
+        if self.backend is None:
+            url = settings.ANALYTICS_DATABASE_URL or settings.DATABASE_URL
+            self.backend = create_backend(url)
+
+        if self.backend is None:
+            logger.warning("Analytics sink disabled: no backend available")
+            return
+
+        try:
+            await self.backend.connect()
+        except Exception as e:
+            logger.warning(f"Analytics backend unavailable, events will be dropped: {e}")
+            self.backend = None
+            return
+
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Analytics sink started")
+
+    async def stop(self):
+        """Flush remaining events and release the backend"""
+        if self._flush_lock is None:
+            return  # Never started: nothing was buffered and the backend was never connected
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self.backend is not None:
+            while self._buffer:
+                if not await self.flush():
+                    break
+            await self.backend.close()
+        self._flush_lock = None
+
+        logger.info(f"Analytics sink stopped: {self.stats()}")
+
+    def record(self, event_type: str, data: Dict[str, Any]) -> bool:
+        """
+        Queue an event for writing (never blocks)
+
+        Returns:
+            False if the event was dropped because the buffer is full
+            or the sink is not running
+        """
+        if not self.running or len(self._buffer) >= self.buffer_size:
+            self.dropped += 1
+            return False
+
+        self._buffer.append((event_type, json.dumps(data), datetime.utcnow()))
+        self.recorded += 1
+
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def flush(self) -> bool:
+        """Write up to one batch of buffered events; returns False on failure"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return True
+
+            count = min(self.batch_size, len(self._buffer))
+            batch = [self._buffer.popleft() for _ in range(count)]
+
+            try:
+                await self.backend.write_batch(batch)
+                self.written += len(batch)
+                return True
+            except Exception as e:
+                self.failed_batches += 1
+                # Put the batch back in front if there is room, otherwise drop it
+                room = max(0, self.buffer_size - len(self._buffer))
+                self._buffer.extendleft(reversed(batch[:room]))
+                self.dropped += len(batch) - min(room, len(batch))
+                logger.warning(f"Analytics batch write failed ({len(batch)} events): {e}")
+                return False
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        return {
+            "buffered": len(self._buffer),
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            # Drain full batches back to back; stop early if the database is failing
+            while self._buffer:
+                if not await self.flush():
+                    break
+                if len(self._buffer) < self.batch_size:
+                    break
+
+
+analytics_sink = AnalyticsSink()
@@ -0,0 +1,47 @@
+"""
+Batch ATS Scorer
+Vectorized ATSScorer: per-resume feature rows, category scores computed for the whole batch
+"""
+
+import logging
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from app.services.ats.rules import CompiledRuleSet, scoring_rules
+
+logger = logging.getLogger(__name__)
+
+
+class BatchATSScorer:
+    """
+    Scores many resumes at once with results identical to `ATSScorer.score_resume`
+
+    Text scanning (regexes, counts, segmentation) is the only per-resume
+    Python work and produces one integer row per resume. The scoring rules
+    are compiled to NumPy column operations, so thresholds, category scores,
+    weighting and grading run over the whole (n x features) matrix.
+    """
+
+    def __init__(self, rules: CompiledRuleSet = None):
+        self._rules = rules  # Pinned rule set, otherwise the live one
+
+    @property
+    def rules(self) -> CompiledRuleSet:
+        return self._rules or scoring_rules.current
+
+    def feature_matrix(self, texts: Sequence[str]) -> np.ndarray:
+        """(n x features) matrix, columns in `rules.plan` order"""
+        return self.rules.feature_matrix(texts)
+
+    def score_batch(self, texts: Sequence[str]) -> List[Dict]:
+        """Score resumes; each result has the same shape as `ATSScorer.score_resume`"""
+        rules = self.rules  # Whole batch scored with one rule set
+        try:
+            return rules.score_batch(texts)
+        except Exception as e:
+            logger.error(f"Batch ATS scoring failed: {e}")
+            return [rules.error_result() for _ in texts]
+
+
+batch_scorer = BatchATSScorer()
@@ -0,0 +1,193 @@
+"""
+Bullet Quality Scorer
+Rates resume bullets as achievements or duty statements using sentence embeddings
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from prometheus_client import Counter
+
+from app.core.config import settings
+from app.services.ai.model_manager import model_manager
+from app.services.nlp.segmenter import ResumeStructure
+
+logger = logging.getLogger(__name__)
+
+BULLETS_SCORED = Counter("bullet_quality_bullets_total", "Bullets scored for quality", ["source"])
+
+# Reference bullets the score is calibrated against
+STRONG_PROTOTYPES = (
+    "Increased quarterly revenue by 25% by launching a self-service upgrade flow.",
+    "Reduced API p95 latency from 800ms to 120ms by redesigning the caching layer.",
+    "Led a team of 8 engineers to deliver the payments platform two months ahead of schedule.",
+    "Cut cloud infrastructure costs by $400K per year through rightsizing and spot instances.",
+    "Grew the newsletter audience from 5,000 to 60,000 subscribers in 12 months.",
+    "Automated monthly reporting, saving the finance team 30 hours per month.",
+    "Negotiated vendor contracts that lowered procurement spend by 18%.",
+    "Improved patient satisfaction scores from 72% to 91% by redesigning discharge education.",
+    "Launched a referral program that generated 1,200 qualified leads in its first quarter.",
+    "Built a fraud detection model that prevented $2M in chargebacks annually.",
+    "Mentored 6 junior analysts, 4 of whom were promoted within a year.",
+    "Shipped an offline mode used by 40% of mobile users within three months of release.",
+)
+WEAK_PROTOTYPES = (
+    "Responsible for answering customer emails.",
+    "Duties included data entry and filing.",
+    "Worked on various projects as needed.",
+    "Helped with the team's day-to-day tasks.",
+    "Attended weekly meetings with the manager.",
+    "In charge of updating spreadsheets.",
+    "Assisted other departments when required.",
+    "Handled phone calls and scheduling.",
+    "Participated in code reviews.",
+    "Tasked with maintaining documentation.",
+    "Was part of the marketing team.",
+    "Used Excel and PowerPoint daily.",
+)
+
+STRONG_THRESHOLD = 65
+WEAK_THRESHOLD = 35
+_MIN_LINE_WORDS = 4
+_SPACE_RE = re.compile(r"\s+")
+
+
+def resume_bullets(structure: ResumeStructure, limit: int) -> List[str]:
+    """Bullets to rate: section bullets, or experience lines when the resume has none"""
+    bullets = list(structure.bullets)
+    if not bullets:
+        experience = structure.section("experience")
+        if experience is not None:
+            bullets = [line for line in experience.lines if len(line.split()) >= _MIN_LINE_WORDS]
+    return bullets[:limit]
+
+
+def _bullet_key(bullet: str) -> str:
+    return hashlib.sha1(_SPACE_RE.sub(" ", bullet.strip().lower()).encode("utf-8")).hexdigest()[:20]
+
+
+class BulletQualityScorer:
+    """
+    Scores bullets by where their embedding falls between achievement and duty prototypes
+
+    The prototypes are embedded once per model. Their mean difference gives
+    an "achievement direction"; a bullet's projection onto it is scaled so
+    the median weak prototype maps to 0 and the median strong one to 100.
+    Scores are cached by normalized bullet hash, so a resume only pays for
+    bullets it has not seen before, all encoded in one batch.
+    """
+
+    def __init__(self, model_getter: Callable[[], Optional[object]], cache_size: int = None):
+        self.model_getter = model_getter
+        self.cache_size = cache_size or settings.BULLET_QUALITY_CACHE_SIZE
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._model = None
+        self._direction: Optional[np.ndarray] = None
+        self._low = 0.0
+        self._high = 1.0
+
+    @property
+    def available(self) -> bool:
+        return self.model_getter() is not None
+
+    def _calibrate(self, model):
+        """Embed the prototypes for `model` (once) and derive the scoring direction"""
+        if self._model is model:
+            return
+        embeddings = np.asarray(model.encode(
+            list(STRONG_PROTOTYPES + WEAK_PROTOTYPES), batch_size=32, normalize_embeddings=True
+        ), dtype=np.float32)
+        strong, weak = embeddings[:len(STRONG_PROTOTYPES)], embeddings[len(STRONG_PROTOTYPES):]
+        direction = strong.mean(axis=0) - weak.mean(axis=0)
+        direction /= max(float(np.linalg.norm(direction)), 1e-12)
+        low, high = float(np.median(weak @ direction)), float(np.median(strong @ direction))
+        with self._lock:
+            self._direction, self._low, self._high = direction, low, max(high, low + 1e-6)
+            self._cache.clear()  # Scores from another model are not comparable
+            self._model = model
+        logger.info("Bullet quality prototypes embedded (separation %.3f)", high - low)
+
+    def warm(self) -> bool:
+        """Embed the prototypes ahead of the first request; False without a model"""
+        model = self.model_getter()
+        if model is None:
+            return False
+        try:
+            self._calibrate(model)
+        except Exception as e:
+            logger.warning("Bullet quality prototypes could not be embedded: %s", e)
+            return False
+        return True
+
+    def score_bullets(self, bullets: List[str]) -> Optional[List[int]]:
+        """0-100 achievement score per bullet, or None when no embedding model is loaded"""
+        model = self.model_getter()
+        if model is None:
+            return None
+        self._calibrate(model)
+
+        keys = [_bullet_key(bullet) for bullet in bullets]
+        scores: Dict[str, int] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[key] = self._cache[key]
+
+        missing = {}
+        for key, bullet in zip(keys, bullets):
+            if key not in scores:
+                missing.setdefault(key, bullet)
+        BULLETS_SCORED.labels(source="cache").inc(len(bullets) - len(missing))
+
+        if missing:
+            # One forward pass for every new bullet of the resume
+            embeddings = np.asarray(model.encode(
+                list(missing.values()), batch_size=32, normalize_embeddings=True
+            ), dtype=np.float32)
+            projection = (embeddings @ self._direction - self._low) / (self._high - self._low)
+            fresh = dict(zip(missing, np.clip(np.rint(projection * 100), 0, 100).astype(int).tolist()))
+            BULLETS_SCORED.labels(source="encoded").inc(len(fresh))
+            scores.update(fresh)
+            with self._lock:
+                for key, score in fresh.items():
+                    self._cache[key] = score
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [scores[key] for key in keys]
+
+    def analyze(self, structure: ResumeStructure) -> Optional[Dict]:
+        """Per-bullet scores and summary for a segmented resume (None without a model)"""
+        bullets = resume_bullets(structure, settings.BULLET_QUALITY_MAX_BULLETS)
+        try:
+            scores = self.score_bullets(bullets)
+        except Exception as e:
+            logger.warning("Bullet quality scoring failed: %s", e)
+            return None
+        if scores is None:
+            return None
+
+        labels = [
+            "achievement" if score >= STRONG_THRESHOLD else "duty" if score < WEAK_THRESHOLD else "mixed"
+            for score in scores
+        ]
+        return {
+            "score": int(round(sum(scores) / len(scores))) if scores else 0,
+            "achievements": labels.count("achievement"),
+            "duties": labels.count("duty"),
+            "bullets": [
+                {"text": bullet, "score": score, "label": label}
+                for bullet, score, label in zip(bullets, scores, labels)
+            ],
+        }
+
+
+bullet_quality = BulletQualityScorer(lambda: model_manager.get_model("sentence_transformer"))
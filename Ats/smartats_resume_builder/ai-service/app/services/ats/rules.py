@@ -0,0 +1,505 @@
+"""
+ATS Scoring Rules
+Declarative scoring rules compiled to scalar and vectorized evaluators, hot-reloaded from disk
+"""
+
+import ast
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from functools import cached_property
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.nlp.readability import ReadabilityStats, analyze_readability
+from app.services.nlp.segmenter import segment_resume
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "scoring_rules.json")
+
+_SPECIAL_CHAR_RE = re.compile(r'[^a-zA-Z0-9\s\-.,;:()]')
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_PHONE_RE = re.compile(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+_NUMBER_RE = re.compile(r'\d+')
+
+
+class RuleError(ValueError):
+    """Invalid scoring rules file"""
+
+
+class _Text:
+    """Resume text with lazily computed views shared between features"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    @cached_property
+    def lower(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def structure(self):
+        return segment_resume(self.text)
+
+    @cached_property
+    def readability(self) -> ReadabilityStats:
+        return analyze_readability(self.text)
+
+
+# Built-in features available to rule expressions
+FEATURES: Dict[str, Callable[[_Text], Any]] = {
+    "length": lambda t: len(t.text),
+    "has_table_pipes": lambda t: "||" in t.text,
+    "has_non_ascii": lambda t: not t.text.isascii(),
+    "paragraph_breaks": lambda t: t.text.count('\n\n'),
+    "special_chars": lambda t: len(_SPECIAL_CHAR_RE.findall(t.text)),
+    "standard_sections": lambda t: t.structure.standard_sections,
+    "sections": lambda t: len(t.structure.sections),
+    "has_email": lambda t: _EMAIL_RE.search(t.text) is not None,
+    "has_phone": lambda t: _PHONE_RE.search(t.text) is not None,
+    "numbers": lambda t: len(_NUMBER_RE.findall(t.text)),
+    "bullet_chars": lambda t: t.text.count('•') + t.text.count('-') + t.text.count('*'),
+    "words": lambda t: t.readability.whitespace_words,
+    "sentences": lambda t: t.readability.sentences,
+    "sentence_words": lambda t: t.readability.sentence_words,
+    "long_paragraphs": lambda t: t.readability.long_paragraphs,
+    "long_sentences": lambda t: t.readability.long_units,
+    "bullets": lambda t: t.readability.bullets,
+    "long_bullets": lambda t: t.readability.long_bullets,
+    "short_bullets": lambda t: t.readability.short_bullets,
+    "avg_bullet_words": lambda t: t.readability.avg_bullet_words,
+    "flesch_reading_ease": lambda t: t.readability.flesch_reading_ease,
+    "flesch_kincaid_grade": lambda t: t.readability.flesch_kincaid_grade,
+    "gunning_fog": lambda t: t.readability.gunning_fog,
+}
+
+
+def _compile_matcher(name: str, spec: Dict) -> Callable[[_Text], int]:
+    kind = spec.get("type", "substring_count")
+    phrases = tuple(phrase.lower() for phrase in spec.get("phrases", []))
+    if kind == "substring_count":
+        # Distinct phrases that occur anywhere in the lowercased text
+        return lambda t: sum(1 for phrase in phrases if phrase in t.lower)
+    if kind == "word_count":
+        pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, phrases)) + r")\b") if phrases else None
+        return lambda t: len(set(pattern.findall(t.lower))) if pattern else 0
+    raise RuleError(f"Matcher {name}: unknown type {kind!r}")
+
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.UAdd, ast.USub, ast.Not, ast.And, ast.Or,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+_FUNCTIONS = {"min", "max", "abs"}
+
+
+def _parse(name: str, source: str, known: set) -> Tuple[ast.Expression, set]:
+    """Parse and validate an expression; returns the tree and the names it uses"""
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as e:
+        raise RuleError(f"{name}: {e.msg} in {source!r}")
+
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise RuleError(f"{name}: {type(node).__name__} is not allowed in rule expressions")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS or node.keywords:
+                raise RuleError(f"{name}: only {sorted(_FUNCTIONS)} may be called")
+            if len(node.args) != 1 if node.func.id == "abs" else len(node.args) < 2:
+                raise RuleError(f"{name}: wrong number of arguments to {node.func.id}()")
+        elif isinstance(node, ast.Name) and node.id not in _FUNCTIONS:
+            if node.id not in known:
+                raise RuleError(f"{name}: unknown name {node.id!r}")
+            names.add(node.id)
+        elif isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise RuleError(f"{name}: only numeric constants are allowed")
+    return tree, names
+
+
+class _Vectorize(ast.NodeTransformer):
+    """Rewrite a scalar expression into NumPy calls that work on whole columns"""
+
+    @staticmethod
+    def _call(func: str, *args) -> ast.Call:
+        return ast.Call(func=ast.Name(id=func, ctx=ast.Load()), args=list(args), keywords=[])
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        return self._call("_where", node.test, node.body, node.orelse)
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        func = "_and" if isinstance(node.op, ast.And) else "_or"
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = self._call(func, result, value)
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return self._call("_not", node.operand)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        # a < b <= c  ->  (a < b) & (b <= c)
+        parts = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            parts.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+            left = right
+        result = parts[0]
+        for part in parts[1:]:
+            result = self._call("_and", result, part)
+        return result
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, (ast.Div, ast.FloorDiv, ast.Mod)):
+            func = {ast.Div: "_div", ast.FloorDiv: "_floordiv", ast.Mod: "_mod"}[type(node.op)]
+            return self._call(func, node.left, node.right)
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        func = {"min": "_minimum", "max": "_maximum", "abs": "_abs"}[node.func.id]
+        result = node.args[0]
+        for arg in node.args[1:]:
+            result = self._call(func, result, arg)
+        return result if len(node.args) > 1 else self._call(func, result)
+
+
+class _VectorContext:
+    """NumPy bindings for vectorized expressions; records rows that divided by zero"""
+
+    def __init__(self, rows: int):
+        self.zero_division = np.zeros(rows, dtype=bool)
+
+    def _guard(self, b):
+        zero = np.asarray(b) == 0
+        self.zero_division |= np.broadcast_to(zero, self.zero_division.shape)
+        return np.where(zero, 1, b)
+
+    def namespace(self) -> Dict[str, Any]:
+        return {
+            "__builtins__": {},
+            "_where": np.where,
+            "_and": np.logical_and,
+            "_or": np.logical_or,
+            "_not": np.logical_not,
+            "_minimum": np.minimum,
+            "_maximum": np.maximum,
+            "_abs": np.abs,
+            "_div": lambda a, b: np.true_divide(a, self._guard(b)),
+            "_floordiv": lambda a, b: np.floor_divide(a, self._guard(b)),
+            "_mod": lambda a, b: np.mod(a, self._guard(b)),
+        }
+
+
+_SCALAR_NAMESPACE = {"__builtins__": {}, "min": min, "max": max, "abs": abs}
+
+# Scored once on load so rules that compile but fail at runtime are rejected
+_SAMPLE_RESUME = """JANE DOE
+jane@example.com | (555) 123-4567
+
+SUMMARY
+Engineer who led and delivered Python and AWS projects.
+
+EXPERIENCE
+- Improved throughput by 40% across 3 services.
+- Built CI pipelines with Docker, 2019 - Present.
+
+EDUCATION
+B.Sc. Computer Science, 2015
+
+SKILLS
+Python, SQL, Kubernetes, leadership"""
+
+
+class CompiledRuleSet:
+    """
+    A scoring rules file compiled for evaluation
+
+    Every expression is parsed and validated once and compiled twice: to
+    Python bytecode for single resumes, and to NumPy column operations for
+    batches. Only the features the expressions reference are extracted.
+    Rows where the vectorized plan divided by zero are re-evaluated with the
+    scalar plan, so both paths always agree.
+    """
+
+    def __init__(self, config: Dict, source: str = "<rules>"):
+        self.source = source
+        self.version = str(config.get("version", "unversioned"))
+        canonical = json.dumps(config, sort_keys=True).encode("utf-8")
+        self.fingerprint = f"{self.version}:{hashlib.sha256(canonical).hexdigest()[:12]}"
+
+        self.matchers = {
+            name: _compile_matcher(name, spec) for name, spec in config.get("matchers", {}).items()
+        }
+        known = set(FEATURES) | set(self.matchers)
+        used = set()
+
+        # Derived values may use features, matchers and earlier derived values
+        self.derived: List[Tuple[str, Any, Any]] = []
+        for name, source_expr in config.get("derived", {}).items():
+            tree, names = _parse(f"derived.{name}", source_expr, known)
+            used |= names
+            self.derived.append((name, *self._compile(name, tree)))
+            known.add(name)
+
+        categories = config.get("categories", {})
+        if not categories:
+            raise RuleError("No categories defined")
+        self.categories: List[Tuple[str, Any, Any]] = []
+        self.weights: List[float] = []
+        self.recommendations: List[Tuple[str, float, str]] = []
+        for name, spec in categories.items():
+            tree, names = _parse(f"categories.{name}", spec["expr"], known)
+            used |= names
+            self.categories.append((name, *self._compile(name, tree)))
+            self.weights.append(float(spec["weight"]))
+            if spec.get("recommendation"):
+                self.recommendations.append((name, spec.get("recommend_below", 70), spec["recommendation"]))
+
+        self.grades = [(float(threshold), grade) for threshold, grade in config.get("grades", [])]
+        self.default_grade = config.get("default_grade", "F")
+        self.default_recommendation = config.get("default_recommendation", "")
+
+        derived_names = {name for name, _, _ in self.derived}
+        self.plan: List[Tuple[str, Callable]] = [
+            (name, FEATURES.get(name) or self.matchers[name])
+            for name in sorted(used - derived_names)
+        ]
+
+    @staticmethod
+    def _compile(name: str, tree: ast.Expression):
+        scalar = compile(tree, f"<rule {name}>", "eval")
+        vector_tree = ast.fix_missing_locations(_Vectorize().visit(ast.parse(ast.unparse(tree), mode="eval")))
+        vector = compile(vector_tree, f"<rule {name} (vectorized)>", "eval")
+        return scalar, vector
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        """Feature values referenced by the rules"""
+        view = _Text(text)
+        return {name: extractor(view) for name, extractor in self.plan}
+
+    def evaluate(self, features: Dict[str, Any]) -> Dict:
+        """Score one resume from its features (raises on e.g. division by zero)"""
+        env = dict(features)
+        for name, scalar, _ in self.derived:
+            env[name] = eval(scalar, _SCALAR_NAMESPACE, env)
+
+        breakdown = {}
+        overall = 0
+        for (name, scalar, _), weight in zip(self.categories, self.weights):
+            breakdown[name] = int(eval(scalar, _SCALAR_NAMESPACE, env))
+            overall += breakdown[name] * weight
+
+        return {
+            "score": int(overall),
+            "breakdown": breakdown,
+            "grade": self.grade(overall),
+            "recommendations": [
+                text for name, below, text in self.recommendations if breakdown[name] < below
+            ] or [self.default_recommendation],
+            "rules_version": self.version
+        }
+
+    def grade(self, overall: float) -> str:
+        for threshold, grade in self.grades:
+            if overall >= threshold:
+                return grade
+        return self.default_grade
+
+    def error_result(self) -> Dict:
+        return {
+            "score": 0,
+            "breakdown": {},
+            "grade": "F",
+            "recommendations": ["Error analyzing resume"],
+            "rules_version": self.version
+        }
+
+    def score(self, text: str) -> Dict:
+        return self.evaluate(self.extract(text))
+
+    def feature_matrix(self, texts: Sequence[str]) -> np.ndarray:
+        """(n x features) matrix in `plan` order (float so readability indices fit)"""
+        matrix = np.zeros((len(texts), len(self.plan)), dtype=np.float64)
+        for i, text in enumerate(texts):
+            view = _Text(text)
+            matrix[i] = [extractor(view) for _, extractor in self.plan]
+        return matrix
+
+    def score_batch(self, texts: Sequence[str]) -> List[Dict]:
+        """Score many resumes; results are identical to calling `score` on each"""
+        if not texts:
+            return []
+        matrix = self.feature_matrix(texts)
+        context = _VectorContext(len(texts))
+        namespace = context.namespace()
+        env = {name: matrix[:, i] for i, (name, _) in enumerate(self.plan)}
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for name, _, vector in self.derived:
+                env[name] = eval(vector, namespace, env)
+            scores = np.stack([
+                np.broadcast_to(eval(vector, namespace, env), (len(texts),))
+                for _, _, vector in self.categories
+            ], axis=1).astype(np.int64)
+
+        # Accumulate left to right like `evaluate` so float rounding matches
+        overall = scores[:, 0] * self.weights[0]
+        for i in range(1, len(self.weights)):
+            overall = overall + scores[:, i] * self.weights[i]
+
+        thresholds = [overall >= threshold for threshold, _ in self.grades]
+        grades = np.select(thresholds, [grade for _, grade in self.grades], self.default_grade).tolist()
+        totals = overall.astype(np.int64).tolist()
+        score_rows = scores.tolist()
+        names = [name for name, _, _ in self.categories]
+        columns = {name: i for i, name in enumerate(names)}
+        recheck = context.zero_division.tolist()
+
+        results = []
+        for i in range(len(texts)):
+            if recheck[i]:
+                results.append(self._score_row(matrix[i]))
+                continue
+            breakdown = dict(zip(names, score_rows[i]))
+            results.append({
+                "score": totals[i],
+                "breakdown": breakdown,
+                "grade": grades[i],
+                "recommendations": [
+                    text for name, below, text in self.recommendations
+                    if score_rows[i][columns[name]] < below
+                ] or [self.default_recommendation],
+                "rules_version": self.version
+            })
+        return results
+
+    def _score_row(self, row: np.ndarray) -> Dict:
+        features = {
+            name: int(value) if value.is_integer() else value
+            for (name, _), value in zip(self.plan, row.tolist())
+        }
+        try:
+            return self.evaluate(features)
+        except Exception:
+            return self.error_result()
+
+
+def load_rules(path: str) -> CompiledRuleSet:
+    """Read, compile and sanity-check a rules file"""
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise RuleError(f"{path}: {e}")
+    rules = CompiledRuleSet(config, source=path)
+    try:
+        single = rules.score(_SAMPLE_RESUME)
+        batch = rules.score_batch([_SAMPLE_RESUME])[0]
+    except Exception as e:
+        raise RuleError(f"{path}: rules fail on a sample resume: {e}")
+    if single != batch:
+        raise RuleError(f"{path}: scalar and vectorized rules disagree ({single} != {batch})")
+    return rules
+
+
+class ScoringRules:
+    """
+    Holds the active rule set and hot-swaps it when the file changes
+
+    Readers take `current` once per request and keep using that object, so a
+    reload never changes rules under an in-flight request. A file that fails
+    to compile is logged and ignored; the previous rules stay active.
+    """
+
+    def __init__(self, path: str = None, reload_interval: float = None):
+        self.path = path or settings.SCORING_RULES_PATH or DEFAULT_RULES_PATH
+        self.reload_interval = (
+            settings.SCORING_RULES_RELOAD_INTERVAL if reload_interval is None else reload_interval
+        )
+        self._current: Optional[CompiledRuleSet] = None
+        self._stamp: Optional[Tuple[float, int]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def current(self) -> CompiledRuleSet:
+        if self._current is None:
+            self.reload()
+        return self._current
+
+    def _file_stamp(self) -> Tuple[float, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime, stat.st_size
+
+    def reload(self) -> bool:
+        """Compile the rules file and swap it in; returns False if it is invalid"""
+        stamp = self._file_stamp()
+        try:
+            rules = load_rules(self.path)
+        except (OSError, RuleError, KeyError, TypeError, ValueError) as e:
+            if self._current is None:
+                raise
+            logger.error(f"Scoring rules reload failed, keeping {self._current.fingerprint}: {e}")
+            self._stamp = stamp
+            return False
+
+        previous = self._current
+        self._current = rules  # Single reference swap
+        self._stamp = stamp
+        if previous is None or previous.fingerprint != rules.fingerprint:
+            logger.info(f"Scoring rules {rules.fingerprint} loaded from {self.path}")
+        return True
+
+    def reload_if_changed(self) -> bool:
+        try:
+            stamp = self._file_stamp()
+        except OSError as e:
+            logger.warning(f"Scoring rules file unavailable: {e}")
+            return False
+        if stamp == self._stamp:
+            return False
+        return self.reload()
+
+    async def start(self):
+        self.current  # Fail fast on an invalid file at startup
+        if self.reload_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                # Compiling is quick but touches the filesystem; keep it off the loop
+                await loop.run_in_executor(None, self.reload_if_changed)
+            except Exception as e:
+                logger.error(f"Scoring rules watcher error: {e}")
+
+
+scoring_rules = ScoringRules()
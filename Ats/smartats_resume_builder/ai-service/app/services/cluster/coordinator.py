@@ -0,0 +1,416 @@
+"""
+Batch Coordinator
+Shards large batches across AI service nodes and merges their streamed results
+"""
+
+import asyncio
+import contextlib
+import itertools
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+from app.services.cluster.worker_client import WorkerClient, WorkerError
+
+logger = logging.getLogger(__name__)
+
+SHARD_ATTEMPTS = Counter(
+    "coordinator_shard_attempts_total", "Shards dispatched to worker nodes", ["node", "outcome"]
+)
+ITEMS_MERGED = Counter("coordinator_items_total", "Batch items merged by the coordinator", ["outcome"])
+STEALS = Counter("coordinator_steals_total", "Unfinished shard items taken over by an idle node")
+ACTIVE_JOBS = Gauge("coordinator_active_jobs", "Distributed batch jobs in progress")
+
+_POLL = 0.25  # Idle slots re-check for stealable shards this often
+_MAX_BACKOFF = 5.0
+
+
+class NoWorkersAvailable(RuntimeError):
+    """Every worker node dropped out before the job finished"""
+
+
+class WorkerNode:
+    """A worker address, its persistent connection and its health across jobs"""
+
+    def __init__(self, address: str, token: str = "", connect_timeout: float = None):
+        self.address = address
+        self.client = WorkerClient(address, token, connect_timeout or settings.CLUSTER_CONNECT_TIMEOUT)
+        self.failures = 0  # Consecutive failed shards
+
+    def status(self) -> Dict:
+        return {"address": self.address, "connected": self.client.connected, "failures": self.failures}
+
+
+class _Shard:
+    """Items sent to a node as one batch request; `indexes` map its positions back to the job"""
+
+    __slots__ = ("indexes", "items", "attempt", "failed_on", "backup")
+
+    def __init__(self, indexes: List[int], items: List[Dict], attempt: int = 1,
+                 failed_on: FrozenSet[str] = frozenset(), backup: bool = False):
+        self.indexes = indexes
+        self.items = items
+        self.attempt = attempt
+        self.failed_on = failed_on  # Node addresses this shard already failed on
+        self.backup = backup  # Stolen copy of another attempt's unfinished items
+
+
+class _Attempt:
+    """A shard running on one node"""
+
+    __slots__ = ("shard", "node", "task", "started", "left", "stealable")
+
+    def __init__(self, shard: _Shard, node: WorkerNode):
+        self.shard = shard
+        self.node = node
+        self.task: Optional[asyncio.Task] = None
+        self.started = time.monotonic()
+        self.left = len(shard.indexes)  # Items no attempt has returned yet
+        self.stealable = not shard.backup
+
+
+class BatchJob:
+    """
+    One distributed batch
+
+    Items are read lazily into shards, keeping at most a window of items
+    outstanding, so inputs of any size stream through with flat memory.
+    Every node runs a few slots that pull the next shard from a shared
+    queue: fast nodes simply take more shards. Once nothing is queued, an
+    idle slot steals the unfinished items of the oldest slow shard on
+    another node and runs them itself. Whichever node returns an item first
+    wins; a shard whose items were all returned elsewhere is cancelled.
+    A shard that fails (connection lost, timeout, overload, server error)
+    goes back to the queue for a node it has not failed on, up to
+    `max_attempts` tries; a node with repeated failures sits out the rest
+    of the job.
+    """
+
+    def __init__(self, coordinator: "BatchCoordinator", method: str,
+                 items: Iterable[Tuple[int, Dict]], params: Optional[Dict] = None):
+        self.coordinator = coordinator
+        self.method = method
+        self.params = params or {}
+        self.started = time.monotonic()
+        self.total = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.steals = 0
+        self.duplicates = 0
+        self.nodes = {node.address: {"shards": 0, "items": 0, "failed_shards": 0, "steals": 0}
+                      for node in coordinator.nodes}
+
+        self._source = iter(items)
+        self._exhausted = False
+        self._window = len(coordinator.nodes) * coordinator.shards_per_node * coordinator.shard_size * 2
+        self._queue: Deque[_Shard] = deque()
+        self._outstanding: Dict[int, Dict] = {}  # Index -> item, from reading until a result is merged
+        self._covering: Dict[int, List[_Attempt]] = {}  # Index -> attempts running it
+        self._running: Set[_Attempt] = set()
+        self._retired: Set[str] = set()
+        self._typical = 0.0  # Moving average of successful shard durations
+        self._changed = asyncio.Event()
+        self._results: asyncio.Queue = asyncio.Queue()
+
+    @property
+    def complete(self) -> bool:
+        return self._exhausted and not self._outstanding
+
+    def progress(self) -> Dict:
+        return {
+            "method": self.method,
+            "read": self.total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "queued_shards": len(self._queue),
+            "running_shards": len(self._running),
+            "retries": self.retries,
+            "steals": self.steals,
+            "elapsed_s": round(time.monotonic() - self.started, 1),
+            "nodes": self.nodes,
+        }
+
+    async def run(self) -> AsyncIterator[Dict]:
+        """Result records as they arrive (job indexes, any order), then a summary record"""
+        coordinator = self.coordinator
+        slots = [
+            asyncio.create_task(self._slot(node))
+            for node in coordinator.nodes for _ in range(coordinator.shards_per_node)
+        ]
+        remaining = len(slots)
+
+        def slot_done(task: asyncio.Task):
+            nonlocal remaining
+            remaining -= 1
+            if not task.cancelled() and task.exception() is not None:
+                logger.error("Coordinator slot failed: %s", task.exception())
+            if not remaining:
+                self._results.put_nowait(None)
+
+        for slot in slots:
+            slot.add_done_callback(slot_done)
+
+        try:
+            while True:
+                record = await self._results.get()
+                if record is None:
+                    break
+                yield record
+        finally:
+            # Attempts are awaited too so their streams tell the workers to stop
+            tasks = slots + [attempt.task for attempt in self._running]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if not self.complete:
+            raise NoWorkersAvailable(
+                f"No worker node available after {self.succeeded + self.failed} of {self.total}+ items"
+            )
+        yield {
+            "summary": {
+                "total": self.total,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "elapsed_ms": int((time.monotonic() - self.started) * 1000),
+                "retries": self.retries,
+                "steals": self.steals,
+                "nodes": self.nodes,
+            }
+        }
+
+    # Scheduling
+
+    def _fill(self):
+        """Read shards from the source while the outstanding window has room"""
+        size = self.coordinator.shard_size
+        while not self._exhausted and len(self._outstanding) < self._window:
+            batch = list(itertools.islice(self._source, size))
+            if len(batch) < size:
+                self._exhausted = True
+            if batch:
+                indexes = [index for index, _ in batch]
+                items = [item for _, item in batch]
+                self._outstanding.update(batch)
+                self.total += len(batch)
+                self._queue.append(_Shard(indexes, items))
+
+    def _take(self, node: WorkerNode) -> Optional[_Shard]:
+        """Next queued shard this node may run, else a steal"""
+        self._fill()
+        healthy = {n.address for n in self.coordinator.nodes} - self._retired
+        for shard in self._queue:
+            # A shard that failed on every healthy node may go back to any of them
+            if node.address not in shard.failed_on or healthy <= shard.failed_on:
+                self._queue.remove(shard)
+                return shard
+        return self._steal(node)
+
+    def _steal(self, node: WorkerNode) -> Optional[_Shard]:
+        now = time.monotonic()
+        threshold = max(self.coordinator.steal_after, 2 * self._typical)
+        victims = [
+            attempt for attempt in self._running
+            if attempt.stealable and attempt.left and attempt.node is not node
+            and now - attempt.started >= threshold
+        ]
+        if not victims:
+            return None
+        victim = max(victims, key=lambda attempt: (attempt.left, now - attempt.started))
+        victim.stealable = False
+        indexes = [index for index in victim.shard.indexes if index in self._outstanding]
+        self.steals += 1
+        self.nodes[node.address]["steals"] += 1
+        STEALS.inc()
+        logger.info("%s took over %d items running on %s", node.address, len(indexes), victim.node.address)
+        return _Shard(indexes, [self._outstanding[index] for index in indexes],
+                      victim.shard.attempt, victim.shard.failed_on, backup=True)
+
+    async def _slot(self, node: WorkerNode):
+        """Pull and run shards on `node` until the job is done or the node retires"""
+        while node.address not in self._retired:
+            shard = self._take(node)
+            if shard is None:
+                if self.complete:
+                    return
+                self._changed.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._changed.wait(), _POLL)
+                continue
+            if not await self._run(node, shard) and node.address not in self._retired:
+                await asyncio.sleep(min(0.1 * 2 ** node.failures, _MAX_BACKOFF))
+
+    async def _run(self, node: WorkerNode, shard: _Shard) -> bool:
+        """Run one shard attempt; False if it failed because of the node"""
+        attempt = _Attempt(shard, node)
+        for index in shard.indexes:
+            self._covering.setdefault(index, []).append(attempt)
+        self._running.add(attempt)
+        stats = self.nodes[node.address]
+        stats["shards"] += 1
+
+        # A separate task so a fully superseded attempt can be cancelled on its own
+        attempt.task = asyncio.create_task(self._consume(attempt))
+        try:
+            await asyncio.wait({attempt.task})
+        finally:
+            self._running.discard(attempt)
+            for index in shard.indexes:
+                covering = self._covering[index]
+                covering.remove(attempt)
+                if not covering:
+                    del self._covering[index]
+            self._changed.set()
+
+        if attempt.task.cancelled():
+            SHARD_ATTEMPTS.labels(node=node.address, outcome="superseded").inc()
+            return True
+        error = attempt.task.exception()
+        if error is None and self._abandoned(shard):
+            error = WorkerError(502, "Worker omitted items from the shard")
+        if error is None:
+            node.failures = 0
+            elapsed = time.monotonic() - attempt.started
+            self._typical = elapsed if not self._typical else 0.8 * self._typical + 0.2 * elapsed
+            SHARD_ATTEMPTS.labels(node=node.address, outcome="ok").inc()
+            return True
+
+        stats["failed_shards"] += 1
+        if isinstance(error, WorkerError) and not error.retryable:
+            # The request itself is bad; another node would reject it too
+            SHARD_ATTEMPTS.labels(node=node.address, outcome="rejected").inc()
+            self._fail(self._abandoned(shard), str(error))
+            return True
+
+        SHARD_ATTEMPTS.labels(node=node.address, outcome="failed").inc()
+        node.failures += 1
+        logger.warning("Shard of %d items failed on %s: %r", len(shard.indexes), node.address, error)
+        if node.failures >= self.coordinator.node_failures and node.address not in self._retired:
+            logger.warning("Worker %s failed %d shards in a row, skipping it", node.address, node.failures)
+            self._retired.add(node.address)
+
+        leftover = self._abandoned(shard)
+        if leftover:
+            if shard.attempt >= self.coordinator.max_attempts:
+                self._fail(leftover, f"Failed on {shard.attempt} nodes: {error}")
+            else:
+                self.retries += 1
+                self._queue.appendleft(_Shard(
+                    leftover, [self._outstanding[index] for index in leftover],
+                    shard.attempt + 1, shard.failed_on | {node.address}
+                ))
+        return False
+
+    def _abandoned(self, shard: _Shard) -> List[int]:
+        """Items of a finished attempt that no result and no other attempt covers"""
+        return [index for index in shard.indexes if index in self._outstanding and index not in self._covering]
+
+    # Merging
+
+    async def _consume(self, attempt: _Attempt):
+        shard = attempt.shard
+        stream = attempt.node.client.stream(
+            self.method, {**self.params, "items": shard.items}, timeout=self.coordinator.shard_timeout
+        )
+        async with contextlib.aclosing(stream):
+            async for record in stream:
+                if "summary" in record:
+                    break
+                position = record.get("index")
+                if isinstance(position, int) and 0 <= position < len(shard.indexes):
+                    self._merge(attempt, shard.indexes[position], record)
+
+    def _merge(self, attempt: _Attempt, index: int, record: Dict):
+        if self._outstanding.pop(index, None) is None:
+            self.duplicates += 1  # Already returned by another attempt
+            return
+        record["index"] = index
+        if "error" in record:
+            self.failed += 1
+            ITEMS_MERGED.labels(outcome="error").inc()
+        else:
+            self.succeeded += 1
+            ITEMS_MERGED.labels(outcome="ok").inc()
+        self.nodes[attempt.node.address]["items"] += 1
+        self._results.put_nowait(record)
+
+        for other in self._covering.get(index, ()):
+            other.left -= 1
+            if not other.left and other is not attempt:
+                other.task.cancel()  # Everything it was running has been returned elsewhere
+
+    def _fail(self, indexes: List[int], message: str):
+        for index in indexes:
+            item = self._outstanding.pop(index)
+            self.failed += 1
+            ITEMS_MERGED.labels(outcome="error").inc()
+            self._results.put_nowait({"index": index, "id": item.get("id"), "error": message})
+
+
+class BatchCoordinator:
+    """Worker nodes with persistent connections, shared by the jobs of this process"""
+
+    def __init__(
+        self,
+        addresses: Iterable[str],
+        token: str = None,
+        shard_size: int = None,
+        shards_per_node: int = None,
+        max_attempts: int = None,
+        shard_timeout: float = None,
+        steal_after: float = None,
+        node_failures: int = None,
+    ):
+        token = settings.CLUSTER_TOKEN if token is None else token
+        self.nodes = [WorkerNode(address.strip(), token) for address in addresses if address.strip()]
+        self.shard_size = max(1, shard_size or settings.CLUSTER_SHARD_SIZE)
+        self.shards_per_node = max(1, shards_per_node or settings.CLUSTER_SHARDS_PER_NODE)
+        self.max_attempts = max(1, max_attempts or settings.CLUSTER_MAX_ATTEMPTS)
+        self.shard_timeout = shard_timeout or settings.CLUSTER_SHARD_TIMEOUT
+        self.steal_after = settings.CLUSTER_STEAL_AFTER if steal_after is None else steal_after
+        self.node_failures = max(1, node_failures or settings.CLUSTER_NODE_FAILURES)
+        self._jobs: Set[BatchJob] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.nodes)
+
+    async def run(
+        self, method: str, items: Iterable[Tuple[int, Dict]], params: Optional[Dict] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Run a batch RPC method (score_batch, analyze_batch, match_batch) across the nodes
+
+        `items` yields (index, item) pairs and may be lazy; `params` are sent
+        with every shard. Yields {"index", "id", "result" | "error"} records as
+        they arrive, then {"summary": {...}}. Raises NoWorkersAvailable if
+        every node drops out first; records already yielded stay valid.
+        """
+        job = BatchJob(self, method, items, params)
+        self._jobs.add(job)
+        ACTIVE_JOBS.inc()
+        try:
+            async with contextlib.aclosing(job.run()) as records:
+                async for record in records:
+                    yield record
+        finally:
+            self._jobs.discard(job)
+            ACTIVE_JOBS.dec()
+
+    def status(self) -> Dict:
+        return {
+            "nodes": [node.status() for node in self.nodes],
+            "jobs": [job.progress() for job in self._jobs],
+        }
+
+    async def close(self):
+        for node in self.nodes:
+            await node.client.close()
+
+
+batch_coordinator = BatchCoordinator(settings.CLUSTER_WORKERS)
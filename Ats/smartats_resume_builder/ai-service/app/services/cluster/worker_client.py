@@ -0,0 +1,186 @@
+"""
+Worker Client
+Persistent msgpack RPC connection to another AI service node (protocol in app/api/rpc.py)
+"""
+
+import asyncio
+import contextlib
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_HEADER_SIZE = 4
+
+
+class WorkerError(Exception):
+    """An error response from a worker"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+    @property
+    def retryable(self) -> bool:
+        # Overload, auth and server errors are specific to the node; bad input fails everywhere
+        return self.status in (401, 429) or self.status >= 500
+
+
+class WorkerClient:
+    """
+    One multiplexed connection to a worker's internal RPC listener
+
+    Requests share the connection and are matched to responses by id, so
+    several shards can stream back at once. The connection is opened on
+    first use and reopened by the next request after it drops; requests
+    in flight when it drops fail with ConnectionError.
+    """
+
+    def __init__(self, address: str, token: str = "", connect_timeout: float = 5.0):
+        self.address = address
+        self.token = token
+        self.connect_timeout = connect_timeout
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Queue] = {}
+        self._next_id = 0
+        self._connect_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    async def connect(self):
+        if self._writer is not None:
+            return
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            if self.address.startswith("unix:"):
+                opening = asyncio.open_unix_connection(self.address[len("unix:"):])
+            else:
+                host, _, port = self.address.rpartition(":")
+                opening = asyncio.open_connection(host or "127.0.0.1", int(port))
+            reader, self._writer = await asyncio.wait_for(opening, self.connect_timeout)
+            self._read_task = asyncio.create_task(self._read_loop(reader))
+            if self.token:
+                try:
+                    await self._call("auth", {"token": self.token}, self.connect_timeout)
+                except Exception:
+                    self._disconnect()
+                    raise
+            logger.info("Connected to worker %s", self.address)
+
+    async def close(self):
+        self._disconnect()
+        if self._read_task is not None:
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._read_task
+            self._read_task = None
+
+    def _disconnect(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        if self._read_task is not None and self._read_task is not asyncio.current_task():
+            self._read_task.cancel()
+        for queue in self._pending.values():
+            queue.put_nowait(None)  # Connection lost
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                header = await reader.readexactly(_HEADER_SIZE)
+                message = msgpack.unpackb(await reader.readexactly(int.from_bytes(header, "big")), raw=False)
+                queue = self._pending.get(message.get("id"))
+                if queue is not None:
+                    queue.put_nowait(message)
+                elif "error" in message:
+                    logger.warning("Worker %s: %s", self.address, message["error"].get("message"))
+                # Anything else answers a request that was abandoned (cancelled or timed out)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            logger.warning("Connection to worker %s lost", self.address)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error("Unreadable frame from worker %s: %s", self.address, e)
+        finally:
+            self._disconnect()
+
+    async def _send(self, message: Dict):
+        payload = msgpack.packb(message, use_bin_type=True)
+        async with self._write_lock:
+            if self._writer is None:
+                raise ConnectionError(f"Not connected to worker {self.address}")
+            self._writer.write(len(payload).to_bytes(_HEADER_SIZE, "big") + payload)
+            await self._writer.drain()
+
+    async def _open(self, method: str, params: Optional[Dict]) -> Tuple[int, asyncio.Queue]:
+        self._next_id += 1
+        request_id = self._next_id
+        queue = asyncio.Queue()
+        self._pending[request_id] = queue
+        try:
+            await self._send({"id": request_id, "method": method, "params": params or {}})
+        except BaseException:
+            del self._pending[request_id]
+            raise
+        return request_id, queue
+
+    async def _receive(self, queue: asyncio.Queue, timeout: Optional[float]) -> Dict:
+        message = await asyncio.wait_for(queue.get(), timeout)
+        if message is None:
+            raise ConnectionError(f"Connection to worker {self.address} lost")
+        if "error" in message:
+            error = message["error"] or {}
+            raise WorkerError(error.get("status", 500), error.get("message", "Unknown error"))
+        return message
+
+    async def _call(self, method: str, params: Optional[Dict], timeout: Optional[float]) -> Any:
+        request_id, queue = await self._open(method, params)
+        try:
+            return (await self._receive(queue, timeout))["result"]
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def call(self, method: str, params: Optional[Dict] = None, timeout: Optional[float] = None) -> Any:
+        """Unary request; raises WorkerError, ConnectionError or asyncio.TimeoutError"""
+        await self.connect()
+        return await self._call(method, params, timeout)
+
+    async def stream(
+        self, method: str, params: Optional[Dict] = None, timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Records of a streaming batch request, ending with its summary record
+
+        `timeout` bounds the wait for each record, not the whole stream.
+        Closing the iterator early cancels the request on the worker.
+        """
+        await self.connect()
+        request_id, queue = await self._open(method, params)
+        done = False
+        try:
+            while not done:
+                message = await self._receive(queue, timeout)
+                done = bool(message.get("done"))
+                yield message["record"]
+            done = True
+        except WorkerError:
+            done = True  # The worker has already finished the request
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+            if not done and self._writer is not None:
+                with contextlib.suppress(ConnectionError, OSError):
+                    await self._send({"method": "cancel", "params": {"id": request_id}})
@@ -0,0 +1,216 @@
+"""
+Job Profile Store
+Precomputed keywords, skills and embeddings for job descriptions
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+from app.services.nlp.keyword_extractor import KeywordExtractor
+
+logger = logging.getLogger(__name__)
+
+
+class JobProfile(BaseModel):
+    """Everything the service derives from a job description, computed once"""
+    job_id: str
+    description: str
+    content_hash: str
+    keywords: List[str] = Field(default_factory=list)
+    skills: Dict[str, List[str]] = Field(default_factory=lambda: {"technical": [], "soft": []})
+    requirements: List[str] = Field(default_factory=list, description="Normalized requirement terms")
+    embedding: Optional[List[float]] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+def content_hash(description: str) -> str:
+    """Hash of a job description, insensitive to case and whitespace changes"""
+    normalized = re.sub(r"\s+", " ", description.strip().lower())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def build_profile(
+    description: str,
+    extractor: KeywordExtractor,
+    job_id: Optional[str] = None,
+    embedding_model=None
+) -> JobProfile:
+    """Run keyword/skill extraction (and embedding) for a job description"""
+    digest = content_hash(description)
+    keywords = extractor.extract_keywords(description, top_n=30)
+    skills = extractor.extract_skills(description, whole_words=True)
+
+    requirements = sorted({
+        term.lower()
+        for term in keywords + skills["technical"] + skills["soft"]
+    })
+
+    embedding = None
+    if embedding_model is not None:
+        try:
+            embedding = [float(x) for x in embedding_model.encode(description)]
+        except Exception as e:
+            logger.warning(f"Job description embedding failed: {e}")
+
+    return JobProfile(
+        job_id=job_id or f"jd_{digest[:16]}",
+        description=description,
+        content_hash=digest,
+        keywords=keywords,
+        skills=skills,
+        requirements=requirements,
+        embedding=embedding
+    )
+
+
+class InMemoryJobProfileBackend:
+    """
+    Local stand-in for the shared profile backend
+
+    Bounded like Redis would be: least recently used profiles are evicted
+    beyond `max_size`, and profiles expire after `ttl` seconds (0 = never).
+    """
+
+    def __init__(self, max_size: int = None, ttl: int = None):
+        self.max_size = max_size or settings.JOB_PROFILE_CACHE_SIZE
+        self.ttl = settings.JOB_PROFILE_TTL if ttl is None else ttl
+        self.profiles: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # job id -> (data, expiry)
+
+    async def get(self, job_id: str) -> Optional[str]:
+        entry = self.profiles.get(job_id)
+        if entry is None:
+            return None
+        data, expires = entry
+        if expires and time.monotonic() >= expires:
+            del self.profiles[job_id]
+            return None
+        self.profiles.move_to_end(job_id)
+        return data
+
+    async def set(self, job_id: str, data: str):
+        self.profiles[job_id] = (data, time.monotonic() + self.ttl if self.ttl else 0.0)
+        self.profiles.move_to_end(job_id)
+        while len(self.profiles) > self.max_size:
+            self.profiles.popitem(last=False)
+
+    async def delete(self, job_id: str):
+        self.profiles.pop(job_id, None)
+
+
+class JobProfileStoreUnavailable(RuntimeError):
+    """The profile backend could not be read"""
+
+
+class RedisJobProfileBackend:
+    """Profiles shared across workers and restarts through Redis"""
+
+    def __init__(self, client, prefix: str = "jobprofile:", ttl: int = 0):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    async def get(self, job_id: str) -> Optional[str]:
+        data = await self.client.get(self.prefix + job_id)
+        return data.decode("utf-8") if isinstance(data, bytes) else data
+
+    async def set(self, job_id: str, data: str):
+        await self.client.set(self.prefix + job_id, data, ex=self.ttl or None)
+
+    async def delete(self, job_id: str):
+        await self.client.delete(self.prefix + job_id)
+
+
+class JobProfileStore:
+    """
+    Two-level job profile store
+
+    Profiles are served from an in-process LRU cache and fall back to the
+    shared backend (Redis, or a dict for local runs), so each posting is
+    analyzed once no matter how many candidates are scored against it.
+    Cached copies expire after `cache_ttl` (never later than the backend's
+    own TTL), which bounds how long a worker can serve a profile that
+    another worker re-registered or deleted.
+    """
+
+    def __init__(self, backend=None, cache_size: int = None, cache_ttl: int = None):
+        self.backend = backend
+        self.cache_size = cache_size or settings.JOB_PROFILE_CACHE_SIZE
+        cache_ttl = settings.JOB_PROFILE_CACHE_TTL if cache_ttl is None else cache_ttl
+        if settings.JOB_PROFILE_TTL:
+            cache_ttl = min(cache_ttl, settings.JOB_PROFILE_TTL) if cache_ttl else settings.JOB_PROFILE_TTL
+        self.cache_ttl = cache_ttl
+        self.cache: "OrderedDict[str, Tuple[JobProfile, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_backend(self):
+        if self.backend is None:
+            if settings.JOB_PROFILE_BACKEND == "redis":
+                try:
+                    import redis.asyncio as redis
+
+                    self.backend = RedisJobProfileBackend(
+                        redis.from_url(settings.REDIS_URL),
+                        ttl=settings.JOB_PROFILE_TTL
+                    )
+                except Exception as e:
+                    logger.warning(f"Redis job profile backend unavailable: {e}")
+            if self.backend is None:
+                self.backend = InMemoryJobProfileBackend()
+        return self.backend
+
+    def _cache_put(self, profile: JobProfile):
+        expiry = time.monotonic() + self.cache_ttl if self.cache_ttl else float("inf")
+        self.cache[profile.job_id] = (profile, expiry)
+        self.cache.move_to_end(profile.job_id)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def get(self, job_id: str) -> Optional[JobProfile]:
+        """
+        The profile registered as `job_id`, or None if there is none
+
+        Raises:
+            JobProfileStoreUnavailable: if the backend cannot be read
+        """
+        entry = self.cache.get(job_id)
+        if entry is not None:
+            profile, expiry = entry
+            if time.monotonic() < expiry:
+                self.cache.move_to_end(job_id)
+                self.hits += 1
+                return profile
+            del self.cache[job_id]
+
+        self.misses += 1
+        try:
+            data = await self._get_backend().get(job_id)
+        except Exception as e:
+            logger.warning("Job profile lookup failed for %s: %s", job_id, e)
+            raise JobProfileStoreUnavailable(str(e)) from e
+        if data is None:
+            return None
+
+        profile = JobProfile.model_validate(json.loads(data))
+        self._cache_put(profile)
+        return profile
+
+    async def put(self, profile: JobProfile):
+        self._cache_put(profile)
+        await self._get_backend().set(profile.job_id, profile.model_dump_json())
+
+    async def delete(self, job_id: str):
+        self.cache.pop(job_id, None)
+        await self._get_backend().delete(job_id)
+
+
+job_profile_store = JobProfileStore()
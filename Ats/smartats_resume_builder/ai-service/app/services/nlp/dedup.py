@@ -0,0 +1,271 @@
+"""
+Near-Duplicate Resume Detection
+MinHash signatures over token shingles with a banded LSH index
+"""
+
+import hashlib
+import logging
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+from app.services.nlp.keyword_extractor import KeywordExtractor
+
+logger = logging.getLogger(__name__)
+
+DEDUP_INDEX_SIZE = Gauge("dedup_index_entries", "Resumes in the near-duplicate LSH index")
+DEDUP_EVICTIONS = Counter("dedup_index_evictions_total", "LSH index entries evicted at capacity")
+DEDUP_DUPLICATES = Counter("dedup_duplicates_total", "Resumes flagged as near-duplicates")
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+@dataclass
+class DuplicateMatch:
+    """A previously indexed resume similar to the query"""
+    doc_id: str
+    similarity: float
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures from word shingles
+
+    Shingles are hashed with crc32 and all permutations are applied at once as
+    a (num_perm x shingles) array operation, so a typical resume costs a few
+    hundred microseconds. Signatures keep the low 16 bits of each minimum,
+    which halves index memory at a negligible collision rate.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 1 << 31, size=(num_perm, 1), dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, tokens: List[str]) -> np.ndarray:
+        size = self.shingle_size
+        if len(tokens) >= size:
+            shingles = {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+        else:
+            shingles = {" ".join(tokens)}
+
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        # a, b < 2^31 and hashes < 2^32, so a * h + b cannot overflow uint64
+        permuted = (self.a * hashes + self.b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1).astype(np.uint16)
+
+
+class LSHIndex:
+    """
+    Banded LSH index stored in flat NumPy arrays
+
+    Signatures live in one (capacity x num_perm) uint16 array. Each band keeps
+    a sorted array of 64-bit band hashes with matching row numbers, searched
+    with `searchsorted`; new entries go to small per-band dicts that are merged
+    into the sorted arrays in bulk. That is roughly 270 bytes per resume, so
+    millions of entries fit in a few hundred MB.
+
+    At `max_entries` the least recently added or matched entry is evicted and
+    its row reused. Its old band hashes are dropped at the next merge; until
+    then they can only add candidates, which are checked against the row's
+    current signature anyway.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 8,
+        merge_threshold: int = 10000,
+        max_entries: int = None
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.merge_threshold = merge_threshold
+        self.max_entries = max_entries or settings.DEDUP_INDEX_MAX_ENTRIES
+
+        self.signatures = np.zeros((1024, num_perm), dtype=np.uint16)
+        self.row_keys = np.zeros((1024, bands), dtype=np.uint64)  # Current band hashes per row
+        self.doc_ids: List[str] = []
+        self.recent: "OrderedDict[str, int]" = OrderedDict()  # doc id -> row, least recent first
+        self.sorted_keys = [np.zeros(0, dtype=np.uint64) for _ in range(bands)]
+        self.sorted_rows = [np.zeros(0, dtype=np.uint32) for _ in range(bands)]
+        self.pending: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self.pending_count = 0
+
+    def __len__(self) -> int:
+        return len(self.recent)
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        bands = signature.reshape(self.bands, self.rows)
+        return [
+            int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "little")
+            for band in bands
+        ]
+
+    def add(self, doc_id: str, signature: np.ndarray):
+        if doc_id in self.recent:
+            self.touch(doc_id)
+            return
+
+        if len(self.recent) >= self.max_entries:
+            _, row = self.recent.popitem(last=False)
+            self.doc_ids[row] = doc_id
+            DEDUP_EVICTIONS.inc()
+        else:
+            row = len(self.doc_ids)
+            if row >= len(self.signatures):
+                size = len(self.signatures) * 2
+                signatures = np.zeros((size, self.num_perm), dtype=np.uint16)
+                signatures[:row] = self.signatures[:row]
+                row_keys = np.zeros((size, self.bands), dtype=np.uint64)
+                row_keys[:row] = self.row_keys[:row]
+                self.signatures, self.row_keys = signatures, row_keys
+            self.doc_ids.append(doc_id)
+        self.signatures[row] = signature
+        self.recent[doc_id] = row
+
+        keys = self._band_keys(signature)
+        self.row_keys[row] = keys
+        for band, key in enumerate(keys):
+            self.pending[band].setdefault(key, []).append(row)
+        self.pending_count += 1
+        if self.pending_count >= self.merge_threshold:
+            self._merge()
+
+    def _merge(self):
+        for band in range(self.bands):
+            pending = self.pending[band]
+            if not pending:
+                continue
+            keys = np.fromiter(
+                (key for key, rows in pending.items() for _ in rows), dtype=np.uint64
+            )
+            rows = np.fromiter(
+                (row for rows in pending.values() for row in rows), dtype=np.uint32
+            )
+            all_keys = np.concatenate([self.sorted_keys[band], keys])
+            all_rows = np.concatenate([self.sorted_rows[band], rows])
+            # Drop hashes of evicted entries whose rows now hold another signature
+            current = self.row_keys[all_rows, band] == all_keys
+            all_keys, all_rows = all_keys[current], all_rows[current]
+            order = np.argsort(all_keys, kind="stable")
+            self.sorted_keys[band] = all_keys[order]
+            self.sorted_rows[band] = all_rows[order]
+            self.pending[band] = {}
+        self.pending_count = 0
+
+    def touch(self, doc_id: str):
+        """Mark an entry as recently used, so it is evicted last"""
+        if doc_id in self.recent:
+            self.recent.move_to_end(doc_id)
+
+    def query(
+        self,
+        signature: np.ndarray,
+        threshold: float,
+        exclude: Optional[str] = None
+    ) -> Optional[DuplicateMatch]:
+        """Most similar indexed entry at or above `threshold` other than `exclude`, if any"""
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            keys = self.sorted_keys[band]
+            if len(keys):
+                key64 = np.uint64(key)
+                lo = np.searchsorted(keys, key64, side="left")
+                hi = np.searchsorted(keys, key64, side="right")
+                candidates.update(self.sorted_rows[band][lo:hi].tolist())
+            candidates.update(self.pending[band].get(key, ()))
+
+        candidates.discard(self.recent.get(exclude))
+        if not candidates:
+            return None
+
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarities = (self.signatures[rows] == signature).mean(axis=1)
+        best = int(similarities.argmax())
+        if similarities[best] < threshold:
+            return None
+        return DuplicateMatch(self.doc_ids[rows[best]], float(similarities[best]))
+
+
+class DuplicateDetector:
+    """
+    Flags near-duplicate resumes and remembers recent results
+
+    Every distinct resume is added to the LSH index; near-duplicates are not,
+    so mass-applied copies don't grow it. A near-duplicate match is only a
+    flag: the shingles ignore digits and short words, so "40%" vs "70%" or an
+    added "Go" still match. Stored results are therefore keyed by an exact
+    content hash (plus request variant) and only reused for identical text.
+    """
+
+    def __init__(self, threshold: float = None, result_cache_size: int = None):
+        self.threshold = threshold or settings.DEDUP_THRESHOLD
+        self.result_cache_size = result_cache_size or settings.DEDUP_RESULT_CACHE_SIZE
+        self.hasher = MinHasher(num_perm=settings.DEDUP_NUM_PERM)
+        self.index = LSHIndex(
+            num_perm=settings.DEDUP_NUM_PERM,
+            bands=settings.DEDUP_BANDS,
+            max_entries=settings.DEDUP_INDEX_MAX_ENTRIES
+        )
+        self.extractor = KeywordExtractor(use_keybert=False)
+        self.results: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self.duplicates = 0
+
+    def check(self, text: str) -> Tuple[str, Optional[DuplicateMatch]]:
+        """
+        Find a near-duplicate of `text`, indexing it if it is new
+
+        A resubmission of an indexed resume is not its own duplicate; it is
+        only flagged if it matches another entry.
+
+        Returns:
+            (doc_id to store results under, match or None)
+        """
+        doc_id = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+        signature = self.hasher.signature(self.extractor.tokenize(text))
+        match = self.index.query(signature, self.threshold, exclude=doc_id)
+        if match is not None:
+            self.duplicates += 1
+            DEDUP_DUPLICATES.inc()
+            self.index.touch(match.doc_id)
+            return match.doc_id, match
+
+        self.index.add(doc_id, signature)
+        return doc_id, None
+
+    @staticmethod
+    def content_key(text: str) -> str:
+        """Exact content hash; any normalization could change the analysis (paragraphs, bullets)"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_result(self, content_key: str, variant: str) -> Optional[Any]:
+        result = self.results.get((content_key, variant))
+        if result is not None:
+            self.results.move_to_end((content_key, variant))
+        return result
+
+    def put_result(self, content_key: str, variant: str, result: Any):
+        self.results[(content_key, variant)] = result
+        self.results.move_to_end((content_key, variant))
+        if len(self.results) > self.result_cache_size:
+            self.results.popitem(last=False)
+
+
+duplicate_detector = DuplicateDetector()
+DEDUP_INDEX_SIZE.set_function(lambda: len(duplicate_detector.index))
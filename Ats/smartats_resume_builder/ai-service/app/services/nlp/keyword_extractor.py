@@ -6,6 +6,7 @@ Uses KeyBERT and NLP techniques for intelligent keyword extraction
 import re
 from typing import List, Dict, Tuple
 from collections import Counter
+from functools import lru_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,9 +21,18 @@ class KeywordExtractor:
     - Custom domain-specific extraction
     """
     
-    def __init__(self):
+    def __init__(self, use_keybert: bool = True):
         self.stop_words = self._load_stop_words()
         self.technical_skills = self._load_technical_skills()
+        # Whole-word forms; "+" and "#" count as word characters so "C" doesn't match "C++"
+        self.skill_patterns = [
+            (skill, re.compile(r'(?<![\w+#])' + re.escape(skill.lower()) + r'(?![\w+#])'))
+            for skill in self.technical_skills
+        ]
+        self.use_keybert = False
+        
+        if not use_keybert:
+            return
         
         # Try to load KeyBERT model
         try:
@@ -32,7 +42,6 @@ class KeywordExtractor:
             logger.info("KeyBERT model loaded successfully")
         except Exception as e:
             logger.warning(f"KeyBERT not available: {e}")
-            self.use_keybert = False
     
     def extract_keywords(self, text: str, top_n: int = 20) -> List[str]:
         """
@@ -54,19 +63,29 @@ class KeywordExtractor:
             logger.error(f"Keyword extraction failed: {e}")
             return self._extract_simple(text, top_n)
     
-    def extract_skills(self, text: str) -> Dict[str, List[str]]:
+    def extract_skills(self, text: str, whole_words: bool = False) -> Dict[str, List[str]]:
         """
         Extract technical and soft skills from text
         
+        Args:
+            text: Input text
+            whole_words: Only match skills as whole words, so "Go" or "R" are not
+                found inside "Google" or "React"
+        
         Returns:
             Dict with 'technical' and 'soft' skill lists
         """
         text_lower = text.lower()
         
         technical = []
-        for skill in self.technical_skills:
-            if skill.lower() in text_lower:
-                technical.append(skill)
+        if whole_words:
+            for skill, pattern in self.skill_patterns:
+                if pattern.search(text_lower):
+                    technical.append(skill)
+        else:
+            for skill in self.technical_skills:
+                if skill.lower() in text_lower:
+                    technical.append(skill)
         
         # Soft skills patterns
         soft_skills_patterns = [
@@ -85,6 +104,11 @@ class KeywordExtractor:
             "soft": soft
         }
     
+    def tokenize(self, text: str) -> List[str]:
+        """Normalized word tokens (lowercase, 3+ letters, no stop words)"""
+        words = re.findall(r'\b[a-zA-Z]{3,}\b', text.lower())
+        return [w for w in words if w not in self.stop_words]
+    
     def calculate_keyword_density(self, text: str, keywords: List[str]) -> Dict[str, float]:
         """
         Calculate keyword density for given keywords
@@ -116,11 +140,8 @@ class KeywordExtractor:
     
     def _extract_with_tfidf(self, text: str, top_n: int) -> List[str]:
         """Extract keywords using TF-IDF approach"""
-        # Clean and tokenize
-        words = re.findall(r'\b[a-zA-Z]{3,}\b', text.lower())
-        
-        # Remove stop words
-        words = [w for w in words if w not in self.stop_words]
+        # Clean, tokenize and remove stop words
+        words = self.tokenize(text)
         
         # Count frequencies
         word_freq = Counter(words)
@@ -177,3 +198,9 @@ class KeywordExtractor:
             "Agile", "Scrum", "Kanban", "CI/CD", "TDD", "Microservices",
             "REST API", "GraphQL", "WebSocket"
         ]
+
+
+@lru_cache()
+def get_keyword_extractor(use_keybert: bool = True) -> KeywordExtractor:
+    """Shared extractor, so KeyBERT loads once per process rather than once per request"""
+    return KeywordExtractor(use_keybert=use_keybert)
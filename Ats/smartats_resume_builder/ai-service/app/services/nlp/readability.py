@@ -0,0 +1,237 @@
+"""
+Readability Analytics
+Sentence, syllable, bullet and paragraph statistics from one pass over the text
+"""
+
+import logging
+import math
+import re
+from functools import cached_property, lru_cache
+from typing import Dict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_PARAGRAPH_BREAK_RE = re.compile(r"\n\n")
+# Segmenter bullet markers, matched at the first word of a line
+_BULLET_MARKER_RE = re.compile(r"(?:[-•*▪●◦‣]|\d{1,2}[.)])[^\S\n]+(?=\S)")
+_MARKER_CHARS = frozenset("-•*▪●◦‣0123456789")
+_NON_ALPHA_RE = re.compile(r"[^a-z]+")
+_VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+_SILENT_SUFFIX_RE = re.compile(r"(?:[^laeiouy]es|[^laeiouy]ed|[^laeiouy]e)$")
+
+# Ratios computed from the syllable lookup (0.0 for text without words)
+_INDICES = (
+    "avg_unit_words", "flesch_reading_ease", "flesch_kincaid_grade", "gunning_fog",
+    "smog", "coleman_liau", "automated_readability",
+)
+
+LONG_SENTENCE_WORDS = 25
+LONG_BULLET_WORDS = 30
+LONG_PARAGRAPH_WORDS = 100
+SYLLABLE_CACHE_SIZE = 100000
+
+# Words the vowel-group heuristic miscounts, mostly common resume vocabulary
+_SYLLABLE_EXCEPTIONS = {
+    "business": 2, "created": 3, "creating": 3, "create": 2, "area": 3, "areas": 3,
+    "idea": 3, "ideas": 3, "real": 1, "via": 2, "science": 2, "client": 2, "clients": 2,
+    "quiet": 2, "diet": 2, "being": 2, "agile": 2, "mobile": 2, "profile": 2,
+    "every": 3, "evening": 3, "different": 3, "interest": 3, "interested": 4,
+    "initiated": 5, "negotiated": 5, "associated": 5, "appreciated": 5,
+    "evaluated": 5, "graduated": 4, "previous": 3, "various": 3, "serious": 3,
+    "experience": 4, "experienced": 4, "period": 3, "ruby": 2, "people": 2,
+    "simple": 2, "google": 2, "title": 2, "little": 2, "able": 2, "table": 2,
+    "scalable": 3, "reliable": 4, "available": 4, "automate": 3, "automated": 4,
+    "machine": 2, "engine": 2, "engineer": 3, "engineers": 3, "engineering": 4,
+    "software": 2, "hardware": 2, "sometimes": 2, "whereas": 2, "someone": 2,
+}
+
+# Lowercased word -> syllables << 8 | letters (letters capped at 255); 0 marks numbers
+# and symbols. Packed into one int so a resume's lookups become one int64 array.
+_SYLLABLES: Dict[str, int] = {
+    word: count << 8 | len(word) for word, count in _SYLLABLE_EXCEPTIONS.items()
+}
+
+
+def _estimate_syllables(letters: str) -> int:
+    """Vowel-group heuristic: silent trailing e/es/ed removed, at least one syllable"""
+    if len(letters) <= 3:
+        return 1
+    stem = _SILENT_SUFFIX_RE.sub(lambda m: m.group()[0], letters)
+    if stem.startswith("y"):
+        stem = stem[1:]
+    return max(1, len(_VOWEL_GROUP_RE.findall(stem)))
+
+
+def _lookup(key: str) -> int:
+    """Packed syllables and letters of a lowercased word, estimated and remembered on a table miss"""
+    entry = _SYLLABLES.get(key)
+    if entry is None:
+        letters = _NON_ALPHA_RE.sub("", key)
+        if not letters:
+            entry = 0
+        else:
+            entry = _SYLLABLES.get(letters) or _estimate_syllables(letters) << 8 | min(len(letters), 255)
+        if len(_SYLLABLES) < SYLLABLE_CACHE_SIZE:
+            _SYLLABLES[key] = entry
+    return entry
+
+
+def _round(value: float) -> float:
+    return round(float(value), 2)
+
+
+def _run_starts(mask: np.ndarray) -> np.ndarray:
+    """Positions where a run of True begins"""
+    starts = mask.copy()
+    starts[1:] &= ~mask[:-1]
+    return np.flatnonzero(starts)
+
+
+def _whitespace(codes: np.ndarray, text: str) -> np.ndarray:
+    """Whitespace as str.split() sees it; non-ASCII is checked once per distinct code point"""
+    space = (codes == 32) | ((codes >= 9) & (codes <= 13)) | ((codes >= 28) & (codes <= 31))
+    if not text.isascii():
+        wide = np.unique(codes[codes > 127]).tolist()
+        wide_space = [code for code in wide if chr(code).isspace()]
+        if wide_space:
+            space |= np.isin(codes, wide_space)
+    return space
+
+
+class ReadabilityStats:
+    """
+    Readability of a resume
+
+    `sentences`/`sentence_words` count punctuation-delimited sentences and
+    `long_paragraphs` blank-line paragraphs of more than 100 whitespace
+    words, as the ATS scorer always has. The indices instead treat every line
+    as ending a sentence too: resumes are mostly unpunctuated bullet lines,
+    which would otherwise read as one enormous sentence.
+
+    Counts are computed on construction; syllable-based statistics on first
+    access, so scoring rules that only use counts never pay for syllables.
+    """
+
+    FIELDS = (
+        "whitespace_words", "sentences", "sentence_words", "long_paragraphs",
+        "bullets", "avg_bullet_words", "long_bullets", "short_bullets",
+        "words", "syllables", "polysyllables", "units", "long_units", *_INDICES,
+    )
+
+    def __init__(self, text: str):
+        self._text = text
+        # The text as code points; token boundaries are found with array operations and
+        # sentence/line/paragraph membership by searchsorted over the boundary positions
+        if text.isascii():
+            codes = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+        else:
+            codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        # Words are whatever lies between whitespace and sentence terminators, the
+        # units the old `re.split('[.!?]+')` + `str.split()` produced, so sentence
+        # and word counts are unchanged
+        space = _whitespace(codes, text)
+        terminator = (codes == 46) | (codes == 33) | (codes == 63)  # . ! ?
+        word_starts = _run_starts(~(space | terminator))
+        newlines = np.flatnonzero(codes == 10)
+
+        # Punctuation sentences: id = terminator runs before the word
+        self.sentence_words = int(word_starts.size)
+        self._sentence_ids = np.searchsorted(_run_starts(terminator), word_starts)
+        self.sentences = int(np.count_nonzero(np.bincount(self._sentence_ids))) if self.sentence_words else 0
+
+        # Whitespace words per blank-line paragraph (str.split('\n\n') semantics)
+        whitespace_starts = _run_starts(~space)
+        self.whitespace_words = int(whitespace_starts.size)
+        paragraph_breaks = [match.start() for match in _PARAGRAPH_BREAK_RE.finditer(text)]
+        paragraph_words = np.bincount(np.searchsorted(paragraph_breaks, whitespace_starts))
+        self.long_paragraphs = int(np.count_nonzero(paragraph_words > LONG_PARAGRAPH_WORDS))
+
+        # Bullets: lines whose first word is a list marker; words per line minus the marker
+        self._line_ids = np.searchsorted(newlines, word_starts)
+        first_words = np.flatnonzero(np.diff(self._line_ids, prepend=-1))
+        bullet_lines = [
+            line for line, start in zip(self._line_ids[first_words].tolist(), word_starts[first_words].tolist())
+            if text[start] in _MARKER_CHARS and _BULLET_MARKER_RE.match(text, start)
+        ]
+        if bullet_lines:
+            bullet_words = np.bincount(self._line_ids)[bullet_lines] - 1
+        else:
+            bullet_words = np.zeros(0, dtype=np.int64)
+        self.bullets = int(bullet_words.size)
+        self.avg_bullet_words = _round(bullet_words.mean()) if bullet_words.size else 0.0
+        self.long_bullets = int(np.count_nonzero(bullet_words > LONG_BULLET_WORDS))
+        self.short_bullets = int(np.count_nonzero(bullet_words < 4))
+
+    @cached_property
+    def _lexicon(self) -> Dict:
+        # The only per-word work: one table lookup each, estimated only on a miss.
+        # Replacing terminators with spaces makes str.split() yield the same words.
+        tokens = self._text.lower().replace(".", " ").replace("!", " ").replace("?", " ").split()
+        packed = list(map(_SYLLABLES.get, tokens))
+        if None in packed:
+            packed = [_lookup(token) if entry is None else entry for token, entry in zip(tokens, packed)]
+        packed = np.array(packed, dtype=np.int64)
+        syllables = packed >> 8
+        letters = packed & 0xFF
+        lettered = letters > 0
+
+        # Index sentences ("units") also end at line breaks
+        unit_words = np.bincount((self._sentence_ids + self._line_ids)[lettered])
+        unit_words = unit_words[unit_words > 0]
+
+        words = int(np.count_nonzero(lettered))
+        units = int(unit_words.size)
+        polysyllables = int(np.count_nonzero(syllables >= 3))
+        stats = {
+            "words": words,
+            "syllables": int(syllables.sum()),
+            "polysyllables": polysyllables,
+            "units": units,
+            "long_units": int(np.count_nonzero(unit_words > LONG_SENTENCE_WORDS)),
+        }
+        if not (words and units):
+            return {**stats, **dict.fromkeys(_INDICES, 0.0)}
+
+        total_letters = int(letters.sum())
+        words_per_unit = words / units
+        syllables_per_word = stats["syllables"] / words
+        return {
+            **stats,
+            "avg_unit_words": _round(words_per_unit),
+            "flesch_reading_ease": _round(206.835 - 1.015 * words_per_unit - 84.6 * syllables_per_word),
+            "flesch_kincaid_grade": _round(0.39 * words_per_unit + 11.8 * syllables_per_word - 15.59),
+            "gunning_fog": _round(0.4 * (words_per_unit + 100 * polysyllables / words)),
+            "smog": _round(1.043 * math.sqrt(polysyllables * 30 / units) + 3.1291),
+            "coleman_liau": _round(0.0588 * total_letters / words * 100 - 0.296 * units / words * 100 - 15.8),
+            "automated_readability": _round(4.71 * total_letters / words + 0.5 * words_per_unit - 21.43),
+        }
+
+    def __getattr__(self, name: str):
+        # Syllable-based fields, computed together on first access
+        if name in self.FIELDS:
+            return self._lexicon[name]
+        raise AttributeError(name)
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __repr__(self) -> str:
+        return f"ReadabilityStats({self.to_dict()})"
+
+
+@lru_cache(maxsize=256)
+def analyze_readability(text: str) -> ReadabilityStats:
+    """
+    Readability statistics for a resume
+
+    The text is classified once as an array of code points; word, sentence,
+    paragraph, line and bullet membership are then derived with cumulative
+    sums and bincounts instead of re-splitting the text per sentence and per
+    paragraph. Syllables come from a lookup table that also remembers
+    heuristic estimates, so repeat vocabulary costs one dict lookup, and are
+    only counted when a syllable-based statistic is read. Cached like
+    `segment_resume` so the scorer and /analyze share one pass.
+    """
+    return ReadabilityStats(text)
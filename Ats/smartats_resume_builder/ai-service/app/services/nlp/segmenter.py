@@ -0,0 +1,258 @@
+"""
+Resume Section Segmenter
+Splits resume text into typed sections with bullets and date ranges
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Same all-caps header pattern the ATS scorer has always used
+_CAPS_HEADER_RE = re.compile(r"^[A-Z][A-Z\s&/]+:?$")
+_BULLET_RE = re.compile(r"^(?:[-•*▪●◦‣]|\d{1,2}[.)])\s+")
+_NON_WORD_RE = re.compile(r"[^a-z&/ ]+")
+
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_DATE = rf"(?:{_MONTH}\s+\d{{4}}|\d{{1,2}}/\d{{4}}|\d{{4}})"
+_DATE_RANGE_RE = re.compile(
+    rf"(?P<start>{_DATE})\s*(?:-|–|—|to)\s*(?P<end>{_DATE}|present|current|now|today)",
+    re.IGNORECASE
+)
+_YEAR_RE = re.compile(r"\d{4}")
+
+# Normalized header text -> section kind
+HEADER_LEXICON: Dict[str, str] = {
+    "experience": "experience",
+    "work experience": "experience",
+    "professional experience": "experience",
+    "relevant experience": "experience",
+    "employment": "experience",
+    "employment history": "experience",
+    "work history": "experience",
+    "career history": "experience",
+    "education": "education",
+    "academic background": "education",
+    "education & training": "education",
+    "skills": "skills",
+    "technical skills": "skills",
+    "core skills": "skills",
+    "key skills": "skills",
+    "core competencies": "skills",
+    "competencies": "skills",
+    "technologies": "skills",
+    "summary": "summary",
+    "professional summary": "summary",
+    "career summary": "summary",
+    "profile": "summary",
+    "professional profile": "summary",
+    "about me": "summary",
+    "objective": "objective",
+    "career objective": "objective",
+    "certifications": "certifications",
+    "certificates": "certifications",
+    "licenses & certifications": "certifications",
+    "projects": "projects",
+    "personal projects": "projects",
+    "key projects": "projects",
+    "awards": "awards",
+    "honors & awards": "awards",
+    "achievements": "awards",
+    "publications": "publications",
+    "volunteer experience": "volunteer",
+    "volunteering": "volunteer",
+    "languages": "languages",
+    "interests": "interests",
+    "contact": "contact",
+    "contact information": "contact",
+}
+
+# Fallback for all-caps headers outside the lexicon, e.g. "EXPERIENCE AT SCALE"
+_KIND_KEYWORDS: Tuple[Tuple[str, str], ...] = (
+    ("experience", "experience"),
+    ("employment", "experience"),
+    ("education", "education"),
+    ("skill", "skills"),
+    ("summary", "summary"),
+    ("objective", "objective"),
+    ("certific", "certifications"),
+    ("project", "projects"),
+    ("award", "awards"),
+    ("publication", "publications"),
+)
+
+# Kinds the ATS scorer counts as standard sections
+STANDARD_KINDS = frozenset({
+    "experience", "education", "skills", "summary", "objective",
+    "certifications", "projects", "awards", "publications",
+})
+
+_MAX_HEADER_LENGTH = 40
+_MAX_HEADER_WORDS = 5
+
+
+@dataclass(frozen=True)
+class DateRange:
+    """A date range such as 'Jan 2019 - Present' (end_year None = ongoing)"""
+    text: str
+    line: int
+    start_year: int
+    end_year: Optional[int]
+
+
+@dataclass(frozen=True)
+class Section:
+    """A resume section with its body lines (line numbers are 0-based, end exclusive)"""
+    kind: str
+    title: str
+    start_line: int
+    end_line: int
+    lines: Tuple[str, ...]
+    bullets: Tuple[str, ...]
+    dates: Tuple[DateRange, ...]
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+@dataclass(frozen=True)
+class ResumeStructure:
+    """Segmented resume: preamble lines (name/contact) and typed sections"""
+    preamble: Tuple[str, ...]
+    sections: Tuple[Section, ...]
+    kinds: FrozenSet[str] = field(default=frozenset())
+
+    def section(self, kind: str) -> Optional[Section]:
+        """First section of the given kind"""
+        for section in self.sections:
+            if section.kind == kind:
+                return section
+        return None
+
+    @property
+    def bullets(self) -> List[str]:
+        return [bullet for section in self.sections for bullet in section.bullets]
+
+    @property
+    def dates(self) -> List[DateRange]:
+        return [date for section in self.sections for date in section.dates]
+
+    @property
+    def standard_sections(self) -> int:
+        """Number of distinct standard section kinds present"""
+        return len(self.kinds & STANDARD_KINDS)
+
+    def to_dict(self) -> Dict:
+        return {
+            "sections": [
+                {
+                    "kind": section.kind,
+                    "title": section.title,
+                    "start_line": section.start_line,
+                    "end_line": section.end_line,
+                    "bullets": len(section.bullets),
+                    "dates": [date.text for date in section.dates],
+                }
+                for section in self.sections
+            ]
+        }
+
+
+def header_kind(line: str, allow_unknown: bool = True) -> Optional[str]:
+    """Section kind if `line` (stripped) is a header, else None"""
+    if not line or len(line) > _MAX_HEADER_LENGTH or not line[0].isalpha():
+        return None
+    if line.count(" ") >= _MAX_HEADER_WORDS:
+        return None
+
+    normalized = _NON_WORD_RE.sub("", line.lower().replace(" and ", " & ")).strip()
+    normalized = " ".join(normalized.split())
+    kind = HEADER_LEXICON.get(normalized)
+    if kind is not None:
+        return kind
+
+    if _CAPS_HEADER_RE.match(line):
+        for keyword, keyword_kind in _KIND_KEYWORDS:
+            if keyword in normalized:
+                return keyword_kind
+        return "other" if allow_unknown else None
+    return None
+
+
+def _parse_dates(line: str, number: int) -> List[DateRange]:
+    dates = []
+    for match in _DATE_RANGE_RE.finditer(line):
+        start_year = int(_YEAR_RE.search(match.group("start")).group())
+        end_year = _YEAR_RE.search(match.group("end"))
+        dates.append(DateRange(
+            text=match.group(0),
+            line=number,
+            start_year=start_year,
+            end_year=int(end_year.group()) if end_year else None
+        ))
+    return dates
+
+
+def _segment(text: str) -> ResumeStructure:
+    preamble: List[str] = []
+    sections: List[Section] = []
+
+    kind = title = None
+    start = 0
+    lines: List[str] = []
+    bullets: List[str] = []
+    dates: List[DateRange] = []
+    seen_content = 0
+
+    def close(end: int):
+        if kind is not None:
+            sections.append(Section(kind, title, start, end, tuple(lines), tuple(bullets), tuple(dates)))
+
+    all_lines = text.splitlines()
+    for number, raw in enumerate(all_lines):
+        line = raw.strip()
+        if not line:
+            continue
+
+        # Unknown all-caps lines at the very top are the candidate's name
+        found = header_kind(line, allow_unknown=seen_content >= 2)
+        seen_content += 1
+        if found is not None:
+            close(number)
+            kind, title, start = found, line.rstrip(":"), number
+            lines, bullets, dates = [], [], []
+            continue
+
+        target = lines if kind is not None else preamble
+        target.append(line)
+        if kind is None:
+            continue
+
+        bullet = _BULLET_RE.match(line)
+        if bullet:
+            bullets.append(line[bullet.end():])
+        if _YEAR_RE.search(line):  # Cheap pre-check before the date-range pattern
+            dates.extend(_parse_dates(line, number))
+
+    close(len(all_lines))
+    return ResumeStructure(
+        preamble=tuple(preamble),
+        sections=tuple(sections),
+        kinds=frozenset(section.kind for section in sections)
+    )
+
+
+@lru_cache(maxsize=256)
+def segment_resume(text: str) -> ResumeStructure:
+    """
+    Segment a resume into typed sections
+
+    One pass over the lines with precompiled patterns. Results are immutable
+    and cached, so scoring, keyword extraction and prompt building in the same
+    request share one segmentation.
+    """
+    return _segment(text)
@@ -0,0 +1,578 @@
+"""
+Inverted Index
+Positional, varint-compressed postings with BM25 ranking and mmap snapshots
+"""
+
+import asyncio
+import bisect
+import contextlib
+import fcntl
+import json
+import logging
+import math
+import mmap
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.nlp.keyword_extractor import KeywordExtractor
+from app.services.search.query import And, Node, Not, Or, Phrase, QueryParser, Term, positive_terms
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SATSIDX1"
+
+# Skills are indexed as terms too (so "Go" or "C++" are searchable) but have
+# no word position; this sentinel never lines up with a phrase.
+SKILL_POSITION = 0x0FFFFFFF
+
+# ATS score stored for documents indexed without one
+NO_SCORE = 255
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+class SnapshotWriterBusy(RuntimeError):
+    """Another process owns the snapshot file"""
+
+
+TERM_META_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("doc_bytes", "<u4"),
+    ("tf_bytes", "<u4"),
+    ("pos_bytes", "<u4"),
+    ("df", "<u4"),
+])
+
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """LEB128-encode non-negative integers, vectorized"""
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0:
+        return b""
+
+    max_value = int(values.max())
+    width = max(1, (max_value.bit_length() + 6) // 7)
+    shifts = np.arange(width, dtype=np.uint64) * np.uint64(7)
+    chunks = (values[:, None] >> shifts) & np.uint64(0x7F)
+
+    # Number of bytes each value needs: at least 1, then one per 7 significant bits
+    sizes = np.ones(len(values), dtype=np.int64)
+    for k in range(1, width):
+        sizes += values >= (np.uint64(1) << np.uint64(7 * k))
+
+    columns = np.arange(width)
+    used = columns[None, :] < sizes[:, None]
+    continuation = columns[None, :] < (sizes[:, None] - 1)
+    chunks = chunks | (continuation.astype(np.uint64) << np.uint64(7))
+    return chunks[used].astype(np.uint8).tobytes()
+
+
+def decode_varints(buffer) -> np.ndarray:
+    """Decode LEB128 integers from a bytes-like object, vectorized"""
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if len(data) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+
+    offsets = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    parts = (data & 0x7F).astype(np.int64) << (offsets * 7)
+    return np.add.reduceat(parts, starts)
+
+
+@dataclass
+class Postings:
+    """Postings of one term: sorted doc ids, term frequencies, flat positions"""
+    docs: np.ndarray
+    tfs: np.ndarray
+    positions: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "Postings":
+        empty = np.zeros(0, dtype=np.int64)
+        return cls(empty, empty, empty)
+
+    def concat(self, other: "Postings") -> "Postings":
+        return Postings(
+            np.concatenate([self.docs, other.docs]),
+            np.concatenate([self.tfs, other.tfs]),
+            np.concatenate([self.positions, other.positions])
+        )
+
+
+class _TermList:
+    """Sequence view over the sorted term dictionary of a segment file"""
+
+    def __init__(self, offsets: np.ndarray, blob: memoryview):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+
+class _DiskSegment:
+    """Immutable segment memory-mapped from a snapshot file"""
+
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a search index snapshot")
+
+        footer_offset = int.from_bytes(self.map[-8:], "little")
+        footer = json.loads(self.map[footer_offset:len(self.map) - 8])
+        self.num_docs = footer["num_docs"]
+        sections = footer["sections"]
+        buffer = memoryview(self.map)
+
+        def section(name, dtype=None):
+            start, length = sections[name]
+            view = buffer[start:start + length]
+            return np.frombuffer(view, dtype=dtype) if dtype is not None else view
+
+        blob = bytes(section("doc_ids"))
+        self.doc_ids = blob.decode("utf-8").split("\n") if blob else []
+        self.doc_lengths = section("doc_lengths", np.uint32)
+        self.doc_scores = section("doc_scores", np.uint8)
+        self.deleted = section("deleted", np.uint8)
+        self.term_meta = section("term_meta", TERM_META_DTYPE)
+        self.terms = _TermList(section("term_offsets", np.uint64), section("terms"))
+        self.postings_start = sections["postings"][0]
+        self.buffer = buffer
+
+    def iter_terms(self) -> Iterator[str]:
+        for i in range(len(self.terms)):
+            yield self.terms[i]
+
+    def postings(self, term: str) -> Optional[Postings]:
+        i = bisect.bisect_left(self.terms, term)
+        if i == len(self.terms) or self.terms[i] != term:
+            return None
+
+        meta = self.term_meta[i]
+        start = self.postings_start + int(meta["offset"])
+        doc_end = start + int(meta["doc_bytes"])
+        tf_end = doc_end + int(meta["tf_bytes"])
+        pos_end = tf_end + int(meta["pos_bytes"])
+        return Postings(
+            np.cumsum(decode_varints(self.buffer[start:doc_end])),
+            decode_varints(self.buffer[doc_end:tf_end]),
+            decode_varints(self.buffer[tf_end:pos_end])
+        )
+
+    def close(self):
+        # NumPy views still reference the map, so it is unmapped once they
+        # are garbage collected rather than here
+        self.file.close()
+
+
+def _write_snapshot(
+    path: str,
+    doc_ids: List[str],
+    doc_lengths: np.ndarray,
+    doc_scores: np.ndarray,
+    terms: Iterator[Tuple[str, Postings]]
+):
+    """Write a segment file; sections are 8-byte aligned for zero-copy loading"""
+    sections = {}
+    term_names: List[bytes] = []
+    term_meta: List[Tuple[int, int, int, int, int]] = []
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+
+        def write_section(name: str, data: bytes):
+            padding = (-f.tell()) % 8
+            f.write(b"\0" * padding)
+            sections[name] = [f.tell(), len(data)]
+            f.write(data)
+
+        # Postings go first so terms can be streamed without holding them all
+        padding = (-f.tell()) % 8
+        f.write(b"\0" * padding)
+        postings_start = f.tell()
+        for term, postings in terms:
+            docs = encode_varints(np.diff(postings.docs, prepend=0))
+            tfs = encode_varints(postings.tfs)
+            positions = encode_varints(postings.positions)
+            term_names.append(term.encode("utf-8"))
+            term_meta.append((f.tell() - postings_start, len(docs), len(tfs), len(positions), len(postings.docs)))
+            f.write(docs)
+            f.write(tfs)
+            f.write(positions)
+        sections["postings"] = [postings_start, f.tell() - postings_start]
+
+        term_offsets = np.zeros(len(term_names) + 1, dtype=np.uint64)
+        term_offsets[1:] = np.cumsum([len(name) for name in term_names])
+        write_section("doc_ids", "\n".join(doc_ids).encode("utf-8"))
+        write_section("doc_lengths", np.asarray(doc_lengths, dtype=np.uint32).tobytes())
+        write_section("doc_scores", np.asarray(doc_scores, dtype=np.uint8).tobytes())
+        write_section("deleted", np.zeros(len(doc_ids), dtype=np.uint8).tobytes())
+        write_section("term_offsets", term_offsets.tobytes())
+        write_section("terms", b"".join(term_names))
+        write_section("term_meta", np.array(term_meta, dtype=TERM_META_DTYPE).tobytes())
+
+        footer_offset = f.tell()
+        f.write(json.dumps({"num_docs": len(doc_ids), "sections": sections}).encode("utf-8"))
+        f.write(footer_offset.to_bytes(8, "little"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class InvertedIndex:
+    """
+    Resume search index
+
+    Documents are the normalized tokens from `KeywordExtractor.tokenize` (with
+    word positions, for phrase queries) plus whole-word matches from `extract_skills`.
+    Recent documents live in an in-memory segment; `snapshot()` merges them
+    with the current memory-mapped segment into a new file and drops deleted
+    documents. Postings are delta + varint encoded on disk and decoded with
+    vectorized NumPy, and boolean operators work on sorted doc-id arrays, so
+    a query touches only the postings of its own terms.
+
+    Snapshots are written by a single process per file: the first one to
+    take an flock on `<path>.lock` keeps it for its lifetime, and the others
+    raise SnapshotWriterBusy. Once started, the writer also snapshots every
+    SEARCH_INDEX_SNAPSHOT_INTERVAL seconds or SEARCH_INDEX_SNAPSHOT_CHANGES
+    adds/deletes, whichever comes first.
+
+    All methods take the index lock; call them from the CPU executor.
+    """
+
+    def __init__(self, extractor: KeywordExtractor = None):
+        self.extractor = extractor or KeywordExtractor(use_keybert=False)
+        self.lock = threading.RLock()
+        self._writer_locks: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._reset(None)
+
+    def _reset(self, base: Optional[_DiskSegment]):
+        self.base = base
+        self.base_docs = base.num_docs if base else 0
+        self.memory: Dict[str, Tuple[List[int], List[int], List[int]]] = {}
+
+        self.doc_ids: List[str] = list(base.doc_ids) if base else []
+        capacity = max(1024, self.base_docs * 2)
+        self.doc_lengths = np.zeros(capacity, dtype=np.uint32)
+        self.doc_scores = np.full(capacity, NO_SCORE, dtype=np.uint8)
+        self.deleted = np.zeros(capacity, dtype=bool)
+        if base:
+            self.doc_lengths[:self.base_docs] = base.doc_lengths
+            self.doc_scores[:self.base_docs] = base.doc_scores
+            self.deleted[:self.base_docs] = base.deleted.astype(bool)
+
+        self.id_to_doc = {doc_id: doc for doc, doc_id in enumerate(self.doc_ids)}
+        self.total_length = int(self.doc_lengths[:len(self.doc_ids)].sum())
+        self.live_docs = len(self.doc_ids) - int(self.deleted[:len(self.doc_ids)].sum())
+        self.pending_changes = 0
+
+    @property
+    def num_docs(self) -> int:
+        return self.live_docs
+
+    @staticmethod
+    def _normalize_term(term: str) -> str:
+        return term.lower().strip(",;:!?'")
+
+    def _analyze(self, text: str) -> Tuple[Dict[str, List[int]], int]:
+        tokens = self.extractor.tokenize(text)
+        positions: Dict[str, List[int]] = {}
+        for position, token in enumerate(tokens):
+            positions.setdefault(token, []).append(position)
+
+        skills = self.extractor.extract_skills(text, whole_words=True)
+        for skill in skills["technical"] + skills["soft"]:
+            positions.setdefault(skill.lower(), [SKILL_POSITION])
+        return positions, len(tokens)
+
+    def _grow(self, size: int):
+        if size <= len(self.doc_lengths):
+            return
+        capacity = max(size, len(self.doc_lengths) * 2)
+        self.doc_lengths = np.resize(self.doc_lengths, capacity)
+        self.doc_scores = np.concatenate([
+            self.doc_scores, np.full(capacity - len(self.doc_scores), NO_SCORE, dtype=np.uint8)
+        ])
+        self.deleted = np.concatenate([self.deleted, np.zeros(capacity - len(self.deleted), dtype=bool)])
+
+    def add(self, resume_id: str, text: str, ats_score: Optional[int] = None):
+        """Index a resume, replacing any earlier version with the same ID"""
+        if not resume_id or "\n" in resume_id:
+            raise ValueError("resume_id must be a non-empty single line")
+        term_positions, length = self._analyze(text)
+        with self.lock:
+            self.delete(resume_id)
+
+            doc = len(self.doc_ids)
+            self._grow(doc + 1)
+            self.doc_ids.append(resume_id)
+            self.id_to_doc[resume_id] = doc
+            self.doc_lengths[doc] = length
+            self.doc_scores[doc] = NO_SCORE if ats_score is None else max(0, min(100, ats_score))
+            self.total_length += length
+            self.live_docs += 1
+            self.pending_changes += 1
+
+            for term, positions in term_positions.items():
+                docs, tfs, flat_positions = self.memory.setdefault(term, ([], [], []))
+                docs.append(doc)
+                tfs.append(len(positions))
+                flat_positions.extend(positions)
+
+    def delete(self, resume_id: str) -> bool:
+        with self.lock:
+            doc = self.id_to_doc.pop(resume_id, None)
+            if doc is None or self.deleted[doc]:
+                return False
+            self.deleted[doc] = True
+            self.total_length -= int(self.doc_lengths[doc])
+            self.live_docs -= 1
+            self.pending_changes += 1
+            return True
+
+    def _postings(self, term: str) -> Postings:
+        postings = Postings.empty()
+        if self.base is not None:
+            base = self.base.postings(term)
+            if base is not None:
+                postings = base
+        memory = self.memory.get(term)
+        if memory is not None:
+            docs, tfs, positions = memory
+            postings = postings.concat(Postings(
+                np.array(docs, dtype=np.int64),
+                np.array(tfs, dtype=np.int64),
+                np.array(positions, dtype=np.int64)
+            ))
+        return postings
+
+    def _evaluate(self, node: Node, cache: Dict[str, Postings]) -> np.ndarray:
+        def postings(term: str) -> Postings:
+            if term not in cache:
+                cache[term] = self._postings(term)
+            return cache[term]
+
+        if isinstance(node, Term):
+            return postings(node.term).docs
+        if isinstance(node, Phrase):
+            return self._match_phrase([postings(term) for term in node.terms])
+        if isinstance(node, And):
+            left = self._evaluate(node.left, cache)
+            if isinstance(node.right, Not):
+                return np.setdiff1d(left, self._evaluate(node.right.operand, cache), assume_unique=True)
+            return np.intersect1d(left, self._evaluate(node.right, cache), assume_unique=True)
+        if isinstance(node, Or):
+            return np.union1d(self._evaluate(node.left, cache), self._evaluate(node.right, cache))
+        if isinstance(node, Not):
+            everything = np.arange(len(self.doc_ids), dtype=np.int64)
+            return np.setdiff1d(everything, self._evaluate(node.operand, cache), assume_unique=True)
+        raise ValueError(f"Unsupported query node: {node}")
+
+    @staticmethod
+    def _match_phrase(term_postings: List[Postings]) -> np.ndarray:
+        """Docs where the terms occur at consecutive positions"""
+        candidates = term_postings[0].docs
+        for postings in term_postings[1:]:
+            candidates = np.intersect1d(candidates, postings.docs, assume_unique=True)
+        if len(candidates) == 0:
+            return candidates
+
+        # Encode (doc, start position) pairs as one int64 and intersect across terms
+        matches = None
+        for offset, postings in enumerate(term_postings):
+            docs = np.repeat(postings.docs, postings.tfs)
+            keep = np.isin(docs, candidates) & (postings.positions >= offset) & (postings.positions != SKILL_POSITION)
+            keys = np.unique((docs[keep] << 32) | (postings.positions[keep] - offset))
+            matches = keys if matches is None else np.intersect1d(matches, keys, assume_unique=True)
+            if len(matches) == 0:
+                break
+        return np.unique(matches >> 32)
+
+    def search(self, query: str, limit: int = 20, min_score: Optional[int] = None) -> Dict:
+        """
+        Run a boolean/phrase query and rank matches with BM25
+
+        Raises:
+            ValueError: if the query cannot be parsed
+        """
+        start = time.perf_counter()
+        # QueryParser keeps its cursor on the instance; searches run concurrently outside the lock
+        node = QueryParser(self._normalize_term, self.extractor.tokenize).parse(query)
+
+        with self.lock:
+            cache: Dict[str, Postings] = {}
+            matched = self._evaluate(node, cache)
+            matched = matched[~self.deleted[matched]]
+            if min_score is not None:
+                scores = self.doc_scores[matched]
+                matched = matched[(scores != NO_SCORE) & (scores >= min_score)]
+
+            ranking = np.zeros(len(matched), dtype=np.float64)
+            if len(matched) and self.live_docs:
+                avg_length = self.total_length / self.live_docs or 1.0
+                lengths = self.doc_lengths[matched].astype(np.float64)
+                for term in set(positive_terms(node)):
+                    postings = cache.get(term) or self._postings(term)
+                    df = len(postings.docs)
+                    if df == 0:
+                        continue
+                    idf = math.log(1 + (self.live_docs - df + 0.5) / (df + 0.5))
+                    index = np.searchsorted(postings.docs, matched)
+                    index[index >= df] = df - 1
+                    present = postings.docs[index] == matched
+                    tf = postings.tfs[index].astype(np.float64)
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avg_length)
+                    ranking += np.where(present, idf * tf * (BM25_K1 + 1) / (tf + norm), 0.0)
+
+            top = min(limit, len(matched))
+            if top:
+                best = np.argpartition(-ranking, top - 1)[:top]
+                best = best[np.argsort(-ranking[best], kind="stable")]
+            else:
+                best = np.zeros(0, dtype=np.int64)
+
+            results = []
+            for i in best:
+                doc = int(matched[i])
+                score = int(self.doc_scores[doc])
+                results.append({
+                    "resume_id": self.doc_ids[doc],
+                    "score": round(float(ranking[i]), 4),
+                    "ats_score": None if score == NO_SCORE else score
+                })
+
+        return {
+            "results": results,
+            "total_matches": int(len(matched)),
+            "took_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    def acquire_writer(self, path: str) -> bool:
+        """Try to become the snapshot writer for `path`; held until the process exits"""
+        with self.lock:
+            if path in self._writer_locks:
+                return True
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            self._writer_locks[path] = fd
+            return True
+
+    def snapshot(self, path: str):
+        """
+        Merge everything into a new segment file and switch to it
+
+        Raises:
+            SnapshotWriterBusy: if another process is the writer for `path`
+        """
+        if not self.acquire_writer(path):
+            raise SnapshotWriterBusy(f"Another process writes the search index snapshot {path}")
+        with self.lock:
+            count = len(self.doc_ids)
+            live = ~self.deleted[:count]
+            new_ids = np.cumsum(live) - 1
+
+            terms = set(self.memory)
+            if self.base is not None:
+                terms.update(self.base.iter_terms())
+
+            def merged_terms() -> Iterator[Tuple[str, Postings]]:
+                for term in sorted(terms):
+                    postings = self._postings(term)
+                    keep = live[postings.docs]
+                    if not keep.any():
+                        continue
+                    yield term, Postings(
+                        new_ids[postings.docs[keep]],
+                        postings.tfs[keep],
+                        postings.positions[np.repeat(keep, postings.tfs)]
+                    )
+
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                _write_snapshot(
+                    temp_path,
+                    [doc_id for doc_id, alive in zip(self.doc_ids, live) if alive],
+                    self.doc_lengths[:count][live],
+                    self.doc_scores[:count][live],
+                    merged_terms()
+                )
+                os.replace(temp_path, path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.remove(temp_path)
+                raise
+
+            old_base = self.base
+            self._reset(_DiskSegment(path))
+            if old_base is not None:
+                old_base.close()
+        logger.info(f"Search index snapshot written: {self.live_docs} resumes -> {path}")
+
+    def load(self, path: str):
+        """Replace the index contents with a snapshot file (memory-mapped)"""
+        with self.lock:
+            old_base = self.base
+            self._reset(_DiskSegment(path))
+            if old_base is not None:
+                old_base.close()
+        logger.info(f"Search index loaded: {self.live_docs} resumes from {path}")
+
+    async def start(self, path: str):
+        """Periodically snapshot pending changes to `path` while this process can be its writer"""
+        if self._task is not None:
+            return
+        if settings.SEARCH_INDEX_SNAPSHOT_INTERVAL <= 0 and settings.SEARCH_INDEX_SNAPSHOT_CHANGES <= 0:
+            return
+        self._task = asyncio.create_task(self._flush_loop(path))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _flush_loop(self, path: str):
+        loop = asyncio.get_running_loop()
+        interval = settings.SEARCH_INDEX_SNAPSHOT_INTERVAL
+        max_changes = settings.SEARCH_INDEX_SNAPSHOT_CHANGES
+        last_flush = time.monotonic()
+        while True:
+            # Poll often enough to notice max_changes under a steady write load
+            await asyncio.sleep(min(interval, 5.0) if interval > 0 else 5.0)
+            due = interval > 0 and time.monotonic() - last_flush >= interval
+            if not self.pending_changes or not (due or 0 < max_changes <= self.pending_changes):
+                continue
+            # Claimed on the first write, so idle workers create no lock file
+            if not await loop.run_in_executor(None, self.acquire_writer, path):
+                logger.info("Search index snapshots of %s are written by another process", path)
+                return
+            try:
+                await loop.run_in_executor(None, self.snapshot, path)
+            except Exception as e:
+                logger.error("Search index snapshot failed: %s", e)
+            last_flush = time.monotonic()
+
+
+search_index = InvertedIndex()
@@ -0,0 +1,149 @@
+"""
+Search Query Parser
+Boolean queries with phrases, e.g. Kubernetes AND (Go OR Rust) NOT "team lead"
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Union
+
+_TOKEN_RE = re.compile(r'\(|\)|"[^"]*"|[^\s()"]+')
+_OPERATORS = {"AND", "OR", "NOT"}
+
+# Queries are parsed and evaluated recursively; bound them so a hostile query
+# is rejected as invalid instead of exhausting the stack
+MAX_QUERY_TOKENS = 256
+MAX_QUERY_DEPTH = 32
+
+
+@dataclass
+class Term:
+    term: str
+
+
+@dataclass
+class Phrase:
+    terms: List[str]
+
+
+@dataclass
+class And:
+    left: "Node"
+    right: "Node"
+
+
+@dataclass
+class Or:
+    left: "Node"
+    right: "Node"
+
+
+@dataclass
+class Not:
+    operand: "Node"
+
+
+Node = Union[Term, Phrase, And, Or, Not]
+
+
+class QueryParser:
+    """
+    Recursive-descent parser for recruiter search queries
+
+    Grammar (operators are upper case; adjacent terms are ANDed):
+        or   := and ("OR" and)*
+        and  := not (["AND"] not)*
+        not  := "NOT" not | atom
+        atom := "(" or ")" | '"' phrase '"' | term
+
+    `normalize` maps a bare term to its index form and `tokenize` splits a
+    phrase into index tokens, so queries match what the indexer produced.
+    Queries longer than MAX_QUERY_TOKENS or nesting parentheses/NOTs deeper
+    than MAX_QUERY_DEPTH raise ValueError.
+    """
+
+    def __init__(self, normalize: Callable[[str], str], tokenize: Callable[[str], List[str]]):
+        self.normalize = normalize
+        self.tokenize = tokenize
+
+    def parse(self, query: str) -> Node:
+        self.tokens = _TOKEN_RE.findall(query)
+        self.pos = 0
+        self.depth = 0
+        if not self.tokens:
+            raise ValueError("Empty query")
+        if len(self.tokens) > MAX_QUERY_TOKENS:
+            raise ValueError(f"Query has more than {MAX_QUERY_TOKENS} terms and operators")
+
+        node = self._parse_or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected '{self.tokens[self.pos]}' in query")
+        return node
+
+    def _descend(self):
+        self.depth += 1
+        if self.depth > MAX_QUERY_DEPTH:
+            raise ValueError(f"Query nests deeper than {MAX_QUERY_DEPTH} levels")
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _parse_or(self) -> Node:
+        node = self._parse_and()
+        while self._peek() == "OR":
+            self.pos += 1
+            node = Or(node, self._parse_and())
+        return node
+
+    def _parse_and(self) -> Node:
+        node = self._parse_not()
+        while True:
+            token = self._peek()
+            if token == "AND":
+                self.pos += 1
+            elif token is None or token in (")", "OR"):
+                return node
+            node = And(node, self._parse_not())
+
+    def _parse_not(self) -> Node:
+        if self._peek() == "NOT":
+            self.pos += 1
+            self._descend()
+            node = Not(self._parse_not())
+            self.depth -= 1
+            return node
+        return self._parse_atom()
+
+    def _parse_atom(self) -> Node:
+        token = self._peek()
+        if token is None:
+            raise ValueError("Query ends unexpectedly")
+        self.pos += 1
+
+        if token == "(":
+            self._descend()
+            node = self._parse_or()
+            if self._peek() != ")":
+                raise ValueError("Missing closing parenthesis")
+            self.pos += 1
+            self.depth -= 1
+            return node
+        if token == ")" or token in _OPERATORS:
+            raise ValueError(f"Unexpected '{token}' in query")
+        if token.startswith('"'):
+            terms = self.tokenize(token.strip('"'))
+            if not terms:
+                raise ValueError(f"Phrase {token} has no searchable words")
+            return Term(terms[0]) if len(terms) == 1 else Phrase(terms)
+        return Term(self.normalize(token))
+
+
+def positive_terms(node: Node) -> List[str]:
+    """Terms that contribute to ranking (everything not under a NOT)"""
+    if isinstance(node, Term):
+        return [node.term]
+    if isinstance(node, Phrase):
+        return list(node.terms)
+    if isinstance(node, (And, Or)):
+        return positive_terms(node.left) + positive_terms(node.right)
+    return []
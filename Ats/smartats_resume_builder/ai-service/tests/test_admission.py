@@ -0,0 +1,42 @@
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.admission import AdmissionController, route_group
+from app.core.config import settings
+from app.main import admission_control
+
+
+def test_batch_paths_have_their_own_route_groups():
+    assert route_group("/api/v1/score/") == "/api/v1/score"
+    assert route_group("/api/v1/score/batch") == "/api/v1/score/batch"
+    assert route_group("/api/v1/match/batch") == "/api/v1/match/batch"
+    assert route_group("/api/v1/analyze/batch") == "/api/v1/analyze/batch"
+    assert route_group("/api/v1/analyze/") == "/api/v1/analyze"
+    assert route_group("/health") is None
+
+
+def test_streamed_batch_holds_its_slot_until_the_body_completes(monkeypatch):
+    controller = AdmissionController(initial_limit=10)
+    monkeypatch.setattr("app.main.admission_controller", controller)
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    seen = []
+
+    app = FastAPI()
+    app.middleware("http")(admission_control)
+
+    @app.post("/api/v1/score/batch")
+    async def batch():
+        async def records():
+            for i in range(3):
+                seen.append(controller.routes["/api/v1/score/batch"].inflight)
+                yield b"{}\n"
+        return StreamingResponse(records(), media_type="application/x-ndjson")
+
+    response = TestClient(app).post("/api/v1/score/batch")
+
+    assert response.status_code == 200
+    assert seen == [1, 1, 1]
+    assert controller.inflight == 0
+    assert controller.routes["/api/v1/score/batch"].inflight == 0
+    assert controller.routes["/api/v1/score"].inflight == 0
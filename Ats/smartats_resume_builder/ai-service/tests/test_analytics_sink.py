@@ -0,0 +1,61 @@
+"""
+Analytics sink tests against the SQLite stand-in backend
+"""
+
+import asyncio
+import json
+import sqlite3
+
+from app.services.analytics.sink import AnalyticsSink, SQLiteAnalyticsBackend
+
+
+def test_records_are_flushed_to_sqlite(tmp_path):
+    path = str(tmp_path / "analytics.db")
+
+    async def scenario():
+        sink = AnalyticsSink(SQLiteAnalyticsBackend(path), batch_size=2, flush_interval=60, buffer_size=10)
+        await sink.start()
+        assert sink.record("resume_analyzed", {"ats_score": 71})
+        assert sink.record("resume_analyzed", {"ats_score": 64})
+        assert sink.record("job_matched", {"match_score": 80})
+        assert await sink.flush()
+        assert sink.stats()["written"] == 2
+        await sink.stop()  # Flushes the remaining event
+        return sink.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats == {"buffered": 0, "recorded": 3, "written": 3, "dropped": 0, "failed_batches": 0}
+
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute(
+            "SELECT event_type, event_data, created_at FROM analytics_events ORDER BY id"
+        ).fetchall()
+    assert [(event_type, json.loads(data)) for event_type, data, _ in rows] == [
+        ("resume_analyzed", {"ats_score": 71}),
+        ("resume_analyzed", {"ats_score": 64}),
+        ("job_matched", {"match_score": 80}),
+    ]
+    assert all(created_at for _, _, created_at in rows)
+
+
+def test_events_are_dropped_when_not_running(tmp_path):
+    sink = AnalyticsSink(SQLiteAnalyticsBackend(str(tmp_path / "analytics.db")))
+    assert not sink.record("resume_analyzed", {})
+    assert sink.stats()["dropped"] == 1
+
+
+class _UntouchableBackend:
+    async def connect(self):
+        raise AssertionError("connect called")
+
+    async def write_batch(self, records):
+        raise AssertionError("write_batch called")
+
+    async def close(self):
+        raise AssertionError("close called")
+
+
+def test_stop_without_start_leaves_injected_backend_alone():
+    sink = AnalyticsSink(_UntouchableBackend())
+    asyncio.run(sink.stop())
+    assert sink.stats()["written"] == 0
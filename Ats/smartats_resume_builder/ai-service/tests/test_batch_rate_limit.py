@@ -0,0 +1,53 @@
+"""
+Batch endpoints are charged per item against the caller's rate limit
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.rate_limit import InMemoryRateLimitBackend, rate_limiter
+from app.main import app
+
+RESUME = "Jane Doe\njane@example.com\n\nEXPERIENCE\n- Led a team of 5 engineers building Python services\n"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 60)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_HOUR", 1000)
+    monkeypatch.setattr(rate_limiter, "backend", InMemoryRateLimitBackend(60, 1000))
+    with TestClient(app) as client:
+        yield client
+
+
+def _score_batch(client, count: int):
+    items = [{"id": str(i), "resume_text": RESUME} for i in range(count)]
+    return client.post("/api/v1/score/batch", json={"items": items})
+
+
+def test_batch_cost_scales_with_items(client):
+    response = _score_batch(client, 20)
+    assert response.status_code == 200
+    assert response.headers["X-RateLimit-Cost"] == "20"
+    assert response.headers["X-RateLimit-Remaining"] == "40"
+
+
+def test_batch_costing_more_than_the_bucket_is_refused(client):
+    response = _score_batch(client, 100)
+    assert response.status_code == 413
+    assert "100 items" in response.json()["detail"]
+
+    # Only the middleware's single-item charge was taken
+    accepted = _score_batch(client, 59)
+    assert accepted.status_code == 200
+    assert accepted.headers["X-RateLimit-Cost"] == "59"
+    assert accepted.headers["X-RateLimit-Remaining"] == "0"
+
+
+def test_batch_larger_than_remaining_tokens_is_rejected(client):
+    assert _score_batch(client, 50).status_code == 200
+    response = _score_batch(client, 20)
+    assert response.status_code == 429
+    assert "20 items" in response.json()["detail"]
@@ -0,0 +1,186 @@
+"""
+Distributed batches on a local multi-worker harness
+
+Each worker is a real internal RPC connection handler on a loopback port,
+with knobs to slow it down, fail its shards or drop its connections.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import rpc
+from app.api.v1 import batch
+from app.core.config import settings
+from app.main import app
+from app.services.cluster.coordinator import BatchCoordinator, NoWorkersAvailable
+from app.services.jobs.profile_store import job_profile_store
+
+RESUME = "Jane Doe\njane@example.com\n\nEXPERIENCE\n- Led a team of {} engineers building Python services\n"
+JOB = "Senior Python engineer with AWS, Docker and Kubernetes experience, leading a small team"
+
+# Set while a worker handles a request, so tests can give workers their own state
+on_worker = contextvars.ContextVar("on_worker", default=None)
+
+
+class LocalWorker:
+    """An RPC worker on 127.0.0.1 whose requests can be delayed, failed or dropped"""
+
+    def __init__(self, delay: float = 0.0, fail_status: int = None, drop: bool = False):
+        self.delay = delay
+        self.fail_status = fail_status
+        self.drop = drop
+        self.requests = 0
+        self.address = None
+        self._server = None
+
+    async def start(self):
+        worker = self
+
+        class Connection(rpc._Connection):
+            async def _dispatch(self, request):
+                worker.requests += 1
+                on_worker.set(worker)
+                if worker.drop:
+                    self.writer.close()
+                    return
+                if worker.fail_status:
+                    error = {"status": worker.fail_status, "message": "Refused by test worker"}
+                    await self.send({"id": request.get("id"), "error": error})
+                    return
+                await asyncio.sleep(worker.delay)
+                await super()._dispatch(request)
+
+        async def handle(reader, writer):
+            with contextlib.suppress(asyncio.CancelledError):
+                await Connection(reader, writer).serve()
+
+        self._server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        self.address = "127.0.0.1:%d" % self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+
+
+def _items(count: int):
+    return [(index, {"id": "r%d" % index, "resume_text": RESUME.format(index)}) for index in range(count)]
+
+
+async def _run(workers, count, method="score_batch", params=None, **options):
+    for worker in workers:
+        await worker.start()
+    coordinator = BatchCoordinator([worker.address for worker in workers], token="", **options)
+    try:
+        records = [record async for record in coordinator.run(method, _items(count), params)]
+    finally:
+        await coordinator.close()
+        for worker in workers:
+            await worker.stop()
+    return records[:-1], records[-1]["summary"]
+
+
+@pytest.fixture(autouse=True)
+def cluster_settings(monkeypatch):
+    monkeypatch.setattr(settings, "INTERNAL_RPC_TOKEN", "")
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+
+
+def test_results_from_all_workers_are_merged_by_index():
+    workers = [LocalWorker(), LocalWorker(), LocalWorker()]
+    records, summary = asyncio.run(_run(workers, 40, shard_size=5))
+
+    assert sorted(record["index"] for record in records) == list(range(40))
+    assert all(record["id"] == "r%d" % record["index"] and "result" in record for record in records)
+    assert summary["succeeded"] == 40 and summary["failed"] == 0
+    assert all(worker.requests for worker in workers)
+
+
+def test_idle_worker_steals_from_a_slow_one():
+    slow, fast = LocalWorker(delay=1.0), LocalWorker()
+    records, summary = asyncio.run(_run([slow, fast], 4, shard_size=2, shards_per_node=1, steal_after=0.1))
+
+    assert sorted(record["index"] for record in records) == list(range(4))
+    assert summary["steals"] >= 1
+    assert summary["nodes"][fast.address]["items"] == 4
+
+
+@pytest.mark.parametrize("failure", [{"fail_status": 503}, {"drop": True}])
+def test_failed_shards_are_retried_on_another_worker(failure):
+    broken, healthy = LocalWorker(**failure), LocalWorker()
+    records, summary = asyncio.run(_run([broken, healthy], 20, shard_size=5))
+
+    assert sorted(record["index"] for record in records) == list(range(20))
+    assert summary["failed"] == 0 and summary["retries"] >= 1
+    assert broken.requests and summary["nodes"][healthy.address]["items"] == 20
+
+
+def test_rejected_shards_fail_without_retry():
+    workers = [LocalWorker(fail_status=422), LocalWorker(fail_status=422)]
+    records, summary = asyncio.run(_run(workers, 6, shard_size=3))
+
+    assert summary["failed"] == 6 and summary["retries"] == 0
+    assert all("error" in record for record in records)
+
+
+def test_no_workers_left_raises():
+    with pytest.raises(NoWorkersAvailable):
+        asyncio.run(_run([LocalWorker(drop=True)], 6, shard_size=3, max_attempts=5, node_failures=1))
+
+
+@pytest.fixture
+def cluster_client(monkeypatch):
+    """The app with two workers that, like separate nodes, have no job profiles of their own"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    workers = [LocalWorker(), LocalWorker()]
+    for worker in workers:
+        asyncio.run_coroutine_threadsafe(worker.start(), loop).result()
+
+    get = job_profile_store.get
+
+    async def local_get(job_id):
+        return None if on_worker.get() else await get(job_id)
+
+    monkeypatch.setattr(job_profile_store, "get", local_get)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "CLUSTER_MIN_ITEMS", 2)
+    coordinator = BatchCoordinator([worker.address for worker in workers], token="", shard_size=2)
+    monkeypatch.setattr(batch, "batch_coordinator", coordinator)
+    with TestClient(app) as client:
+        yield client, workers
+    for worker in workers:
+        asyncio.run_coroutine_threadsafe(worker.stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def test_job_id_batches_run_on_workers_without_the_profile(cluster_client):
+    client, workers = cluster_client
+    job_id = client.post("/api/v1/jobs/", json={"job_description": JOB}).json()["job_id"]
+    items = [{"id": str(i), "resume_text": RESUME.format(i)} for i in range(6)]
+
+    matched = client.post("/api/v1/match/batch", json={"job_id": job_id, "items": items}).json()
+    analyzed = client.post(
+        "/api/v1/analyze/batch", json={"items": [{**item, "job_id": job_id} for item in items]}
+    ).json()
+
+    assert all(worker.requests for worker in workers)
+    for response in (matched, analyzed):
+        assert response["summary"]["succeeded"] == 6, response
+    local = client.post("/api/v1/match/", json={"job_id": job_id, "resume_text": RESUME.format(0)}).json()
+    assert next(r for r in matched["results"] if r["id"] == "0")["result"] == local
+
+
+def test_cluster_status_requires_the_admin_token(monkeypatch):
+    client = TestClient(app)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    assert client.get("/api/v1/cluster/status").status_code == 404
+
+    monkeypatch.setattr(settings, "DEBUG_ENDPOINTS_ENABLED", True)
+    monkeypatch.setattr(settings, "DEBUG_ADMIN_TOKEN", "secret")
+    assert client.get("/api/v1/cluster/status").status_code == 403
+    assert client.get("/api/v1/cluster/status", headers={"X-Admin-Token": "secret"}).status_code == 200
@@ -0,0 +1,103 @@
+"""
+Near-duplicate flagging and exact-content result reuse
+"""
+
+import asyncio
+
+from prometheus_client import REGISTRY
+
+from app.api.v1.endpoints import analyze
+from app.core.config import settings
+from app.services.nlp.dedup import DuplicateDetector, LSHIndex, MinHasher
+
+RESUME = """Jane Doe
+Senior Software Engineer
+
+- Increased throughput by 40% by rewriting the ingestion pipeline in Python
+- Led a team of five engineers building internal data tooling
+- Reduced cloud spend across three regions by consolidating storage services
+"""
+
+
+def _run(monkeypatch, reuse, texts):
+    detector = DuplicateDetector(threshold=0.5)
+    calls = []
+
+    async def fake_analysis(request, services, components, include_ai=True, job_profile=None):
+        calls.append(request.resume_text)
+        return {"overall_score": len(calls), "resume": request.resume_text}
+
+    monkeypatch.setattr(analyze, "duplicate_detector", detector)
+    monkeypatch.setattr(analyze, "_run_analysis", fake_analysis)
+    monkeypatch.setattr(analyze, "_analysis_variant", lambda *args: "basic")
+    monkeypatch.setattr(settings, "DEDUP_ENABLED", True)
+    monkeypatch.setattr(settings, "DEDUP_REUSE_RESULTS", reuse)
+
+    async def scenario():
+        results = []
+        for text in texts:
+            request = analyze.ResumeAnalysisRequest(resume_text=text)
+            results.append(await analyze._analyze_with_dedup(request, None, set()))
+        return results
+
+    return asyncio.run(scenario()), calls
+
+
+def test_near_duplicates_are_flagged_but_always_analyzed(monkeypatch):
+    edited = RESUME.replace("40%", "70%")
+    results, calls = _run(monkeypatch, False, [RESUME, edited, RESUME])
+
+    assert calls == [RESUME, edited, RESUME]
+    assert "duplicate_of" not in results[0]
+    assert results[1]["duplicate_of"] and results[1]["resume"] == edited
+    # Resubmitting the original is not a duplicate of itself
+    assert "duplicate_of" not in results[2]
+
+
+def test_results_are_reused_only_for_identical_text(monkeypatch):
+    edited = RESUME.replace("40%", "70%")
+    results, calls = _run(monkeypatch, True, [RESUME, edited, RESUME])
+
+    assert calls == [RESUME, edited]
+    assert results[1]["resume"] == edited
+    assert results[2]["overall_score"] == 1 and "duplicate_of" not in results[2]
+
+
+def test_resubmissions_match_other_entries_not_themselves():
+    detector = DuplicateDetector(threshold=0.5)
+    edited = RESUME.replace("40%", "70%")
+
+    original_id, first = detector.check(RESUME)
+    again_id, again = detector.check(RESUME)
+    edited_id, match = detector.check(edited)
+
+    assert first is None and again is None and again_id == original_id
+    assert match.doc_id == edited_id == original_id
+    assert len(detector.index) == 1
+
+
+def _signature(hasher, n):
+    return hasher.signature(["resume", str(n), "engineer", "python", str(n * 7)])
+
+
+def test_index_evicts_least_recently_used_entries():
+    hasher = MinHasher(num_perm=16)
+    index = LSHIndex(num_perm=16, bands=4, merge_threshold=3, max_entries=3)
+    for n in range(3):
+        index.add("doc%d" % n, _signature(hasher, n))
+
+    index.touch("doc0")
+    index.add("doc3", _signature(hasher, 3))
+    index.add("doc4", _signature(hasher, 4))
+
+    assert len(index) == 3
+    assert list(index.recent) == ["doc0", "doc3", "doc4"]
+    assert index.query(_signature(hasher, 0), 1.0).doc_id == "doc0"
+    assert index.query(_signature(hasher, 1), 1.0) is None
+    assert index.query(_signature(hasher, 4), 1.0).doc_id == "doc4"
+    # Merged band arrays only hold the hashes of live rows
+    assert all(len(keys) == 3 for keys in index.sorted_keys)
+
+
+def test_index_size_is_exported():
+    assert REGISTRY.get_sample_value("dedup_index_entries") is not None
@@ -0,0 +1,45 @@
+"""
+ETag revalidation contract on /score
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+RESUME = "Jane Doe\njane@example.com\n\nEXPERIENCE\n- Led a team of 5 engineers building Python services\n"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_stored_result_is_revalidated_with_304(client):
+    first = client.post("/api/v1/score/", json={"resume_text": RESUME})
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-store"
+
+    again = client.post("/api/v1/score/", json={"resume_text": RESUME}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert not again.content
+
+
+def test_changed_input_is_scored_again(client):
+    etag = client.post("/api/v1/score/", json={"resume_text": RESUME}).headers["ETag"]
+
+    changed = client.post(
+        "/api/v1/score/", json={"resume_text": RESUME + "- Mentored two interns\n"}, headers={"If-None-Match": etag}
+    )
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_unissued_tag_is_not_confirmed(client):
+    text = RESUME + "- Wrote the on-call runbook\n"
+    unknown = client.post("/api/v1/score/", json={"resume_text": text}, headers={"If-None-Match": '"0000"'})
+    assert unknown.status_code == 200
@@ -0,0 +1,99 @@
+"""
+Inverted index skill terms, queries and snapshots
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.search.inverted_index import InvertedIndex, SnapshotWriterBusy
+
+
+def _index():
+    index = InvertedIndex()
+    index.add("google", "Frontend engineer at Google building React apps with TypeScript")
+    index.add("gopher", "Backend engineer writing Go services and R notebooks")
+    index.add("cpp", "Systems programmer using C++ and C# daily")
+    return index
+
+
+def _ids(result):
+    return sorted(hit["resume_id"] for hit in result["results"])
+
+
+def test_short_skills_are_indexed_as_whole_words():
+    index = _index()
+
+    assert _ids(index.search("go")) == ["gopher"]
+    assert _ids(index.search("r")) == ["gopher"]
+    assert _ids(index.search("c++")) == ["cpp"]
+
+
+def test_concurrent_searches_parse_independently():
+    index = _index()
+    queries = ['"react apps" AND typescript', "go OR (c++ AND NOT react)", "engineer NOT google"] * 200
+    expected = {query: _ids(index.search(query)) for query in set(queries)}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda query: (query, _ids(index.search(query))), queries))
+
+    assert all(ids == expected[query] for query, ids in results)
+
+
+def test_deeply_nested_queries_are_rejected():
+    index = _index()
+
+    with pytest.raises(ValueError):
+        index.search("(" * 40 + "go" + ")" * 40)
+    with pytest.raises(ValueError):
+        index.search("NOT " * 40 + "go")
+    with pytest.raises(ValueError):
+        index.search(" ".join(["go"] * 300))
+    assert _ids(index.search("(" * 5 + "go" + ")" * 5)) == ["gopher"]
+
+
+def test_search_endpoint_maps_deep_nesting_to_400(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    response = TestClient(app).post("/api/v1/search/", json={"query": "(" * 2000 + "go" + ")" * 2000})
+
+    assert response.status_code == 400
+
+
+def test_only_one_index_writes_a_snapshot_file(tmp_path):
+    path = str(tmp_path / "index.bin")
+    writer, other = _index(), _index()
+
+    writer.snapshot(path)
+    with pytest.raises(SnapshotWriterBusy):
+        other.snapshot(path)
+
+    assert sorted(os.listdir(tmp_path)) == ["index.bin", "index.bin.lock"]
+    assert _ids(writer.search("engineer")) == ["google", "gopher"]
+
+
+def test_pending_changes_trigger_a_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_INDEX_SNAPSHOT_INTERVAL", 0.01)
+    monkeypatch.setattr(settings, "SEARCH_INDEX_SNAPSHOT_CHANGES", 1)
+    path = str(tmp_path / "index.bin")
+    index = _index()
+
+    async def run():
+        await index.start(path)
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            if os.path.exists(path):
+                break
+        await index.stop()
+
+    asyncio.run(run())
+
+    assert os.path.exists(path)
+    assert index.pending_changes == 0
+    reopened = InvertedIndex()
+    reopened.load(path)
+    assert _ids(reopened.search("go")) == ["gopher"]
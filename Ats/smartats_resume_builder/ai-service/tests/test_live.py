@@ -0,0 +1,52 @@
+"""
+Live scoring WebSocket: edit validation and rate limiting
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.api.v1.endpoints import live
+from app.core.config import settings
+from app.core.rate_limit import InMemoryRateLimitBackend, rate_limiter
+from app.main import app
+
+RESUME = "Jane Doe\njane@example.com\n\nEXPERIENCE\n- Led a team of 5 engineers building Python services\n"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 3)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_HOUR", 100)
+    monkeypatch.setattr(settings, "LIVE_SCORE_DEBOUNCE", 0.0)
+    monkeypatch.setattr(rate_limiter, "backend", InMemoryRateLimitBackend(3, 100))
+    with TestClient(app) as client:
+        yield client
+
+
+def test_non_object_ops_are_rejected():
+    session = live.LiveSession(websocket=None)
+    with pytest.raises(live.EditError):
+        session.apply({"type": "edit", "ops": [5]})
+    assert session.text == ""
+
+
+def test_scores_are_charged_and_deferred(client):
+    with client.websocket_connect("/api/v1/live/ws") as ws:  # 1 token
+        assert ws.receive_json()["type"] == "ready"
+
+        ws.send_json({"type": "set", "text": RESUME, "seq": 1})
+        assert ws.receive_json()["type"] == "score"  # 2 tokens
+
+        ws.send_json({"type": "edit", "ops": [{"start": 0, "end": 4, "text": "Joan"}], "seq": 2})
+        assert ws.receive_json()["type"] == "score"  # 3 tokens
+
+        ws.send_json({"type": "edit", "ops": [{"start": 0, "end": 4, "text": "Jean"}], "seq": 3})
+        deferred = ws.receive_json()
+        assert deferred["type"] == "error" and deferred["retry_after"] >= 1
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/api/v1/live/ws") as ws:
+            ws.receive_json()
+    assert closed.value.code == 1013
@@ -0,0 +1,207 @@
+"""
+LLM routing, hedging and circuit breaking with stub providers, and the real
+providers' HTTP requests against a mock transport
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.ai import llm_router
+from app.services.ai.llm_router import (
+    AnthropicProvider, LLMProvider, LLMRouter, LLMUnavailableError, OpenAIProvider
+)
+
+
+class StubProvider(LLMProvider):
+    """Answers after `delay` seconds, or raises when `fail` is set"""
+
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        super().__init__(api_key="", model="stub", base_url="http://stub")
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    async def complete(self, prompt, max_tokens, temperature, system=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return self.name
+
+
+@pytest.fixture(autouse=True)
+def router_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_HEDGE_INITIAL_DELAY", 0.05)
+    monkeypatch.setattr(settings, "LLM_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(settings, "LLM_BREAKER_RESET", 60.0)
+
+
+def _complete(router):
+    return asyncio.run(router.complete("prompt"))
+
+
+def test_lowest_latency_provider_is_primary():
+    slow, fast = StubProvider("slow"), StubProvider("fast")
+    slow.latency.record(2.0)
+    fast.latency.record(0.5)
+
+    assert _complete(LLMRouter([slow, fast])) == "fast"
+    assert slow.calls == 0
+
+
+def test_failure_falls_over_to_next_provider():
+    broken, backup = StubProvider("broken", fail=True), StubProvider("backup")
+
+    assert _complete(LLMRouter([broken, backup])) == "backup"
+    assert broken.calls == backup.calls == 1
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    slow, backup = StubProvider("slow", delay=1.0), StubProvider("backup")
+
+    start = time.perf_counter()
+    assert _complete(LLMRouter([slow, backup])) == "backup"
+    assert time.perf_counter() - start < 0.5
+    assert slow.cancelled == 1
+
+
+def test_open_breaker_skips_provider_until_probe():
+    broken, backup = StubProvider("broken", fail=True), StubProvider("backup")
+    router = LLMRouter([broken, backup])
+    for _ in range(2):
+        backup.latency.ewma = 1.0  # Keep the broken provider first while its breaker is closed
+        _complete(router)
+
+    assert broken.breaker.is_open
+    _complete(router)
+    assert broken.calls == 2
+
+    broken.fail = False
+    broken.breaker.opened_at -= settings.LLM_BREAKER_RESET
+    assert _complete(router) == "broken"
+    assert not broken.breaker.is_open
+
+
+def test_ordering_does_not_use_up_half_open_probe():
+    provider = StubProvider("flaky")
+    provider.breaker.record_failure()
+    provider.breaker.record_failure()
+    provider.breaker.opened_at -= settings.LLM_BREAKER_RESET
+    router = LLMRouter([provider])
+
+    for _ in range(3):
+        assert router._candidates() == [provider]
+    assert _complete(router) == "flaky"
+
+
+def test_no_available_provider_raises():
+    provider = StubProvider("down", fail=True)
+    router = LLMRouter([provider])
+
+    with pytest.raises(LLMUnavailableError):
+        _complete(router)
+    with pytest.raises(LLMUnavailableError):
+        _complete(router)
+    assert provider.breaker.is_open
+    with pytest.raises(LLMUnavailableError, match="No LLM provider available"):
+        _complete(router)
+
+
+@pytest.fixture
+def mock_http(monkeypatch):
+    """Route provider clients to a MockTransport; records requests and clients built"""
+    state = {"requests": [], "clients": 0, "responses": {}}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        state["requests"].append(request)
+        status, body = state["responses"][request.url.host]
+        return httpx.Response(status, json=body)
+
+    real_client = httpx.AsyncClient
+
+    def client(**kwargs):
+        state["clients"] += 1
+        return real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    monkeypatch.setattr(llm_router.httpx, "AsyncClient", client)
+    return state
+
+
+OPENAI_OK = (200, {"choices": [{"message": {"content": " from openai "}}]})
+ANTHROPIC_OK = (200, {"content": [{"type": "text", "text": "from "}, {"type": "text", "text": "anthropic"}]})
+
+
+def test_openai_request_and_pooled_client(mock_http):
+    mock_http["responses"]["openai.test"] = OPENAI_OK
+    provider = OpenAIProvider("sk-test", "gpt-test", "https://openai.test/v1/")
+
+    async def run():
+        first = await provider.complete("prompt", 100, 0.3, system="rubric")
+        second = await provider.complete("again", 100, 0.3)
+        await provider.close()
+        return first, second
+
+    assert asyncio.run(run()) == ("from openai", "from openai")
+    assert mock_http["clients"] == 1
+
+    request = mock_http["requests"][0]
+    assert str(request.url) == "https://openai.test/v1/chat/completions"
+    assert request.headers["Authorization"] == "Bearer sk-test"
+    assert json.loads(request.content) == {
+        "model": "gpt-test",
+        "messages": [{"role": "system", "content": "rubric"}, {"role": "user", "content": "prompt"}],
+        "max_tokens": 100,
+        "temperature": 0.3
+    }
+    assert json.loads(mock_http["requests"][1].content)["messages"] == [{"role": "user", "content": "again"}]
+
+
+def test_anthropic_request_caches_the_system_block(mock_http):
+    mock_http["responses"]["anthropic.test"] = ANTHROPIC_OK
+    provider = AnthropicProvider("ak-test", "claude-test", "https://anthropic.test")
+
+    async def run():
+        result = await provider.complete("prompt", 200, 1.5, system="rubric")
+        await provider.close()
+        return result
+
+    assert asyncio.run(run()) == "from anthropic"
+
+    request = mock_http["requests"][0]
+    assert str(request.url) == "https://anthropic.test/v1/messages"
+    assert request.headers["x-api-key"] == "ak-test"
+    assert request.headers["anthropic-version"] == "2023-06-01"
+    body = json.loads(request.content)
+    assert body["system"] == [{"type": "text", "text": "rubric", "cache_control": {"type": "ephemeral"}}]
+    assert body["messages"] == [{"role": "user", "content": "prompt"}]
+    assert body["temperature"] == 1.0
+
+
+def test_http_errors_trip_the_breaker_and_fail_over(mock_http):
+    mock_http["responses"]["openai.test"] = (500, {"error": "overloaded"})
+    mock_http["responses"]["anthropic.test"] = ANTHROPIC_OK
+    openai = OpenAIProvider("sk-test", "gpt-test", "https://openai.test/v1")
+    anthropic = AnthropicProvider("ak-test", "claude-test", "https://anthropic.test")
+    router = LLMRouter([openai, anthropic])
+
+    async def run():
+        results = [await router.complete("prompt"), await router.complete("prompt")]
+        await router.close()
+        return results
+
+    assert asyncio.run(run()) == ["from anthropic", "from anthropic"]
+    assert openai.breaker.is_open
+    assert not anthropic.breaker.is_open
+    assert [r.url.host for r in mock_http["requests"]].count("openai.test") == 2
@@ -0,0 +1,31 @@
+"""
+Queue handler record preparation
+"""
+
+import logging
+import queue
+
+from app.core.logging import NonBlockingQueueHandler
+
+
+def _queued(msg, *args):
+    records = queue.Queue()
+    handler = NonBlockingQueueHandler(records)
+    handler.handle(logging.LogRecord("test", logging.INFO, __file__, 1, msg, args, None))
+    return records.get_nowait()
+
+
+def test_primitive_arguments_are_formatted_later():
+    record = _queued("Registered job profile %s (%d skills)", "job-1", 3)
+
+    assert record.args == ("job-1", 3)
+    assert record.getMessage() == "Registered job profile job-1 (3 skills)"
+
+
+def test_mutable_arguments_are_snapshotted_before_queueing():
+    skills = ["python"]
+    record = _queued("Skills: %s", skills)
+    skills.append("go")
+
+    assert record.args is None
+    assert record.getMessage() == "Skills: ['python']"
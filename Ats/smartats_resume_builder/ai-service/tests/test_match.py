@@ -0,0 +1,28 @@
+"""
+Resume / job matching
+"""
+
+from app.api.v1.endpoints.match import _analyze_job, _match_resume
+from app.services.nlp.keyword_extractor import KeywordExtractor
+
+JOB = "Data scientist: R and Go required, Python and SQL a plus, strong communication"
+
+
+def test_short_skills_do_not_match_inside_other_words():
+    extractor = KeywordExtractor(use_keybert=False)
+    job_skills, job_keywords = _analyze_job(JOB, extractor)
+    assert {"R", "Go", "Python"} <= set(job_skills["technical"])
+
+    resume = "Built React dashboards at Google for our growth team, mostly in Python and SQL"
+    result = _match_resume(resume, job_skills, job_keywords, extractor)
+
+    assert "R" not in result["matching_skills"] and "Go" not in result["matching_skills"]
+    assert {"R", "Go"} <= set(result["missing_skills"])
+    assert {"Python"} <= set(result["matching_skills"])
+
+
+def test_job_side_ignores_substrings_too():
+    extractor = KeywordExtractor(use_keybert=False)
+    job_skills, _ = _analyze_job("Frontend engineer for our Google Ads reporting team", extractor)
+
+    assert "Go" not in job_skills["technical"] and "R" not in job_skills["technical"]
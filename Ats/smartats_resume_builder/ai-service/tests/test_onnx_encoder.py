@@ -0,0 +1,55 @@
+"""
+ONNX export coordination between workers
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.ai import onnx_encoder
+from app.services.ai.onnx_encoder import ensure_exported
+
+
+def _fake_export(calls):
+    def export(model_name, directory):
+        calls.append(model_name)
+        time.sleep(0.1)  # Long enough for the other callers to queue on the lock
+        os.makedirs(directory, exist_ok=True)
+        for name in (onnx_encoder.MODEL_FILE, onnx_encoder.REFERENCE_FILE):
+            open(os.path.join(directory, name), "wb").close()
+        with open(os.path.join(directory, onnx_encoder.METADATA_FILE), "w") as f:
+            json.dump({
+                "format_version": onnx_encoder.FORMAT_VERSION,
+                "model": model_name,
+                "corpus": onnx_encoder._corpus_hash(),
+            }, f)
+    return export
+
+
+def test_concurrent_loads_export_once(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(onnx_encoder, "export_quantized", _fake_export(calls))
+    start = threading.Barrier(4)
+
+    def load(_):
+        start.wait()
+        return ensure_exported("org/model", str(tmp_path))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        directories = set(pool.map(load, range(4)))
+
+    assert calls == ["org/model"]
+    assert directories == {onnx_encoder.model_dir(str(tmp_path), "org/model")}
+
+
+def test_current_artifacts_are_not_exported_again(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(onnx_encoder, "export_quantized", _fake_export(calls))
+
+    ensure_exported("org/model", str(tmp_path))
+    ensure_exported("org/model", str(tmp_path))
+    ensure_exported("org/other", str(tmp_path))
+
+    assert calls == ["org/model", "org/other"]
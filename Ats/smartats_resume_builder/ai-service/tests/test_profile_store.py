@@ -0,0 +1,85 @@
+"""
+Job profile store: backend bounds and profile building
+"""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.jobs import profile_store
+from app.services.jobs.profile_store import (
+    InMemoryJobProfileBackend, JobProfileStore, build_profile, job_profile_store
+)
+from app.services.nlp.keyword_extractor import KeywordExtractor
+
+
+def test_least_recently_used_profiles_are_evicted():
+    backend = InMemoryJobProfileBackend(max_size=2, ttl=0)
+
+    async def scenario():
+        await backend.set("a", "A")
+        await backend.set("b", "B")
+        await backend.get("a")  # "b" is now the least recently used
+        await backend.set("c", "C")
+        return [await backend.get(job_id) for job_id in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == ["A", None, "C"]
+    assert len(backend.profiles) == 2
+
+
+def test_profiles_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(profile_store.time, "monotonic", lambda: now[0])
+    backend = InMemoryJobProfileBackend(max_size=10, ttl=60)
+
+    async def scenario():
+        await backend.set("a", "A")
+        now[0] += 59
+        fresh = await backend.get("a")
+        now[0] += 2
+        return fresh, await backend.get("a")
+
+    assert asyncio.run(scenario()) == ("A", None)
+    assert not backend.profiles
+
+
+def test_profiles_match_skills_as_whole_words():
+    extractor = KeywordExtractor(use_keybert=False)
+    profile = build_profile("Frontend engineer on the Google Ads team, React and Go", extractor)
+
+    assert "Go" in profile.skills["technical"]
+    assert "R" not in profile.skills["technical"]
+
+
+def test_cached_profiles_are_reread_after_cache_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(profile_store.time, "monotonic", lambda: now[0])
+    backend = InMemoryJobProfileBackend(max_size=10, ttl=0)
+    first = JobProfileStore(backend, cache_ttl=30)
+    second = JobProfileStore(backend, cache_ttl=30)
+    extractor = KeywordExtractor(use_keybert=False)
+
+    async def scenario():
+        await first.put(build_profile("Python developer", extractor, job_id="job"))
+        cached = await second.get("job")
+        # Another worker re-registers the job with new content
+        await first.put(build_profile("Go developer", extractor, job_id="job"))
+        stale = await second.get("job")
+        now[0] += 31
+        return cached.description, stale.description, (await second.get("job")).description
+
+    assert asyncio.run(scenario()) == ("Python developer", "Python developer", "Go developer")
+
+
+def test_backend_failure_is_503_not_unknown_job(monkeypatch):
+    class BrokenBackend:
+        async def get(self, job_id):
+            raise ConnectionError("backend down")
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(job_profile_store, "backend", BrokenBackend())
+    with TestClient(app) as client:
+        response = client.get("/api/v1/jobs/jd_missing")
+    assert response.status_code == 503
@@ -0,0 +1,84 @@
+"""
+Prompt compaction, token budgets and the shared system prefix
+"""
+
+from app.services.ai.prompt_builder import (
+    SYSTEM_PREFIX, PromptBuilder, compact_resume, count_tokens, truncate_to_tokens
+)
+
+FILLER = "- Maintained internal tooling and attended weekly planning meetings with the wider team"
+
+RESUME = "\n".join([
+    "Jane Doe",
+    "jane@example.com | 555-0100",
+    "Berlin, Germany",
+    "",
+    "EXPERIENCE",
+    "Senior Engineer, Acme",
+    *[FILLER] * 12,
+    "- Migrated 40 services to Kubernetes, cutting deploy time by 70%",
+    *[FILLER] * 12,
+    "",
+    "SKILLS",
+    "Python, Go, Kubernetes, Terraform",
+    "",
+    "References available upon request",
+])
+
+
+def test_system_prefix_is_long_enough_to_be_cached():
+    # Providers only cache prefixes of 1024 tokens or more
+    assert count_tokens(SYSTEM_PREFIX) >= 1024
+    assert "{" not in SYSTEM_PREFIX  # No per-request data
+
+
+def test_short_resumes_are_passed_through():
+    assert compact_resume("  Jane Doe\nPython developer  ", 100) == "Jane Doe\nPython developer"
+
+
+def test_compacted_resume_fits_the_budget_and_keeps_what_matters():
+    budget = 120
+    assert count_tokens(RESUME) > budget
+
+    compacted = compact_resume(RESUME, budget, ["kubernetes"])
+    lines = compacted.splitlines()
+
+    assert count_tokens(compacted) <= budget
+    assert lines[:3] == ["Jane Doe", "jane@example.com | 555-0100", "Berlin, Germany"]
+    assert "EXPERIENCE" in lines and "SKILLS" in lines
+    assert "- Migrated 40 services to Kubernetes, cutting deploy time by 70%" in lines
+    assert "Python, Go, Kubernetes, Terraform" in lines
+    assert "[...]" in lines
+    assert "References available upon request" not in compacted
+    # Consecutive omitted lines collapse into one marker
+    assert "[...]\n[...]" not in compacted
+
+
+def test_truncate_to_tokens_respects_the_budget():
+    text = " ".join(["engineering"] * 100)
+
+    assert truncate_to_tokens("short text", 10) == "short text"
+    truncated = truncate_to_tokens(text, 25)
+    assert count_tokens(truncated) <= 25
+    assert text.startswith(truncated)
+
+
+def test_prompts_share_the_prefix_and_stay_within_budget():
+    builder = PromptBuilder(resume_budget=120, job_budget=40)
+    job = "We need a platform engineer. " + "Experience with Kubernetes and Terraform is required. " * 20
+
+    system, prompt = builder.resume_insights(RESUME, job, ["kubernetes"])
+    resume_part, job_part = prompt.split("\n\nJob Description:\n")
+
+    assert system == SYSTEM_PREFIX
+    assert prompt.startswith("Task: resume insights")
+    assert count_tokens(resume_part) <= 120 + count_tokens("Task: resume insights\n\nResume:")
+    assert count_tokens(job_part) <= 40
+
+    system, prompt = builder.cover_letter(RESUME, job, "Acme", job_terms=["kubernetes"])
+    assert system == SYSTEM_PREFIX
+    assert count_tokens(prompt.split("Resume Summary:\n")[1]) <= 60
+
+    system, prompt = builder.bullet_point("- Did deployments", context=job)
+    assert system == SYSTEM_PREFIX
+    assert count_tokens(prompt.split("Context: ")[1]) <= 20
@@ -0,0 +1,181 @@
+"""
+Rate limiter tests: client keys behind proxies and the Redis token-bucket script
+"""
+
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.rate_limit import (
+    InMemoryRateLimitBackend, RateLimiter, RedisRateLimitBackend, client_key, rate_limiter
+)
+from app.main import app
+
+
+def _request(forwarded: str = None, host: str = "10.0.0.9") -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded is not None else []
+    return Request({"type": "http", "method": "POST", "path": "/api/v1/score", "headers": headers,
+                    "client": (host, 50000)})
+
+
+@pytest.fixture
+def trust_forwarded(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUST_FORWARDED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", 1)
+
+
+def test_forwarded_for_ignored_unless_trusted():
+    assert client_key(_request("1.2.3.4")) == "ip:10.0.0.9"
+
+
+def test_client_supplied_forwarded_entries_are_ignored(trust_forwarded):
+    # The proxy appends the real peer; rotating the spoofed prefix must not change the key
+    assert client_key(_request("6.6.6.6, 203.0.113.7")) == "ip:203.0.113.7"
+    assert client_key(_request("7.7.7.7, 203.0.113.7")) == "ip:203.0.113.7"
+
+
+def test_trusted_proxy_count(trust_forwarded, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", 2)
+    assert client_key(_request("6.6.6.6, 203.0.113.7, 10.1.0.2")) == "ip:203.0.113.7"
+    # Fewer hops than proxies: the header is not trustworthy, use the peer address
+    assert client_key(_request("203.0.113.7")) == "ip:10.0.0.9"
+
+
+def test_api_key_takes_precedence(trust_forwarded):
+    request = Request({"type": "http", "method": "POST", "path": "/", "client": ("10.0.0.9", 1),
+                       "headers": [(b"x-api-key", b"secret"), (b"x-forwarded-for", b"203.0.113.7")]})
+    assert client_key(request).startswith("key:")
+
+
+def _redis_backend(server, per_minute=3, per_hour=100):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisRateLimitBackend(fakeredis.aioredis.FakeRedis(server=server), per_minute, per_hour)
+
+
+def test_redis_token_bucket():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        backend = _redis_backend(fakeredis.FakeServer())
+        results = [await backend.acquire("ip:1", 1) for _ in range(4)]
+        other = await backend.acquire("ip:2", 1)
+        ttl = await backend.client.ttl("ratelimit:ip:1")
+        return results, other, ttl
+
+    results, other, ttl = asyncio.run(scenario())
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert [result.remaining for result in results[:3]] == [2, 1, 0]
+    assert results[3].retry_after >= 1
+    assert other.allowed and other.remaining == 2
+    assert 0 < ttl <= 3600
+
+
+def test_redis_buckets_are_shared_between_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        first, second = _redis_backend(server), _redis_backend(server)
+        return [await backend.acquire("ip:1", 1) for backend in (first, second, first, second)]
+
+    results = asyncio.run(scenario())
+    assert [result.allowed for result in results] == [True, True, True, False]
+
+
+def test_redis_cost_larger_than_remaining_is_rejected_without_spending():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        backend = _redis_backend(fakeredis.FakeServer(), per_minute=5)
+        return [await backend.acquire("ip:1", cost) for cost in (3, 3, 2)]
+
+    results = asyncio.run(scenario())
+    assert [result.allowed for result in results] == [True, False, True]
+    assert results[2].remaining == 0
+
+
+class _FailingScript:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, keys, args):
+        self.calls += 1
+        raise ConnectionError("redis down")
+
+
+class _FailingClient:
+    def __init__(self):
+        self.script = _FailingScript()
+
+    def register_script(self, script):
+        return self.script
+
+
+def test_redis_failure_falls_back_to_local_buckets():
+    backend = RedisRateLimitBackend(_FailingClient(), per_minute=2, per_hour=100)
+
+    async def scenario():
+        return [await backend.acquire("ip:1", 1) for _ in range(3)]
+
+    assert [result.allowed for result in asyncio.run(scenario())] == [True, True, False]
+    assert isinstance(backend.fallback, InMemoryRateLimitBackend)
+
+
+def test_redis_errors_are_counted_and_redis_is_retried_later(monkeypatch):
+    client = _FailingClient()
+    backend = RedisRateLimitBackend(client, per_minute=10, per_hour=100, retry_interval=60.0)
+    before = REGISTRY.get_sample_value("rate_limit_backend_errors_total") or 0
+
+    async def scenario():
+        return [await backend.acquire("ip:1", 1) for _ in range(3)]
+
+    assert all(result.allowed for result in asyncio.run(scenario()))
+    assert client.script.calls == 1  # Not retried within the interval
+    assert REGISTRY.get_sample_value("rate_limit_backend_errors_total") == before + 1
+
+    monkeypatch.setattr(backend, "_retry_at", 0.0)
+    asyncio.run(scenario())
+    assert client.script.calls == 2
+
+
+def test_redis_client_uses_short_timeouts(monkeypatch):
+    redis = pytest.importorskip("redis.asyncio")
+    options = {}
+
+    def from_url(url, **kwargs):
+        options.update(kwargs)
+        return _FailingClient()
+
+    monkeypatch.setattr(redis, "from_url", from_url)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "redis")
+    backend = RateLimiter()._create_backend()
+
+    assert isinstance(backend, RedisRateLimitBackend)
+    assert options == {
+        "socket_connect_timeout": settings.RATE_LIMIT_REDIS_CONNECT_TIMEOUT,
+        "socket_timeout": settings.RATE_LIMIT_REDIS_TIMEOUT,
+    }
+
+
+def test_preflights_are_free_and_rejections_carry_cors_headers(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 1)
+    monkeypatch.setattr(rate_limiter, "backend", InMemoryRateLimitBackend(1, 100))
+    origin = settings.CORS_ORIGINS[0]
+    preflight = {"Origin": origin, "Access-Control-Request-Method": "POST"}
+    body = {"resume_text": "Jane Doe\n- Led a team of 5 engineers"}
+
+    with TestClient(app) as client:
+        for _ in range(3):
+            assert client.options("/api/v1/score/", headers=preflight).status_code == 200
+        assert client.post("/api/v1/score/", json=body, headers={"Origin": origin}).status_code == 200
+        rejected = client.post("/api/v1/score/", json=body, headers={"Origin": origin})
+
+    assert rejected.status_code == 429
+    assert rejected.headers["Access-Control-Allow-Origin"] == origin
+    assert "X-Process-Time" in rejected.headers
@@ -0,0 +1,137 @@
+"""
+Internal RPC round trips over a Unix socket
+"""
+
+import asyncio
+import os
+
+import msgpack
+import pytest
+
+from app.api import rpc
+from app.api.rpc import InternalRPCServer
+from app.core.config import settings
+
+RESUME = "Jane Doe\njane@example.com\n\nEXPERIENCE\n- Led a team of 5 engineers building Python services\n"
+
+
+@pytest.fixture
+def socket_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "rpc.sock")
+    monkeypatch.setattr(settings, "INTERNAL_RPC_SOCKET", path)
+    monkeypatch.setattr(settings, "INTERNAL_RPC_PORT", 0)
+    monkeypatch.setattr(settings, "INTERNAL_RPC_TOKEN", "secret")
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+    return path
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, message):
+        payload = msgpack.packb(message, use_bin_type=True)
+        self.writer.write(len(payload).to_bytes(4, "big") + payload)
+        await self.writer.drain()
+
+    async def receive(self, timeout=5.0):
+        header = await asyncio.wait_for(self.reader.readexactly(4), timeout)
+        return msgpack.unpackb(await self.reader.readexactly(int.from_bytes(header, "big")), raw=False)
+
+    async def call(self, request_id, method, params=None):
+        await self.send({"id": request_id, "method": method, "params": params or {}})
+        return await self.receive()
+
+
+def _serve(path, scenario):
+    async def run():
+        server = InternalRPCServer()
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+            try:
+                return await scenario(Client(reader, writer))
+            finally:
+                writer.close()
+        finally:
+            await server.stop()
+
+    return asyncio.run(run())
+
+
+def test_requests_need_the_token_first(socket_path):
+    async def scenario(client):
+        refused = await client.call(1, "ping")
+        wrong = await client.call(2, "auth", {"token": "nope"})
+        accepted = await client.call(3, "auth", {"token": "secret"})
+        return refused, wrong, accepted, await client.call(4, "ping")
+
+    refused, wrong, accepted, pong = _serve(socket_path, scenario)
+
+    assert refused["error"]["status"] == 401
+    assert wrong["error"]["status"] == 401
+    assert accepted == {"id": 3, "result": {"authenticated": True}}
+    assert pong == {"id": 4, "result": "pong"}
+    assert not os.path.exists(socket_path)
+
+
+def test_unary_and_streaming_calls(socket_path):
+    async def scenario(client):
+        await client.call(0, "auth", {"token": "secret"})
+        score = await client.call(1, "score", {"resume_text": RESUME})
+
+        items = [{"id": "a", "resume_text": RESUME}, {"id": "b", "resume_text": RESUME + "Python"}]
+        await client.send({"id": 2, "method": "score_batch", "params": {"items": items}})
+        frames = [await client.receive()]
+        while not frames[-1].get("done"):
+            frames.append(await client.receive())
+
+        bad_items = await client.call(3, "score_batch", {"items": ["not a map"]})
+        return score, frames, bad_items
+
+    score, frames, bad_items = _serve(socket_path, scenario)
+
+    assert 0 <= score["result"]["ats_score"] <= 100
+    assert all(frame["id"] == 2 for frame in frames)
+    assert sorted(frame["record"]["id"] for frame in frames[:-1]) == ["a", "b"]
+    assert frames[-1]["record"]["summary"]["succeeded"] == 2
+    assert bad_items == {"id": 3, "error": {"status": 422, "message": "items must be maps"}}
+
+
+def test_cancel_stops_an_in_flight_request(socket_path, monkeypatch):
+    cancelled = []
+
+    async def hang(params, degraded):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(params["n"])
+            raise
+
+    monkeypatch.setitem(rpc.UNARY_METHODS, "score", hang)
+
+    async def scenario(client):
+        await client.call(0, "auth", {"token": "secret"})
+        await client.send({"id": 1, "method": "score", "params": {"n": 1}})
+        await asyncio.sleep(0.05)
+        await client.send({"id": None, "method": "cancel", "params": {"id": 1}})
+        # The cancelled request gets no response; the next one is answered
+        return await client.call(2, "ping")
+
+    assert _serve(socket_path, scenario) == {"id": 2, "result": "pong"}
+    assert cancelled == [1]
+
+
+def test_only_one_server_binds_the_socket(socket_path):
+    async def run():
+        owner, other = InternalRPCServer(), InternalRPCServer()
+        await owner.start()
+        await other.start()
+        try:
+            return len(owner.addresses), len(other.addresses)
+        finally:
+            await other.stop()
+            await owner.stop()
+
+    assert asyncio.run(run()) == (1, 0)
@@ -0,0 +1,28 @@
+"""
+Shipped scoring rules: keyword matchers count whole words only
+"""
+
+from app.services.ats.rules import DEFAULT_RULES_PATH, _Text, load_rules
+
+
+def test_keyword_matchers_ignore_words_containing_a_phrase():
+    rules = load_rules(DEFAULT_RULES_PATH)
+    text = _Text("Handled JavaScript tooling, rebuilt nodes and javascript reports")
+
+    assert rules.matchers["action_verbs"](text) == 0
+    assert rules.matchers["common_keywords"](text) == 1  # "javascript", counted once
+
+
+def test_keyword_matchers_count_distinct_whole_words():
+    rules = load_rules(DEFAULT_RULES_PATH)
+    text = _Text("Led a Java team, led releases, built Node services under budget")
+
+    assert rules.matchers["action_verbs"](text) == 3  # led, built, under budget
+    assert rules.matchers["common_keywords"](text) == 2  # java, node
+
+
+def test_batch_and_single_scores_agree():
+    rules = load_rules(DEFAULT_RULES_PATH)
+    texts = ["Managed the Python team\n- Led 5 engineers", "Handled support tickets"]
+
+    assert rules.score_batch(texts) == [rules.score(text) for text in texts]
@@ -0,0 +1,82 @@
+"""
+Resume segmentation: headers, bullets and date ranges
+"""
+
+from app.services.nlp.segmenter import header_kind, segment_resume
+
+RESUME = """JANE DOE
+jane@example.com | 555-0100
+
+Professional Summary
+Backend engineer who enjoys building data platforms.
+Strong skills in Python and distributed systems.
+
+EXPERIENCE
+Senior Engineer, Acme Corp
+Jan 2019 - Present
+- Led a team of 5 engineers
+• Cut infrastructure costs by 30%
+1. Migrated 40 services to Kubernetes
+Engineer, Initech 2015 – 2018
+Worked on billing-system rewrites, 2016-2017 releases
+
+OPEN SOURCE WORK
+Maintainer of a Python job queue
+
+Technical Skills:
+Python, Go, SQL
+"""
+
+
+def test_headers_from_the_lexicon_and_all_caps_lines():
+    structure = segment_resume(RESUME)
+
+    assert [(section.kind, section.title) for section in structure.sections] == [
+        ("summary", "Professional Summary"),
+        ("experience", "EXPERIENCE"),
+        ("other", "OPEN SOURCE WORK"),
+        ("skills", "Technical Skills"),
+    ]
+    # An unknown all-caps line at the top is the name, not a section
+    assert structure.preamble == ("JANE DOE", "jane@example.com | 555-0100")
+    assert structure.standard_sections == 3
+
+
+def test_section_words_inside_sentences_are_not_headers():
+    summary = segment_resume(RESUME).section("summary")
+
+    assert "Strong skills in Python and distributed systems." in summary.lines
+    assert header_kind("Strong skills in Python and distributed systems.") is None
+    assert header_kind("skills") == "skills"
+    assert header_kind("Education and Training") == "education"
+    assert header_kind("EXPERIENCE AT SCALE") == "experience"
+    assert header_kind("Skills are important to employers") is None
+
+
+def test_bullets_are_stripped_of_their_markers():
+    experience = segment_resume(RESUME).section("experience")
+
+    assert experience.bullets == (
+        "Led a team of 5 engineers",
+        "Cut infrastructure costs by 30%",
+        "Migrated 40 services to Kubernetes",
+    )
+    assert segment_resume(RESUME).bullets == list(experience.bullets)
+
+
+def test_date_ranges_are_parsed_with_open_ends():
+    dates = segment_resume(RESUME).dates
+
+    assert [(date.text, date.start_year, date.end_year) for date in dates] == [
+        ("Jan 2019 - Present", 2019, None),
+        ("2015 – 2018", 2015, 2018),
+        ("2016-2017", 2016, 2017),
+    ]
+    assert dates[0].line == RESUME.splitlines().index("Jan 2019 - Present")
+
+
+def test_hyphens_in_date_ranges_are_not_bullets():
+    structure = segment_resume("EXPERIENCE\n2019 - 2021\nJan 2018 - Dec 2018\n-2017 to 2018\n- Shipped the app\n")
+
+    assert structure.bullets == ["Shipped the app"]
+    assert len(structure.dates) == 3